@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Slow-client benchmark: WSGI (thread per request) vs the ASGI entry point.
+
+Simulates N clients that download the same file over slow connections,
+all in one process:
+  * WSGI: a pool of ``--threads`` threads, like a gunicorn gthread worker.
+    The thread serving a request is held until the client has received
+    the whole body.
+  * ASGI: ``asgi.app`` on one event loop. Slow delivery is an awaited
+    ``send()``, as with uvicorn's transport backpressure.
+
+For each client count it reports wall time, time to first byte and the
+peak number of transfers in progress at once, i.e. how many slow clients
+one process actually serves concurrently.
+
+Run from the repository root:
+
+    python .dev/benchmarks/bench_slow_clients.py --clients 8 64 256 --kbps 512
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+# Measure the serving model, not admission control or profiling
+os.environ.setdefault("ADMISSION_LIMITS", "asset=100000:100000,page=100000:100000")
+os.environ.setdefault("PROFILE_THRESHOLD_MS", "")
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+import asgi  # noqa: E402
+from app import app  # noqa: E402
+
+
+class Transfers:
+    """Counts transfers in progress and remembers the peak."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+def run_wsgi(url, clients, bytes_per_second, threads):
+    transfers = Transfers()
+
+    def client(submitted):
+        environ = EnvironBuilder(path=url).get_environ()
+        status = []
+        body = app.wsgi_app(environ, lambda s, h, e=None: status.append(s))
+        first_byte = None
+        with transfers:
+            try:
+                for chunk in body:
+                    first_byte = first_byte or time.perf_counter() - submitted
+                    time.sleep(len(chunk) / bytes_per_second)  # Blocking socket write
+            finally:
+                getattr(body, "close", lambda: None)()
+        return first_byte
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(client, time.perf_counter()) for _ in range(clients)]
+        first_bytes = [future.result() for future in futures]
+    return time.perf_counter() - started, first_bytes, transfers.peak
+
+
+def run_asgi(url, clients, bytes_per_second):
+    transfers = Transfers()
+
+    async def client():
+        submitted = time.perf_counter()
+        first_byte = []
+        received = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            return received.pop() if received else {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message["body"]:
+                if not first_byte:
+                    first_byte.append(time.perf_counter() - submitted)
+                await asyncio.sleep(len(message["body"]) / bytes_per_second)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": url,
+            "query_string": b"",
+            "headers": [],
+        }
+        with transfers:
+            await asgi.app(scope, receive, send)
+        return first_byte[0]
+
+    async def main():
+        return await asyncio.gather(*(client() for _ in range(clients)))
+
+    started = time.perf_counter()
+    first_bytes = asyncio.run(main())
+    return time.perf_counter() - started, first_bytes, transfers.peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="/download/advs_demo.xpt")
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 64, 256])
+    parser.add_argument("--kbps", type=float, default=512, help="Per-client speed.")
+    parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads.")
+    args = parser.parse_args()
+    bytes_per_second = args.kbps * 1024
+
+    print(f"{args.url} at {args.kbps:g} KB/s per client, WSGI threads={args.threads}")
+    print(
+        f"{'mode':<6} {'clients':>8} {'wall':>9} {'TTFB p50':>10} {'TTFB p95':>10}"
+        f" {'concurrent':>11}"
+    )
+    for clients in args.clients:
+        results = {
+            "wsgi": run_wsgi(args.url, clients, bytes_per_second, args.threads),
+            "asgi": run_asgi(args.url, clients, bytes_per_second),
+        }
+        for mode, (wall, first_bytes, peak) in results.items():
+            p95 = statistics.quantiles(first_bytes, n=20)[-1] if clients > 1 else 0
+            print(
+                f"{mode:<6} {clients:>8} {wall:>8.2f}s"
+                f" {statistics.median(first_bytes) * 1000:>8.0f}ms"
+                f" {p95 * 1000:>8.0f}ms {peak:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Flask application.
+
+Measures, in fresh interpreter processes:
+  * the time to ``import app``
+  * the first request to ``/`` with an empty and with a warm Jinja bytecode cache
+  * the first request to a rendered Quarto document
+
+Run from the repository root:
+
+    python .dev/benchmarks/bench_startup.py --runs 5 --max-import-ms 400
+
+With ``--max-import-ms`` / ``--max-first-request-ms`` the script exits
+non-zero when a median exceeds the budget, so it can gate CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = sorted(name for name in json.loads(sys.argv[1]) if name in sys.modules)
+client = app.app.test_client()
+timings = {"import_ms": (imported - started) * 1000}
+for url in sys.argv[2:]:
+    t0 = time.perf_counter()
+    response = client.get(url)
+    timings[url] = (time.perf_counter() - t0) * 1000
+    assert response.status_code == 200, (url, response.status_code)
+timings["heavy_modules"] = heavy
+print(json.dumps(timings))
+"""
+
+URLS = ["/", "/view/module4_theory.qmd"]
+# Loaded on first use by rarely used routes and CLI commands, never at import
+LAZY_MODULES = [
+    "reportlab",
+    "render_build",
+    "static_export",
+    "critical_css",
+    "precache",
+    "progress_store",
+    "rating_events",
+    "tangle",
+]
+
+
+def run_probe(cache_dir):
+    env = dict(os.environ, JINJA_CACHE_DIR=cache_dir, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(LAZY_MODULES), *URLS],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-request-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(run_probe(cache_dir))
+            warm.append(run_probe(cache_dir))
+
+    def median(samples, key):
+        return statistics.median(sample[key] for sample in samples)
+
+    print(f"{'metric':<40} {'cold cache':>12} {'warm cache':>12}")
+    for key in ["import_ms"] + URLS:
+        print(f"{key:<40} {median(cold, key):>10.1f}ms {median(warm, key):>10.1f}ms")
+    heavy = warm[-1]["heavy_modules"]
+    print(f"heavy modules loaded at start-up: {', '.join(heavy) or 'none'}")
+
+    failures = []
+    if args.max_import_ms is not None and median(warm, "import_ms") > args.max_import_ms:
+        failures.append(f"import took longer than {args.max_import_ms}ms")
+    if args.max_first_request_ms is not None:
+        if median(warm, "/") > args.max_first_request_ms:
+            failures.append(f"first request took longer than {args.max_first_request_ms}ms")
+    if heavy:
+        failures.append(f"modules that should load lazily were imported: {heavy}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
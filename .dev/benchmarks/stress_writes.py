@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Multi-process stress test of the write endpoints.
+
+Starts ``--workers`` gunicorn worker processes (as in production) on a
+scratch copy of the site whose ``data/`` directory starts empty, then
+fires ``--requests`` writes from ``--clients`` client processes with
+``--concurrency`` threads each. Operations (``--mix`` sets their weights):
+
+  * contact      POST /send_contact_message
+  * rating       POST /submit_simple_rating, star only
+  * update       a star rating followed by its feedback update, i.e. the
+                 read-split-rewrite path of /submit_simple_rating (the
+                 update request is the one timed)
+  * bulk         POST /api/ratings/bulk, every batch sent twice
+  * certificate  POST /download_certificate
+
+Every write carries a unique token. Afterwards the ``data/*.txt`` logs
+are read with ``data_export.records``: each accepted write must appear
+exactly once, in a well-formed record (the fields of its kind, one
+closing separator per header). A resent bulk event the server reports as
+a duplicate is a success: the endpoint is idempotent by design.
+The star rating of an ``update`` may be present once or dropped by the
+rewrite. Throughput and p50/p95/p99 latency are reported per operation;
+the script exits non-zero when records are lost, duplicated or malformed.
+
+Run from the repository root:
+
+    python .dev/benchmarks/stress_writes.py --workers 4 --requests 3000
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from urllib.parse import urlencode
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_ROOT)
+
+import data_export  # noqa: E402
+
+OPERATIONS = ("contact", "rating", "update", "bulk", "certificate")
+TOKEN = re.compile(r"stress-\d{7}")
+# Log file of each data_export dataset
+LOGS = {
+    "contact_messages.txt": "messages",
+    "course_ratings.txt": "ratings",
+    "course_completers.txt": "completers",
+}
+# Fields every record of a kind must have
+REQUIRED_FIELDS = {
+    "message": {"name", "email", "subject", "message"},
+    "rating": {"rating", "timestamp"},
+    "feedback update": {"rating", "feedback", "timestamp"},
+    "certificate": {"completer", "method", "timestamp"},
+}
+# (record kind, how many times) each operation's token must appear
+EXPECTED = {
+    "contact": {"message": {1}},
+    "rating": {"rating": {1}},
+    "update": {"feedback update": {1}, "rating": {0, 1}},
+    "bulk": {"feedback update": {1}},
+    "certificate": {"certificate": {1}},
+}
+
+
+# --- Server ---
+
+
+def scratch_site():
+    """Directory linking to the repository, with its own empty data/."""
+    site = tempfile.mkdtemp(prefix="beginr-stress-")
+    for entry in os.listdir(REPO_ROOT):
+        if entry not in ("data", ".git"):
+            os.symlink(os.path.join(REPO_ROOT, entry), os.path.join(site, entry))
+    os.makedirs(os.path.join(site, "data"))
+    return site
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(site, port, workers, threads):
+    env = dict(
+        os.environ,
+        PREBUILD_SCRIPTS="false",
+        PROFILE_THRESHOLD_MS="",
+        # Measure the write paths, not load shedding
+        ADMISSION_LIMITS=os.getenv(
+            "ADMISSION_LIMITS", "write=100000:100000,heavy=100000:100000"
+        ),
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--chdir",
+            site,
+            "--workers",
+            str(workers),
+            "--threads",
+            str(threads),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--log-level",
+            "warning",
+            "app:app",
+        ],
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("gunicorn exited during start-up")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("gunicorn did not answer /health within 60s")
+
+
+# --- Clients ---
+
+_connections = threading.local()
+
+
+def _send(port, method, path, body=None, content_type=None):
+    for attempt in range(2):
+        connection = getattr(_connections, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            _connections.connection = connection
+        try:
+            headers = {"Content-Type": content_type} if content_type else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            _connections.connection = None
+            if attempt:
+                return 0, b""
+
+
+def _json(port, path, data):
+    return _send(port, "POST", path, json.dumps(data), "application/json")
+
+
+def _form(port, path, data):
+    return _send(
+        port, "POST", path, urlencode(data), "application/x-www-form-urlencoded"
+    )
+
+
+def _rating_ok(response):
+    status, body = response
+    return status == 200 and json.loads(body or b"{}").get("success") is True
+
+
+def run_operation(port, operation, token):
+    """Perform one write; returns ``(operation, token, ok, seconds)``."""
+    started = time.perf_counter()
+    if operation == "contact":
+        status, _body = _form(
+            port,
+            "/send_contact_message",
+            {
+                "firstName": "Stress",
+                "lastName": "Tester",
+                "email": "stress@example.com",
+                "subject": "technical",
+                "message": f"Load test {token}\nSecond line of the message",
+            },
+        )
+        ok = status == 302
+    elif operation == "rating":
+        ok = _rating_ok(
+            _json(port, "/submit_simple_rating", {"rating": 4, "timestamp": token})
+        )
+    elif operation == "update":
+        first = _json(port, "/submit_simple_rating", {"rating": 3, "timestamp": token})
+        started = time.perf_counter()
+        update = {
+            "rating": 3,
+            "feedback": f"Feedback {token}",
+            "timestamp": token,
+            "isUpdate": True,
+        }
+        ok = _rating_ok(first) and _rating_ok(
+            _json(port, "/submit_simple_rating", update)
+        )
+    elif operation == "bulk":
+        event = {
+            "id": token,
+            "revision": 1,
+            "rating": 5,
+            "feedback": f"Bulk {token}",
+            "timestamp": token,
+        }
+        results = []
+        for send in range(2):
+            status, body = _json(port, "/api/ratings/bulk", {"events": [event]})
+            results.append(json.loads(body) if status == 200 else {})
+            if send == 0:
+                elapsed = time.perf_counter() - started
+        # Each send is either recorded or recognised as a resend (a retried
+        # connection may already have delivered it); recorded at most once
+        ok = all(r.get("accepted", 0) + r.get("duplicates", 0) == 1 for r in results)
+        ok = ok and sum(r["accepted"] for r in results) <= 1
+        return operation, token, ok, elapsed
+    else:
+        status, _body = _form(
+            port, "/download_certificate", {"name": "Stress", "surname": token}
+        )
+        ok = status == 200
+    return operation, token, ok, time.perf_counter() - started
+
+
+def run_client(args):
+    port, concurrency, work = args
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda item: run_operation(port, *item), work))
+
+
+def plan(requests, mix):
+    weights = [mix.get(operation, 0) for operation in OPERATIONS]
+    cycle = [op for op, weight in zip(OPERATIONS, weights) for _ in range(weight)]
+    if not cycle:
+        raise SystemExit("--mix selects no operations")
+    return [(cycle[i % len(cycle)], f"stress-{i:07d}") for i in range(requests)]
+
+
+# --- Verification ---
+
+
+def _structure_errors(path):
+    """Headers without exactly one closing separator: interleaved writes."""
+    headers = separators = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.rstrip()
+            if line.startswith(b"=== ") and line.endswith(b" ==="):
+                headers += 1
+            elif len(line) >= 10 and not line.strip(b"="):
+                separators += 1
+    return abs(headers - separators)
+
+
+def scan_log(data_dir, filename):
+    """``(records, malformed)``: ``records`` are ``(kind, tokens)`` pairs."""
+    path = os.path.join(data_dir, filename)
+    if not os.path.exists(path):
+        return [], 0
+    dataset = LOGS[filename]
+    columns = data_export.DATASETS[dataset].columns
+    data_export.DATASETS[dataset] = data_export.Dataset(path, columns)
+
+    records = []
+    malformed = _structure_errors(path)
+    for record in data_export.records(dataset):
+        values = [record.fields.get(f) for f in REQUIRED_FIELDS[record.kind]]
+        if None in values:
+            malformed += 1
+            continue
+        text = "\n".join(str(value) for value in record.fields.values())
+        records.append((record.kind, set(TOKEN.findall(text))))
+    return records, malformed
+
+
+def verify(data_dir, results):
+    accepted = {token: operation for operation, token, ok, _ in results if ok}
+    seen = defaultdict(Counter)
+    report = {"malformed": {}, "lost": [], "duplicated": [], "unexpected": []}
+    for filename in LOGS:
+        records, malformed = scan_log(data_dir, filename)
+        report["malformed"][filename] = malformed
+        for kind, tokens in records:
+            for token in tokens:
+                seen[token][kind] += 1
+
+    for token, operation in sorted(accepted.items()):
+        for kind, allowed in EXPECTED[operation].items():
+            count = seen[token][kind]
+            if count not in allowed:
+                key = "lost" if count < min(allowed) else "duplicated"
+                report[key].append(f"{operation} {token}: {count} {kind} records")
+    for token in sorted(seen):
+        if token not in accepted:
+            report["unexpected"].append(token)
+    report["ok"] = not (
+        any(report["malformed"].values())
+        or report["lost"]
+        or report["duplicated"]
+        or report["unexpected"]
+    )
+    return report
+
+
+# --- Reporting ---
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(results, wall):
+    by_operation = defaultdict(list)
+    for operation, _token, ok, seconds in results:
+        by_operation[operation].append((ok, seconds))
+    summary = {"wall_seconds": round(wall, 2), "throughput": len(results) / wall}
+    for operation, samples in by_operation.items():
+        latencies = [seconds * 1000 for _ok, seconds in samples]
+        summary[operation] = {
+            "requests": len(samples),
+            "errors": sum(not ok for ok, _seconds in samples),
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": max(latencies),
+        }
+    return summary
+
+
+def print_report(summary, integrity):
+    print(
+        f"{summary['wall_seconds']}s wall, {summary['throughput']:.0f} writes/s"
+        f"\n{'operation':<12} {'requests':>8} {'errors':>7} {'p50':>8}"
+        f" {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    for operation in OPERATIONS:
+        stats = summary.get(operation)
+        if stats:
+            print(
+                f"{operation:<12} {stats['requests']:>8} {stats['errors']:>7}"
+                + "".join(
+                    f" {stats[key]:>6.0f}ms"
+                    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+                )
+            )
+    print("\nIntegrity:", "OK" if integrity["ok"] else "FAILED")
+    for filename, count in integrity["malformed"].items():
+        print(f"  {filename}: {count} malformed records")
+    for key in ("lost", "duplicated", "unexpected"):
+        entries = integrity[key]
+        print(f"  {key}: {len(entries)}")
+        for entry in entries[:5]:
+            print(f"    {entry}")
+
+
+def parse_mix(spec):
+    mix = {}
+    for entry in filter(None, spec.split(",")):
+        name, _, weight = entry.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers.")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker.")
+    parser.add_argument("--clients", type=int, default=4, help="Client processes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Per client.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="contact=3,rating=3,update=2,bulk=2,certificate=1",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON instead.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch site.")
+    args = parser.parse_args()
+
+    site = scratch_site()
+    port = free_port()
+    server = start_server(site, port, args.workers, args.threads)
+    try:
+        work = plan(args.requests, args.mix)
+        shares = [
+            (port, args.concurrency, work[i :: args.clients])
+            for i in range(args.clients)
+        ]
+        started = time.perf_counter()
+        with Pool(args.clients) as pool:
+            results = [item for share in pool.map(run_client, shares) for item in share]
+        wall = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary = summarize(results, wall)
+    integrity = verify(os.path.join(site, "data"), results)
+    if args.json:
+        print(json.dumps({"summary": summary, "integrity": integrity}, indent=2))
+    else:
+        print_report(summary, integrity)
+    if args.keep:
+        print(f"\nScratch site: {site}", file=sys.stderr)
+    else:
+        shutil.rmtree(site)
+    errors = sum(not ok for _operation, _token, ok, _seconds in results)
+    sys.exit(0 if integrity["ok"] and not errors else 1)
+
+
+if __name__ == "__main__":
+    main()
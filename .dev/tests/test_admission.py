@@ -0,0 +1,122 @@
+"""
+Test cases for per-route-class admission control.
+"""
+
+import json
+import threading
+
+import pytest
+from werkzeug.test import Client
+
+import admission
+
+
+def _environ(path, method="GET"):
+    return {"PATH_INFO": path, "REQUEST_METHOD": method}
+
+
+class TestClassification:
+    """Test mapping of requests to route classes."""
+
+    @pytest.mark.parametrize(
+        "path,method,expected",
+        [
+            ("/", "GET", "page"),
+            ("/module/3", "GET", "page"),
+            ("/view/module1_theory.html", "GET", "page"),
+            ("/static/css/style.css", "GET", "asset"),
+            ("/static_files/training_material/x.png", "GET", "asset"),
+            ("/download/module1_exercise.R", "GET", "asset"),
+            ("/download_module/2", "GET", "heavy"),
+            ("/download_certificate", "POST", "heavy"),
+            ("/convert/2/advs_demo.csv", "GET", "heavy"),
+            ("/admin/data", "GET", "heavy"),
+            ("/send_contact_message", "POST", "write"),
+            ("/health", "GET", None),
+            ("/admin/admission", "GET", None),
+        ],
+    )
+    def test_classify(self, path, method, expected):
+        assert admission.classify(_environ(path, method)) == expected
+
+    def test_parse_limits_overrides_defaults(self):
+        limits = admission.parse_limits("heavy=4:8, asset=10")
+        assert limits["heavy"] == (4, 8)
+        assert limits["asset"] == (10, admission.DEFAULT_LIMITS["asset"][1])
+        assert limits["page"] == admission.DEFAULT_LIMITS["page"]
+
+    def test_defaults_fill_procfile_worker_threads(self):
+        slots = sum(sum(limit) for limit in admission.DEFAULT_LIMITS.values())
+        assert slots == admission.WORKER_THREADS
+        with open("Procfile", encoding="utf-8") as f:
+            command = f.read().split()
+        assert "gthread" in command
+        threads = command[command.index("--threads") + 1]
+        assert int(threads) == admission.WORKER_THREADS
+
+    def test_parse_limits_rejects_unknown_class(self):
+        with pytest.raises(ValueError):
+            admission.parse_limits("video=2")
+
+
+class TestLoadShedding:
+    """Test bounded concurrency, queueing and fast rejection."""
+
+    def _blocking_app(self, release):
+        def wsgi_app(environ, start_response):
+            if environ["PATH_INFO"].startswith("/download_module/"):
+                release.wait(5)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"ok"]
+
+        return wsgi_app
+
+    def test_saturated_class_sheds_while_pages_respond(self):
+        release = threading.Event()
+        middleware = admission.AdmissionMiddleware(
+            self._blocking_app(release),
+            {"page": (1, 0), "asset": (1, 0), "heavy": (1, 0), "write": (1, 0)},
+            queue_timeout=0.1,
+            retry_after=7,
+        )
+        client = Client(middleware)
+        worker = threading.Thread(target=client.get, args=("/download_module/1",))
+        worker.start()
+        try:
+            while middleware.stats()["heavy"]["active"] == 0:
+                pass
+            response = client.get("/download_module/2")
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "7"
+            assert json.loads(response.data)["route_class"] == "heavy"
+
+            assert client.get("/").status_code == 200
+        finally:
+            release.set()
+            worker.join()
+
+        stats = middleware.stats()
+        assert stats["heavy"]["active"] == 0
+        assert stats["heavy"]["rejected"] == 1
+        assert client.get("/download_module/3").status_code == 200
+
+    def test_queued_request_is_admitted_when_slot_frees(self):
+        route_class = admission.RouteClass("heavy", concurrency=1, queue=1)
+        assert route_class.acquire(timeout=0)
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(route_class.acquire(5)))
+        waiter.start()
+        while route_class.stats()["waiting"] == 0:
+            pass
+        assert route_class.acquire(timeout=0) is False  # queue is full
+        route_class.release()
+        waiter.join()
+        assert admitted == [True]
+        assert route_class.stats()["active"] == 1
+
+    def test_admission_stats_endpoint(self, client):
+        assert client.get("/").status_code == 200
+        stats = json.loads(client.get("/admin/admission").data)
+        assert set(stats) == {"page", "asset", "heavy", "write"}
+        assert stats["page"]["active"] == 0
+        assert stats["heavy"]["concurrency"] >= 1
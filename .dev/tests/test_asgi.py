@@ -0,0 +1,160 @@
+"""
+Test cases for the ASGI entry point.
+"""
+
+import asyncio
+
+import pytest
+
+import asgi
+from app import admission_control
+
+
+def http_scope(path, method="GET", headers=(), query=b""):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query,
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+
+
+def asgi_request(path, method="GET", headers=(), body=b"", query=b""):
+    """Run one request through the ASGI app; return (status, headers, chunks)."""
+    messages = []
+    received = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if received:
+            return received.pop(0)
+        # Like a server, report nothing more until the client goes away
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = http_scope(path, method, headers, query)
+    asyncio.run(asgi.app(scope, receive, send))
+    start = messages[0]
+    chunks = [m["body"] for m in messages[1:] if m["body"]]
+    assert messages[-1]["more_body"] is False
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], response_headers, chunks
+
+
+QUARTO_JS = (
+    "/static_files/training_material/module 1 - intro/"
+    "module1_theory_files/libs/quarto-html/quarto.js"
+)
+PARITY_URLS = [
+    "/download/module1_exercise.R",
+    "/download_module/1",
+    "/view/module1_exercise.R",
+    "/view/module1_theory.qmd",
+    QUARTO_JS,
+    "/static/css/styles.css",
+    "/download/not_a_file.R",
+]
+
+
+class TestAsgi:
+    """The ASGI app must answer exactly like the WSGI app."""
+
+    @pytest.mark.parametrize("url", PARITY_URLS)
+    def test_parity_with_wsgi(self, client, url):
+        status, headers, chunks = asgi_request(url)
+        expected = client.get(url)
+        assert status == expected.status_code
+        assert headers.get("content-type") == expected.headers.get("Content-Type")
+        if url.startswith("/download_module/"):
+            # Zip entries carry timestamps; compare the archive size instead
+            assert abs(len(b"".join(chunks)) - len(expected.data)) < 64
+        else:
+            assert b"".join(chunks) == expected.data
+
+    def test_file_streamed_in_chunks_and_slot_released(self, monkeypatch):
+        monkeypatch.setattr(asgi, "CHUNK_BYTES", 1024)
+        status, headers, chunks = asgi_request(QUARTO_JS)
+        assert status == 200
+        assert len(chunks) > 1
+        assert sum(map(len, chunks)) == int(headers["content-length"])
+        assert admission_control.stats()["asset"]["active"] == 0
+
+    def test_conditional_and_post(self):
+        url = "/download/module1_exercise.R"
+        _status, headers, _chunks = asgi_request(url)
+        status, _headers, chunks = asgi_request(
+            url, headers=[("If-None-Match", headers["etag"])]
+        )
+        assert status == 304 and chunks == []
+
+        status, _headers, chunks = asgi_request(
+            "/api/progress/sync",
+            method="POST",
+            headers=[("Content-Type", "application/json")],
+            body=b'{"learner_id": "bad"}',
+        )
+        assert status == 400
+        assert b"Invalid learner id" in b"".join(chunks)
+
+    def test_lazy_start_response_with_empty_body(self, monkeypatch):
+        def lazy_app(environ, start_response):
+            yield b""
+            start_response("204 No Content", [("X-Lazy", "yes")])
+
+        def silent_app(environ, start_response):
+            yield b""
+
+        monkeypatch.setattr(asgi.flask_app, "wsgi_app", lazy_app)
+        status, headers, chunks = asgi_request("/")
+        assert (status, headers["x-lazy"], chunks) == (204, "yes", [])
+
+        monkeypatch.setattr(asgi.flask_app, "wsgi_app", silent_app)
+        status, _headers, chunks = asgi_request("/")
+        assert status == 500
+
+    def test_stops_streaming_when_client_disconnects(self, monkeypatch):
+        monkeypatch.setattr(asgi, "CHUNK_BYTES", 1024)
+        sent = []
+        first_chunk = asyncio.Event()
+
+        async def receive():
+            if not sent:
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await first_chunk.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body"):
+                first_chunk.set()
+
+        asyncio.run(asgi.app(http_scope(QUARTO_JS), receive, send))
+        chunks = [m for m in sent if m.get("body")]
+        assert 1 <= len(chunks) <= 2
+        assert sent[-1].get("more_body") is True
+        assert admission_control.stats()["asset"]["active"] == 0
+
+    def test_send_failure_closes_body(self, monkeypatch):
+        monkeypatch.setattr(asgi, "CHUNK_BYTES", 1024)
+        sent = []
+
+        async def receive():
+            if not sent:
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message.get("body"):
+                raise OSError("connection reset")
+            sent.append(message)
+
+        asyncio.run(asgi.app(http_scope(QUARTO_JS), receive, send))
+        assert len(sent) == 1
+        assert admission_control.stats()["asset"]["active"] == 0
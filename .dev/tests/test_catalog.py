@@ -0,0 +1,114 @@
+"""
+Test cases for the externalized course catalog.
+"""
+
+import html
+import json
+import os
+import re
+
+import pytest
+
+import app as app_module
+import catalog
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def catalog_data():
+    with open("catalog.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestCatalog:
+    """Test catalog validation, derived data and hot reload."""
+
+    def test_derived_data(self, catalog_data):
+        loaded = catalog.Catalog(catalog_data)
+        assert list(loaded.modules) == list(range(1, 8))
+        module = loaded.modules[1]
+        assert module["download_name"] == "module1_rstudio_&_environment_setup.zip"
+        assert (module["files"]["exercise"], f"module1_{module['files']['exercise']}") in (
+            module["zip_entries"]
+        )
+        assert loaded.module_titles[0] == module["title"]
+        with pytest.raises(TypeError):
+            module["title"] = "changed"
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda d: d.pop("modules"),
+            lambda d: d["modules"].update({"zero": d["modules"]["1"]}),
+            lambda d: d["modules"]["1"].update({"objectives": []}),
+            lambda d: d["modules"]["1"].update({"objectives": ["Goal"] * 9}),
+            lambda d: d["modules"]["1"].update({"files": {"theory": 3}}),
+            lambda d: d["bonus_resources"]["sas_cheatsheet"].pop("icon"),
+        ],
+    )
+    def test_invalid_catalogs_rejected(self, catalog_data, change):
+        change(catalog_data)
+        with pytest.raises(catalog.CatalogError):
+            catalog.Catalog(catalog_data)
+
+    def test_reload_on_change_keeps_last_good(self, tmp_path, catalog_data, monkeypatch):
+        monkeypatch.setattr(catalog, "CHECK_INTERVAL", 0)
+        path = tmp_path / "catalog.json"
+        _write(path, catalog_data)
+        store = catalog.CatalogStore(str(path))
+        modules = catalog.LiveMapping(store, "modules")
+
+        catalog_data["modules"]["1"]["title"] = "Renamed"
+        _write(path, catalog_data)
+        os.utime(path, ns=(1, 1))
+        assert modules[1]["title"] == "Renamed"
+
+        path.write_text("{not json", encoding="utf-8")
+        os.utime(path, ns=(2, 2))
+        assert store.snapshot().modules[1]["title"] == "Renamed"
+
+        path.write_bytes(b'{"modules": "\xff"}')
+        os.utime(path, ns=(3, 3))
+        assert store.snapshot().modules[1]["title"] == "Renamed"
+        _write(path, {"modules": {"1": ["not", "an", "object"]}})
+        os.utime(path, ns=(4, 4))
+        assert store.snapshot().modules[1]["title"] == "Renamed"
+
+    def test_new_module_uses_generic_page(
+        self, client, tmp_path, catalog_data, monkeypatch
+    ):
+        catalog_data["modules"]["8"] = dict(catalog_data["modules"]["1"], title="New")
+        path = tmp_path / "catalog.json"
+        _write(path, catalog_data)
+        store = catalog.CatalogStore(str(path))
+        monkeypatch.setattr(app_module, "catalog_store", store)
+
+        response = client.get("/module/8")
+        assert response.status_code == 200
+        page = response.get_data(as_text=True)
+        assert "New - TransitionR" in page
+        assert 'data-module-id="8"' in page
+        # main.js takes the module list and objective counts from the catalog
+        attribute = re.search(r"data-course-modules='([^']*)'", page).group(1)
+        counts = json.loads(html.unescape(attribute))
+        assert list(counts) == [str(i) for i in range(1, 9)] and counts["8"] == 5
+
+    def test_validate_catalog_command(self, runner, tmp_path, catalog_data):
+        result = runner.invoke(args=["validate-catalog"])
+        assert result.exit_code == 0
+        assert "7 modules" in result.output
+
+        path = tmp_path / "broken.json"
+        _write(path, {"modules": {}})
+        result = runner.invoke(args=["validate-catalog", str(path)])
+        assert result.exit_code == 1
+
+        # Progress tracking has room for 8 objectives per module
+        catalog_data["modules"]["2"]["objectives"] += ["Extra"] * 9
+        _write(path, catalog_data)
+        result = runner.invoke(args=["validate-catalog", str(path)])
+        assert result.exit_code == 1
+        assert "module 2: at most 8 objectives" in result.output
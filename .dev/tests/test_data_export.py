@@ -0,0 +1,133 @@
+"""
+Test cases for the streaming data exports.
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import data_export
+import rating_events
+
+MESSAGES = """# Contact Messages Log
+#
+=== MESSAGE 2025-01-05 10:00:00 ===
+Name: Ada Lovelace
+Email: ada@example.com
+Subject: Hello
+Message:
+First line
+Note: still the message
+==================================================
+
+=== MESSAGE 2025-02-10 09:30:00 ===
+Name: Alan Turing
+Email: alan@example.com
+Subject: Question
+Message:
+Second
+==================================================
+
+"""
+
+
+@pytest.fixture
+def messages_log(tmp_path, monkeypatch):
+    path = tmp_path / "contact_messages.txt"
+    path.write_text(MESSAGES, encoding="utf-8")
+    dataset = data_export.Dataset(str(path), data_export.DATASETS["messages"].columns)
+    monkeypatch.setitem(data_export.DATASETS, "messages", dataset)
+    return path
+
+
+@pytest.fixture
+def ratings_log(tmp_path, monkeypatch):
+    path = tmp_path / "course_ratings.txt"
+    dataset = data_export.Dataset(str(path), data_export.DATASETS["ratings"].columns)
+    monkeypatch.setitem(data_export.DATASETS, "ratings", dataset)
+    return path
+
+
+class TestDataExport:
+    """Test record parsing, range filtering and the export route."""
+
+    def test_multiline_message_parsed(self, messages_log):
+        first, second = data_export.records("messages")
+        assert first.fields["name"] == "Ada Lovelace"
+        assert first.fields["message"] == "First line\nNote: still the message"
+        assert second.time == "2025-02-10 09:30:00"
+
+    def test_date_range_uses_index(self, messages_log, monkeypatch):
+        monkeypatch.setattr(data_export, "INDEX_STRIDE", 1)
+        since = data_export.parse_bound("2025-02-01")
+        until = data_export.parse_bound("2025-02-10", end_of_day=True)
+        (record,) = data_export.records("messages", since, until)
+        assert record.fields["name"] == "Alan Turing"
+        index = data_export.offset_index(str(messages_log))
+        # Scanning starts at the first block that can hold a match
+        assert index.start_offset(since) == index.entries[1][1] == record.offset
+
+        # Appends extend the index instead of rebuilding it
+        with open(messages_log, "a", encoding="utf-8") as f:
+            f.write("=== MESSAGE 2025-03-01 08:00:00 ===\nName: Grace\n")
+            f.write("=" * 50 + "\n")
+        assert len(list(data_export.records("messages", since))) == 2
+        assert len(index.entries) == 3
+
+    def test_out_of_order_records_in_range(self, messages_log, monkeypatch):
+        monkeypatch.setattr(data_export, "INDEX_STRIDE", 1)
+        with open(messages_log, "a", encoding="utf-8") as f:
+            f.write("=== MESSAGE 2025-01-20 08:00:00 ===\nName: Grace\n")
+            f.write("=" * 50 + "\n")
+        since = data_export.parse_bound("2025-01-15")
+        until = data_export.parse_bound("2025-01-31", end_of_day=True)
+        (record,) = data_export.records("messages", since, until)
+        assert record.fields["name"] == "Grace"
+        since = data_export.parse_bound("2025-02-11")
+        assert list(data_export.records("messages", since)) == []
+
+    def test_superseded_rating_revisions_collapsed(self, ratings_log):
+        events = [
+            {"id": "rating-0001", "rating": 4},
+            {"id": "rating-0002", "rating": 5},
+            {"id": "rating-0001", "rating": 4, "revision": 2, "feedback": "Great"},
+        ]
+        with open(ratings_log, "w", encoding="utf-8") as f:
+            for event in events:
+                (parsed,) = rating_events.parse_events([event]).values()
+                f.write(rating_events.format_entry(parsed, "2025-03-01 10:00:00"))
+        rows = data_export.records("ratings")
+        assert [(row.fields["event"], row.kind) for row in rows] == [
+            ("rating-0002/1", "rating"),
+            ("rating-0001/2", "feedback update"),
+        ]
+
+    def test_invalid_date_rejected(self, client):
+        response = client.get("/admin/export/ratings.csv?since=yesterday")
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+    def test_csv_export(self, client, messages_log):
+        response = client.get("/admin/export/messages.csv?until=2025-01-31")
+        assert response.status_code == 200
+        assert response.mimetype == "text/csv"
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0] == list(data_export.DATASETS["messages"].columns)
+        assert [row[1] for row in rows[1:]] == ["Ada Lovelace"]
+
+    def test_gzip_ndjson_export(self, client, messages_log):
+        response = client.get(
+            "/admin/export/messages.ndjson", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        lines = gzip.decompress(response.get_data()).decode().splitlines()
+        assert [json.loads(line)["email"] for line in lines] == [
+            "ada@example.com",
+            "alan@example.com",
+        ]
+
+    def test_unknown_dataset(self, client):
+        assert client.get("/admin/export/secrets.csv").status_code == 404
@@ -0,0 +1,81 @@
+"""
+Test cases for responsive figure variants.
+"""
+
+import os
+
+import pytest
+
+import cache_dirs
+import image_variants
+
+FIGURE_URL = (
+    "/static_files/training_material/module 1 - intro/"
+    "module1_solution_files/figure-html/unnamed-chunk-8-1.png"
+)
+FIGURE_PATH = FIGURE_URL[len("/static_files/") :]
+
+
+@pytest.fixture(autouse=True)
+def image_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_variants, "IMAGE_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestVariants:
+    """Test encoding and caching of figure variants."""
+
+    def test_png_size_is_read_from_header(self):
+        assert image_variants.png_size(FIGURE_PATH) == (1344, 960)
+        assert image_variants.variant_widths(1344) == [480, 672, 1344]
+
+    def test_variants_are_downsized_and_cached_by_hash(self, image_cache):
+        from PIL import Image
+
+        path, mimetype = image_variants.variant(FIGURE_PATH, 500, "webp")
+        assert mimetype == "image/webp"
+        assert os.path.dirname(path) == str(image_cache)
+        assert os.path.basename(path).startswith(cache_dirs.content_hash(FIGURE_PATH))
+        with Image.open(path) as image:
+            assert image.width == 672  # rounded up to the next offered width
+        assert os.path.getsize(path) < os.path.getsize(FIGURE_PATH)
+
+        mtime = os.path.getmtime(path)
+        assert image_variants.variant(FIGURE_PATH, 672, "webp")[0] == path
+        assert os.path.getmtime(path) == mtime
+
+    def test_full_size_png_is_served_unchanged(self):
+        assert image_variants.variant(FIGURE_PATH, None, "png") == (
+            FIGURE_PATH,
+            "image/png",
+        )
+
+
+class TestFigureRoutes:
+    """Test content negotiation and srcset markup."""
+
+    def test_best_format_from_accept(self, client):
+        response = client.get(
+            FIGURE_URL + "?w=480", headers={"Accept": "image/webp,*/*"}
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert "Accept" in response.headers["Vary"]
+
+        response = client.get(FIGURE_URL, headers={"Accept": "*/*"})
+        assert response.mimetype == "image/png"
+        assert len(response.data) == os.path.getsize(FIGURE_PATH)
+
+    def test_rendered_figures_get_srcset_and_lazy_loading(self, client):
+        html = client.get("/view/module1_solution.html").get_data(as_text=True)
+        encoded = FIGURE_URL.replace(" ", "%20")
+        assert f'srcset="{encoded}?w=480 480w, {encoded}?w=672 672w, {encoded} 1344w"' in html
+        assert 'sizes="(max-width: 672px) 100vw, 672px"' in html
+        assert 'loading="lazy"' in html
+
+    def test_non_figure_images_are_only_lazy_loaded(self):
+        content = '<img src="/static/images/logo.png" alt="logo">'
+        assert image_variants.responsive_images(content) == (
+            '<img src="/static/images/logo.png" alt="logo" '
+            'loading="lazy" decoding="async">'
+        )
@@ -0,0 +1,76 @@
+"""
+Test cases for the link and asset integrity checker.
+"""
+
+import json
+
+from flask import Flask
+
+import app as app_module
+import link_check
+import usage_stats
+
+
+def tiny_site():
+    site = Flask("tiny")
+
+    @site.route("/docs/page")
+    def page():
+        return (
+            '<a href="other#top">ok</a> <img src="/missing.png" alt="">'
+            '<img srcset="/img?w=1 1x, /img?w=2 2x"> <a href="#local">a</a>'
+            '<a href="https://example.org/">out</a> <a href="mailto:a@b.c">m</a>'
+            "<script>el.innerHTML = '<a href=\"/nowhere\">';</script>"
+        )
+
+    @site.route("/docs/other")
+    @site.route("/img")
+    def other():
+        return "plain", 200, {"Content-Type": "text/plain"}
+
+    return site.wsgi_app
+
+
+class TestLinkCheck:
+    """Test reference extraction, resolution and the report."""
+
+    def test_references_resolved_against_page(self):
+        found, external = link_check.references(
+            "/view/doc.html",
+            '<link rel="stylesheet" href="doc_files/a.css?v=1">'
+            '<a href="../download/x.R#L3">x</a><a href="//cdn.example/x.js">',
+        )
+        urls = [ref.url for ref in found]
+        assert urls == ["/view/doc_files/a.css?v=1", "/download/x.R"]
+        assert external == 1
+
+    def test_broken_reference_reported_with_referrer(self):
+        report = link_check.LinkChecker(tiny_site(), jobs=4).check(["/docs/page"])
+        assert report["ok"] is False
+        assert report["documents"] == 1 and report["external"] == 1
+        assert report["references"] == 4
+        (broken,) = report["broken"]
+        assert broken["url"] == "/missing.png" and broken["status"] == 404
+        assert broken["referrers"] == [
+            {"page": "/docs/page", "tag": "img", "attribute": "src"}
+        ]
+        missing = link_check.LinkChecker(tiny_site()).check([], [("module 9", "x.R")])
+        assert missing["missing_files"] == [{"owner": "module 9", "path": "x.R"}]
+
+    def test_rendered_document_through_app(self, tmp_path, monkeypatch):
+        counters = usage_stats.UsageCounters(str(tmp_path / "usage.sqlite3"))
+        monkeypatch.setattr(app_module, "usage_counters", counters)
+        checker = link_check.LinkChecker(app_module.admission_control.wsgi_app)
+        report = checker.check(
+            ["/view/module1_theory.html", "/download/module1_exercise.R"]
+        )
+        assert report["ok"] is True, report["broken"]
+        assert report["documents"] == 1 and report["checked"] > 10
+        # Crawls are not counted as learner downloads or views
+        assert counters.flush() == 0
+
+    def test_cli_json_report(self, runner):
+        result = runner.invoke(args=["check-links", "--json"])
+        report = json.loads(result.output)
+        assert report["routes"] > 0 and report["missing_files"] == []
+        assert result.exit_code == (0 if report["ok"] else 1)
@@ -0,0 +1,124 @@
+"""
+Test cases for the service worker and its precache manifest.
+"""
+
+import hashlib
+import json
+import time
+
+import pytest
+
+import app as app_module
+import precache
+
+
+@pytest.fixture
+def manifest_store(tmp_path, monkeypatch):
+    store = precache.ManifestStore(
+        str(tmp_path / "precache-manifest.json"), app_module._precache_store().build
+    )
+    monkeypatch.setattr(app_module, "_precache_store", lambda: store)
+    return store
+
+
+class TestServiceWorker:
+    """Test offline support routes."""
+
+    def test_service_worker_served_from_root(self, client):
+        response = client.get("/sw.js")
+        assert response.status_code == 200
+        assert response.mimetype == "application/javascript"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert b"/precache-manifest.json" in response.data
+        assert b"request.mode === 'navigate'" in response.data
+
+    def test_manifest_groups_and_revisions(self, client, manifest_store):
+        manifest_store.refresh()
+        response = client.get("/precache-manifest.json")
+        assert response.status_code == 200
+        manifest = response.get_json()
+
+        shell = [entry["url"] for entry in manifest["shell"]]
+        assert "/" in shell and "/static/js/main.js" in shell
+        # Its flash messages must never come from the cache
+        assert "/contact" not in shell
+        assert set(manifest["modules"]) == {str(i) for i in range(1, 8)}
+
+        module1 = {entry["url"]: entry["revision"] for entry in manifest["modules"]["1"]}
+        assert "/module/1" in module1
+        assert "/view/module1_theory.qmd" in module1
+        assert "/download/module1_exercise.R" in module1
+        assets = [url for url in module1 if url.startswith("/static_files/")]
+        assert any(url.endswith("quarto.js") for url in assets)
+        assert not any(url.endswith(".map") for url in assets)
+
+        url = "/download/module1_exercise.R"
+        assert module1[url] == hashlib.sha256(client.get(url).data).hexdigest()
+
+    def test_manifest_is_conditional(self, client, manifest_store):
+        manifest_store.refresh()
+        etag = client.get("/precache-manifest.json").headers["ETag"]
+        response = client.get("/precache-manifest.json", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_manifest_built_off_the_request_path(
+        self, client, tmp_path, monkeypatch
+    ):
+        builds = []
+        store = precache.ManifestStore(
+            str(tmp_path / "manifest.json"),
+            lambda: builds.append(1) or {"version": "v1", "sources": [0, 0]},
+            check_interval=3600,
+        )
+        monkeypatch.setattr(app_module, "_precache_store", lambda: store)
+        response = client.get("/precache-manifest.json")
+        assert response.status_code == 503 and response.headers["Retry-After"]
+        deadline = time.monotonic() + 5
+        while client.get("/precache-manifest.json").status_code == 503:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert json.loads((tmp_path / "manifest.json").read_text())["version"] == "v1"
+        # Within the check interval the stored copy is served without rebuilding
+        assert store.get()["version"] == "v1" and builds == [1]
+
+    def test_refresh_rebuilds_only_when_sources_change(self, tmp_path):
+        builds = []
+
+        def build():
+            builds.append(1)
+            sources = list(precache.fingerprint())
+            return {"version": f"v{len(builds)}", "sources": sources}
+
+        store = precache.ManifestStore(str(tmp_path / "manifest.json"), build)
+        assert store.refresh()["version"] == "v1"
+        assert store.refresh()["version"] == "v1"
+        assert store.refresh(force=True)["version"] == "v2"
+
+    def test_failed_fetch_keeps_previous_manifest(self, tmp_path):
+        broken = {9: {"title": "Missing", "files": {"theory": "gone/module9.qmd"}}}
+        builds = [{"version": "v1", "sources": [0, 0]}]
+
+        def build():
+            if builds:
+                return builds.pop()
+            return precache.build_manifest(
+                app_module.app,
+                broken,
+                {},
+                wsgi_app=app_module.admission_control.wsgi_app,
+            )
+
+        store = precache.ManifestStore(str(tmp_path / "manifest.json"), build)
+        assert store.refresh(force=True)["version"] == "v1"
+        with pytest.raises(precache.PrecacheError, match="/module/9 answered HTTP 404"):
+            store.refresh(force=True)
+        assert store.get()["version"] == "v1"
+
+    def test_build_precache_command(self, runner, manifest_store):
+        result = runner.invoke(args=["build-precache"])
+        assert result.exit_code == 0 and "Precache manifest:" in result.output
+        assert manifest_store.get()["modules"]["1"]
+
+    def test_pages_register_service_worker(self, client):
+        script = client.get("/static/js/main.js").get_data(as_text=True)
+        assert "navigator.serviceWorker.register('/sw.js')" in script
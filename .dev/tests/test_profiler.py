@@ -0,0 +1,71 @@
+"""
+Test cases for the slow-request sampling profiler.
+"""
+
+import time
+
+from flask import Flask
+
+import profiler
+
+
+def _slow_app(request_profiler):
+    slow_app = Flask(__name__)
+    request_profiler.install(slow_app)
+
+    @slow_app.route("/slow/<int:seconds_ms>")
+    def slow(seconds_ms):
+        deadline = time.monotonic() + seconds_ms / 1000
+        while time.monotonic() < deadline:
+            time.sleep(0.002)
+        return "done"
+
+    return slow_app
+
+
+class TestProfiler:
+    """Test sampling, ring buffers and the admin endpoints."""
+
+    def test_slow_requests_sampled_per_route(self):
+        request_profiler = profiler.Profiler(
+            threshold=0.02, interval=0.005, buffer_size=2
+        )
+        client = _slow_app(request_profiler).test_client()
+
+        client.get("/slow/1")
+        assert request_profiler.profiles() == []
+
+        for _ in range(3):
+            client.get("/slow/150")
+        profiles = request_profiler.profiles("/slow/<int:seconds_ms>")
+        assert len(profiles) == 2  # Bounded per route
+        assert profiles[-1].reason == "threshold"
+        assert profiles[-1].duration >= 0.15
+        assert any("slow (test_profiler.py)" in stack for stack in profiles[-1].samples)
+
+        for line in request_profiler.collapsed().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+        assert ";slow (test_profiler.py)" in request_profiler.collapsed()
+
+    def test_random_sampling(self):
+        request_profiler = profiler.Profiler(
+            threshold=None, sample_rate=1.0, interval=0.005
+        )
+        client = _slow_app(request_profiler).test_client()
+        client.get("/slow/50")
+        (profile,) = request_profiler.profiles()
+        assert profile.reason == "random"
+
+    def test_disabled_profiler_installs_nothing(self):
+        request_profiler = profiler.Profiler(threshold=None, sample_rate=0)
+        slow_app = _slow_app(request_profiler)
+        assert not slow_app.before_request_funcs
+
+    def test_admin_endpoints(self, client):
+        summary = client.get("/admin/profiles").get_json()
+        assert summary["threshold_ms"] == 1000
+        assert isinstance(summary["routes"], dict)
+        response = client.get("/admin/profiles/flamegraph?route=/view/<path:filename>")
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
@@ -0,0 +1,147 @@
+"""
+Test cases for the server-side learner progress store and sync API.
+"""
+
+import json
+
+import pytest
+
+import app as app_module
+import progress_store
+from app import MODULES
+
+LEARNER = "learner-0001"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return progress_store.ProgressStore(str(tmp_path / "progress.sqlite3"), MODULES)
+
+
+@pytest.fixture
+def progress_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "PROGRESS_DB", str(tmp_path / "progress.sqlite3"))
+
+
+def _toggle(module_id, item_id, checked=True, timestamp=1000):
+    return {
+        "module_id": module_id,
+        "item_id": item_id,
+        "checked": checked,
+        "timestamp": timestamp,
+    }
+
+
+class TestProgressStore:
+    """Test bitset storage and conflict resolution."""
+
+    def test_sync_packs_and_decodes_progress(self, store):
+        progress, rejected = store.sync(
+            LEARNER, [_toggle(1, 1), _toggle(1, 3), _toggle(7, 5)]
+        )
+        assert rejected == []
+        assert progress[1] == [1, 3]
+        assert progress[7] == [5]
+        assert progress[2] == []
+        assert store.load(LEARNER) == progress
+
+    def test_older_toggle_does_not_override_newer(self, store):
+        store.sync(LEARNER, [_toggle(2, 2, checked=False, timestamp=2000)])
+        progress, _ = store.sync(LEARNER, [_toggle(2, 2, timestamp=1000)])
+        assert progress[2] == []
+
+        progress, _ = store.sync(LEARNER, [_toggle(2, 2, timestamp=3000)])
+        assert progress[2] == [2]
+
+    def test_batch_is_applied_in_timestamp_order(self, store):
+        progress, _ = store.sync(
+            LEARNER,
+            [_toggle(3, 1, checked=False, timestamp=20), _toggle(3, 1, timestamp=10)],
+        )
+        assert progress[3] == []
+
+    def test_invalid_input_is_rejected(self, store):
+        with pytest.raises(progress_store.ProgressError):
+            store.sync("../etc", [])
+        with pytest.raises(progress_store.ProgressError):
+            store.sync(LEARNER, {"module_id": 1})
+
+    def test_bad_toggles_are_skipped_individually(self, store):
+        toggles = [
+            _toggle(99, 1),
+            _toggle(1, 9),
+            _toggle(1, 1, checked="false"),
+            _toggle(1, 2, timestamp=-1),
+            _toggle(1, 3, timestamp=2**64),
+            _toggle(True, 1),
+            "1:1",
+            _toggle(1, 4),
+        ]
+        progress, rejected = store.sync(LEARNER, toggles)
+        assert [index for index, _message in rejected] == list(range(7))
+        assert progress[1] == [4]
+
+    def test_cohort_summary_counts_columns(self, store):
+        every_objective = [
+            _toggle(module_id, item_id)
+            for module_id, module in MODULES.items()
+            for item_id in range(1, len(module["objectives"]) + 1)
+        ]
+        store.sync("learner-complete", every_objective)
+        store.sync("learner-partial", [_toggle(1, 1), _toggle(1, 2)])
+        store.sync("learner-module1", [_toggle(1, i) for i in range(1, 6)])
+
+        summary = store.cohort_summary()
+        assert summary["learners"] == 3
+        assert summary["course_completed"] == 1
+        module1 = summary["modules"][1]
+        assert module1["learners_completed"] == 2
+        assert module1["per_objective"] == [3, 3, 2, 2, 2]
+        assert module1["objectives_completed"] == 12
+        assert summary["modules"][2]["learners_completed"] == 1
+
+
+class TestProgressRoutes:
+    """Test the batched sync endpoint and admin aggregate."""
+
+    def test_sync_endpoint_round_trip(self, client, progress_db):
+        response = client.post(
+            "/api/progress/sync",
+            data=json.dumps({"learner_id": LEARNER, "toggles": [_toggle(4, 2)]}),
+            content_type="application/json",
+        )
+        data = json.loads(response.data)
+        assert data["success"] is True
+        assert data["progress"]["4"] == [2]
+
+        data = json.loads(client.get(f"/api/progress/{LEARNER}").data)
+        assert data["progress"]["4"] == [2]
+
+    def test_sync_endpoint_reports_bad_toggles(self, client, progress_db):
+        toggles = [{"module_id": 1}, _toggle(1, 2)]
+        response = client.post(
+            "/api/progress/sync",
+            data=json.dumps({"learner_id": LEARNER, "toggles": toggles}),
+            content_type="application/json",
+        )
+        data = json.loads(response.data)
+        assert data["success"] is True and data["progress"]["1"] == [2]
+        assert [entry["index"] for entry in data["rejected"]] == [0]
+
+        response = client.post(
+            "/api/progress/sync",
+            data=json.dumps({"learner_id": 42, "toggles": []}),
+            content_type="application/json",
+        )
+        assert response.status_code == 400
+        assert json.loads(response.data)["success"] is False
+
+    def test_admin_progress_summary(self, client, progress_db):
+        client.post(
+            "/api/progress/sync",
+            data=json.dumps({"learner_id": LEARNER, "toggles": [_toggle(1, 1)]}),
+            content_type="application/json",
+        )
+        summary = json.loads(client.get("/admin/progress").data)
+        assert summary["learners"] == 1
+        assert summary["modules"]["1"]["per_objective"][0] == 1
@@ -0,0 +1,139 @@
+"""
+Test cases for QMD chunk parsing and the exercise/solution diff view.
+"""
+
+import os
+
+import code_diff
+import qmd_chunks
+import tangle
+
+SOLUTION = """---
+title: "Solution"
+---
+
+```{r setup, include=FALSE, fig.cap="a, b"}
+#| echo: false
+library(dplyr)
+```
+
+```python
+print("not R")
+```
+
+````markdown
+```{r}
+not_a_chunk()
+```
+````
+
+```{r}
+dm <- tibble(AGE = c(28, 45))
+dm
+```
+"""
+
+EXERCISE = """library(dplyr)
+
+dm <- # YOUR CODE HERE
+dm
+"""
+
+
+class TestChunks:
+    """Test chunk extraction and diff alignment."""
+
+    def test_parse_chunks(self):
+        setup, second = qmd_chunks.parse_chunks(SOLUTION)
+        assert setup.label == "setup"
+        assert setup.options == {"include": "FALSE", "fig.cap": "a, b", "echo": "false"}
+        assert setup.line == 7
+        assert setup.code == ["library(dplyr)"]
+        assert second.label is None
+        assert second.code[0].startswith("dm <- tibble")
+
+    def test_diff_rows_keep_source_lines(self):
+        rows, chunks = code_diff.diff_rows(EXERCISE, SOLUTION)
+        assert chunks == 2
+        assert [row.right for row in rows if row.tag == "chunk"] == ["setup", "chunk 2"]
+        changed = [row for row in rows if row.tag == "replace"]
+        assert changed[0].left == "dm <- # YOUR CODE HERE"
+        assert changed[0].right_line == 21
+        equal = [row.left for row in rows if row.tag == "equal"]
+        assert "library(dplyr)" in equal and "dm" in equal
+
+    def test_diff_cached_by_content(self, tmp_path):
+        exercise = tmp_path / "exercise.R"
+        solution = tmp_path / "solution.qmd"
+        exercise.write_text(EXERCISE)
+        solution.write_text(SOLUTION)
+        first = code_diff.module_diff(str(exercise), str(solution))
+        # Touched but unchanged files reuse the computed diff
+        os.utime(exercise, (1, 1))
+        again = code_diff.module_diff(str(exercise), str(solution))
+        assert again is first
+
+    def test_diff_cache_is_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(code_diff._diffs, "maxsize", 2)
+        exercise = tmp_path / "exercise.R"
+        solution = tmp_path / "solution.qmd"
+        solution.write_text(SOLUTION)
+        keys = []
+        for version in range(4):
+            exercise.write_text(f"{EXERCISE}# version {'x' * version}\n")
+            keys.append(code_diff.module_diff(str(exercise), str(solution)).key)
+        assert code_diff._diffs.keys() == keys[-2:]
+
+    def test_diff_view(self, client):
+        response = client.get("/module/1/diff")
+        assert response.status_code == 200
+        assert b"module1_exercise.R" in response.data
+        etag = response.headers["ETag"]
+        cached = client.get("/module/1/diff", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert client.get("/module/99/diff").status_code == 404
+
+
+class TestTangle:
+    """Test purl-style R script downloads."""
+
+    def test_tangle_headers_and_eval_false(self):
+        theory = "```r\nx <- 1\n```\n\n```{r skip, purl=FALSE}\nhidden()\n```\n"
+        solution = "```{r check, eval=FALSE}\nstop()\n\n```\n"
+        script = tangle.tangle("Module 9", [("t.qmd", theory), ("s.qmd", solution)])
+        assert script.startswith("# Module 9\n")
+        assert "x <- 1" in script
+        assert "hidden()" not in script
+        assert "## ----check, eval=FALSE---" in script
+        assert "# stop()\n#\n" in script
+
+    def test_build_all_fills_cache(self):
+        from app import MODULES
+
+        digests = tangle.build_all(MODULES, jobs=2)
+        assert set(digests) == set(MODULES)
+        assert set(digests.values()) <= set(tangle._scripts.keys())
+
+    def test_script_cache_is_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tangle._scripts, "maxsize", 2)
+        theory = tmp_path / "theory.qmd"
+        keys = []
+        for version in range(4):
+            theory.write_text(f"{SOLUTION}\n```r\nx <- {'1' * (version + 1)}\n```\n")
+            key, _script = tangle.module_script("Module 9", (str(theory),))
+            keys.append(key)
+        assert tangle._scripts.keys() == keys[-2:]
+
+    def test_download_script(self, client):
+        response = client.get("/download_script/2")
+        assert response.status_code == 200
+        assert "module2_code.R" in response.headers["Content-Disposition"]
+        script = response.get_data(as_text=True)
+        assert "# ==== module2_theory.qmd ====" in script
+        assert "# ==== module2_solution.qmd ====" in script
+        assert "ae_raw <- data.frame(" in script
+        cached = client.get(
+            "/download_script/2", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert cached.status_code == 304
+        assert client.get("/download_script/99").status_code == 404
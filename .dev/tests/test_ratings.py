@@ -0,0 +1,122 @@
+"""
+Test cases for bulk, idempotent rating ingestion.
+"""
+
+import json
+
+import pytest
+
+import app as app_module
+import data_export
+import rating_events
+
+
+@pytest.fixture
+def rating_log(tmp_path, monkeypatch):
+    log = rating_events.RatingLog(str(tmp_path / "course_ratings.txt"))
+    monkeypatch.setattr(app_module, "_rating_log", lambda: log)
+    return log
+
+
+def event(revision=1, rating=4, feedback="", event_id="rating-0001"):
+    return {
+        "id": event_id,
+        "revision": revision,
+        "rating": rating,
+        "feedback": feedback,
+        "timestamp": "2025-11-09T12:00:00.000Z",
+    }
+
+
+class TestRatingLog:
+    """Test deduplication and the append-only log format."""
+
+    def test_resent_and_stale_revisions_dropped(self, rating_log):
+        assert rating_log.ingest([event(1), event(2, rating=5)]) == (1, 1)
+        assert rating_log.ingest([event(2, rating=5)]) == (0, 1)
+        assert rating_log.ingest([event(1)]) == (0, 1)
+        assert rating_log.ingest([event(3, feedback="Great\ncourse")]) == (1, 0)
+
+        records = list(data_export.iter_records(rating_log.path))
+        assert [(r.kind, r.fields["rating"]) for r in records] == [
+            ("rating", 5),
+            ("feedback update", 4),
+        ]
+        assert records[1].fields["feedback"] == "Great course"
+        assert records[1].fields["event"] == "rating-0001/3"
+
+    def test_workers_share_recorded_revisions(self, rating_log):
+        other_worker = rating_events.RatingLog(rating_log.path)
+        second = event(event_id="rating-0002")
+        assert rating_log.ingest([event()]) == (1, 0)
+        assert other_worker.ingest([event(), second]) == (1, 1)
+        assert rating_log.ingest([second]) == (0, 1)
+
+    def test_rewritten_log_rescanned(self, rating_log):
+        second = event(event_id="rating-0002")
+        rating_log.ingest([event(), second])
+        # The legacy update path rewrites the file, dropping an entry
+        (kept,) = rating_events.parse_events([event()]).values()
+        with open(rating_log.path, "w", encoding="utf-8") as f:
+            f.write(rating_events.format_entry(kept, "2025-11-09 12:00:00"))
+        assert rating_log.ingest([event(), second]) == (1, 1)
+
+    def test_rewritten_longer_log_rescanned(self, rating_log):
+        second = event(event_id="rating-0002")
+        rating_log.ingest([event()])
+        # A rewrite that grows the file must not resume from the old offset
+        (kept,) = rating_events.parse_events([second]).values()
+        legacy = "=== FEEDBACK UPDATE 2025-11-09 12:00:00 ===\nFeedback: "
+        with open(rating_log.path, "w", encoding="utf-8") as f:
+            f.write(rating_events.format_entry(kept, "2025-11-09 12:00:00"))
+            f.write(legacy + "x" * 500 + "\n" + "=" * 30 + "\n\n")
+        assert rating_log.ingest([second]) == (0, 1)
+        assert rating_log.ingest([event()]) == (1, 0)
+
+    @pytest.mark.parametrize(
+        "events",
+        [
+            None,
+            [event(rating=6)],
+            [event(revision=0)],
+            [event(event_id="bad id")],
+            [event(feedback="x" * (rating_events.MAX_FEEDBACK + 1))],
+            [event()] * (rating_events.MAX_EVENTS + 1),
+        ],
+    )
+    def test_invalid_batches(self, rating_log, events):
+        with pytest.raises(rating_events.RatingError):
+            rating_log.ingest(events)
+
+
+class TestBulkEndpoint:
+    """Test the /api/ratings/bulk route used by fetch and sendBeacon."""
+
+    def test_beacon_body_accepted_once(self, client, rating_log):
+        body = json.dumps({"events": [event()]})
+        results = [{"accepted": 1, "duplicates": 0}, {"accepted": 0, "duplicates": 1}]
+        for expected in results:
+            # sendBeacon may send a Blob without a JSON content type
+            response = client.post(
+                "/api/ratings/bulk", data=body, content_type="text/plain"
+            )
+            assert response.status_code == 200
+            assert response.get_json() == {"success": True, **expected}
+
+    def test_invalid_batch_rejected(self, client, rating_log):
+        response = client.post("/api/ratings/bulk", json={"events": [event(rating=0)]})
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+    def test_legacy_update_shares_the_log(self, client, rating_log):
+        rating_log.ingest([event()])
+        legacy = {"rating": 4, "timestamp": "t1"}
+        client.post("/submit_simple_rating", json=legacy)
+        update = {**legacy, "feedback": "Clear", "isUpdate": True}
+        client.post("/submit_simple_rating", json=update)
+        with open(rating_log.path, encoding="utf-8") as f:
+            content = f.read()
+        # The legacy star rating is replaced; the bulk event is kept
+        assert content.count("=== RATING") == 1
+        assert "Event: rating-0001/1" in content and "Feedback: Clear" in content
+        assert rating_log.ingest([event()]) == (0, 1)
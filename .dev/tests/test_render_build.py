@@ -0,0 +1,118 @@
+"""
+Test cases for the incremental Quarto render scheduler.
+"""
+
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+import render_build
+from app import BONUS_RESOURCES, MODULES
+
+# Stub renderer: "renders" a document by copying its source to the output path
+STUB_RENDER_COMMAND = (
+    f"{shlex.quote(sys.executable)} -c "
+    '"import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])" {source} {output}'
+)
+
+
+def _make_module(tmp_path, name="module9"):
+    source = tmp_path / f"{name}_theory.qmd"
+    output = tmp_path / f"{name}_theory.html"
+    source.write_text("# Theory\n", encoding="utf-8")
+    return {
+        9: {
+            "title": "Test Module",
+            "files": {"theory": str(source), "theory_html": str(output)},
+        }
+    }
+
+
+def _render_one(source, output):
+    """Renderer that times out on the first stub module and copies the rest."""
+    if "module9" in source:
+        raise subprocess.TimeoutExpired("quarto", 1)
+    shutil.copy(source, output)
+
+
+class TestRenderGraph:
+    """Test dependency graph construction from the catalogs."""
+
+    def test_collects_module_and_bonus_targets(self):
+        """Every module theory/solution and rendered bonus page gets a target."""
+        targets = render_build.collect_targets(MODULES, BONUS_RESOURCES)
+        outputs = {target.output for target in targets}
+        assert MODULES[1]["files"]["theory_html"] in outputs
+        assert MODULES[7]["files"]["solution_html"] in outputs
+        assert "bonus_resources/rendered/03_qc_validation_toolkit.html" in outputs
+        # PDFs and Rmd templates are not Quarto renders
+        assert not any(output.endswith(".pdf") for output in outputs)
+
+    def test_bonus_source_strips_number_prefix(self):
+        """Numbered rendered files map back to their unnumbered QMD sources."""
+        targets = render_build.collect_targets({}, BONUS_RESOURCES)
+        sources = {target.output: target.source for target in targets}
+        assert sources["bonus_resources/rendered/01_R_vs_SAS_CheatSheet.html"] == (
+            os.path.join("bonus_resources", "source", "R_vs_SAS_CheatSheet.qmd")
+        )
+
+    def test_include_shortcodes_are_dependencies(self, tmp_path):
+        """Files pulled in with {{< include >}} make the output stale too."""
+        modules = _make_module(tmp_path)
+        source = modules[9]["files"]["theory"]
+        (tmp_path / "_setup.qmd").write_text("setup\n", encoding="utf-8")
+        with open(source, "a", encoding="utf-8") as f:
+            f.write("{{< include _setup.qmd >}}\n")
+
+        (target,) = render_build.collect_targets(modules, {})
+        assert str(tmp_path / "_setup.qmd") in target.dependencies
+
+
+class TestRenderScheduling:
+    """Test stale detection and parallel rendering."""
+
+    def test_missing_output_is_stale(self, tmp_path):
+        (target,) = render_build.collect_targets(_make_module(tmp_path), {})
+        assert render_build.is_stale(target)
+
+    def test_newer_source_is_stale(self, tmp_path):
+        (target,) = render_build.collect_targets(_make_module(tmp_path), {})
+        with open(target.output, "w", encoding="utf-8") as f:
+            f.write("<html></html>")
+        os.utime(target.source, (1000, 1000))
+        os.utime(target.output, (2000, 2000))
+        assert not render_build.is_stale(target)
+
+        os.utime(target.source, (3000, 3000))
+        assert render_build.is_stale(target)
+
+    def test_renders_only_stale_outputs(self, tmp_path):
+        """The stub renderer runs once for stale targets and not again after."""
+        targets = render_build.collect_targets(_make_module(tmp_path), {})
+        stale = render_build.stale_targets(targets)
+        results = render_build.render_all(
+            stale, render_command=STUB_RENDER_COMMAND, jobs=2
+        )
+        assert [result.ok for result in results] == [True]
+        assert os.path.exists(targets[0].output)
+        assert render_build.stale_targets(targets) == []
+
+    def test_failed_render_is_reported(self, tmp_path):
+        (target,) = render_build.collect_targets(_make_module(tmp_path), {})
+        failing = f"{shlex.quote(sys.executable)} -c \"raise SystemExit(3)\""
+        (result,) = render_build.render_all([target], render_command=failing)
+        assert not result.ok
+
+    def test_renderer_error_fails_only_its_target(self, tmp_path):
+        (first,) = render_build.collect_targets(_make_module(tmp_path), {})
+        (second,) = render_build.collect_targets(_make_module(tmp_path, "other"), {})
+        results = render_build.render_all([first, second], render_command=_render_one)
+        assert [result.ok for result in results] == [False, True]
+        assert "timed out" in results[0].log
+
+    def test_cli_dry_run_lists_without_rendering(self, runner):
+        result = runner.invoke(args=["build-renders", "--dry-run"])
+        assert result.exit_code == 0
+        assert "rendered documents are stale" in result.output
@@ -0,0 +1,198 @@
+"""
+Test cases for rendered HTML document handling (/view).
+"""
+
+import rendered_html
+
+SAMPLE = """<html><head>
+<script src="/static_files/docs/a b/quarto.js"></script>
+<link href="/static_files/docs/a b/bootstrap.min.css" rel="stylesheet" id="quarto-bootstrap">
+<link href="https://fonts.example.com/font.css" rel="stylesheet">
+<link rel="icon" href="/favicon.ico">
+<script type="application/json" data-for="widget">{"x": 1}</script>
+<script>console.log("inline")</script>
+</head><body>
+<script src="/static_files/docs/late.js"></script>
+</body></html>"""
+
+
+class TestAssetReferences:
+    """Test parsing of render-blocking asset references."""
+
+    def test_only_head_scripts_and_stylesheets(self):
+        assert rendered_html.asset_references(SAMPLE) == [
+            ("/static_files/docs/a b/quarto.js", "script"),
+            ("/static_files/docs/a b/bootstrap.min.css", "style"),
+            ("https://fonts.example.com/font.css", "style"),
+        ]
+
+    def test_preload_header_is_same_origin_and_encoded(self):
+        header = rendered_html.preload_header(rendered_html.asset_references(SAMPLE))
+        assert header == (
+            "</static_files/docs/a%20b/quarto.js>; rel=preload; as=script, "
+            "</static_files/docs/a%20b/bootstrap.min.css>; rel=preload; as=style"
+        )
+
+    def test_preload_header_is_capped(self):
+        references = [(f"/static_files/{i}.js", "script") for i in range(40)]
+        header = rendered_html.preload_header(references, limit=5)
+        assert header.count("rel=preload") == 5
+
+
+class TestPreloadHeaders:
+    """Test Link headers and Early Hints on /view."""
+
+    def test_view_sends_link_preload_header(self, client):
+        response = client.get("/view/module4_theory.qmd")
+        assert response.status_code == 200
+        link = response.headers["Link"]
+        assert "module4_theory_files/libs/quarto-html/quarto.js>; rel=preload; as=script" in link
+        assert "rel=preload; as=style" in link
+
+    def test_early_hints_sent_when_server_supports_them(self, client):
+        hints = []
+        response = client.get(
+            "/view/module1_theory.html",
+            environ_base={"wsgi.early_hints": hints.append},
+        )
+        assert response.status_code == 200
+        assert hints == [[("Link", response.headers["Link"])]]
+
+
+REACTABLE_LIBS = (
+    "/static_files/training_material/module 4 - dates_text/"
+    "module4_theory_files/libs/reactable-0.4.4/"
+)
+
+
+class TestAssetSlimming:
+    """Test exclusion of unused bundles and lazy widget loading."""
+
+    def test_source_maps_and_server_bundles_are_not_served(self, client):
+        assert client.get(REACTABLE_LIBS + "reactable.server.js").status_code == 404
+        assert client.get(REACTABLE_LIBS + "reactable.js.map").status_code == 404
+        assert client.get(REACTABLE_LIBS + "reactable.css").status_code == 200
+        response = client.get(
+            "/view_files/module 4 - dates_text/module4_theory_files/libs/"
+            "reactable-0.4.4/reactable.server.js.map"
+        )
+        assert response.status_code == 404
+
+    def test_widget_scripts_are_deferred(self, client):
+        html = client.get("/view/module4_theory.qmd").get_data(as_text=True)
+        assert 'type="text/lazy-widget"' in html
+        assert '<script src="/static_files/training_material/module 4' in html
+        assert "htmlwidgets.js\"></script>" in html
+        assert '<script src="' + REACTABLE_LIBS not in html
+        assert "IntersectionObserver" in html
+
+    def test_deferred_scripts_are_not_preloaded(self, client):
+        link = client.get("/view/module4_theory.qmd").headers["Link"]
+        assert "htmlwidgets" not in link
+        assert "reactable-binding" not in link
+
+    def test_documents_without_widgets_are_unchanged(self):
+        content = '<html><body><script src="/x/libs/react-17.0.0/react.min.js"></script></body></html>'
+        assert rendered_html.defer_widget_scripts(content) == (content, [])
+
+    def test_asset_report_lists_savings(self, runner):
+        result = runner.invoke(args=["asset-report"])
+        assert result.exit_code == 0
+        module4 = next(
+            line for line in result.output.splitlines() if line.startswith("module4_theory")
+        )
+        assert module4.split()[1] != "0"
+
+
+class TestCriticalCss:
+    """Test above-the-fold CSS inlining."""
+
+    def test_only_matching_rules_and_used_variables_are_kept(self):
+        import critical_css
+
+        rules = critical_css.parse_rules(
+            ":root{--bs-blue:#00f;--bs-link:var(--bs-blue);--bs-unused:url('a;b')}"
+            "a{color:var(--bs-link)}a:hover{color:red}.navbar{display:flex}"
+            "[data-bs-theme=dark]{color:#fff}"
+            "@media (min-width: 992px){.title,.sidebar{margin:0}}"
+            "@font-face{font-family:x}"
+        )
+        tokens = critical_css.used_tokens('<body><h1 class="title"><a href="#">x</a></h1>')
+        assert critical_css.critical_rules(rules, tokens) == (
+            ":root{--bs-blue:#00f;--bs-link:var(--bs-blue);}"
+            "a{color:var(--bs-link)}"
+            "@media (min-width: 992px){.title,.sidebar{margin:0}}"
+        )
+
+    def test_view_inlines_critical_css_and_loads_stylesheets_async(self, client):
+        html = client.get("/view/module1_theory.html").get_data(as_text=True)
+        assert '<style id="critical-css">' in html
+        assert "rel=\"preload\" as=\"style\" onload=\"this.onload=null;this.rel='stylesheet'\"" in html
+        assert '<noscript><link href="/static_files/' in html
+        assert 'id="quarto-bootstrap"' in html
+
+    def test_asset_report_shows_source_and_served_html(self, runner):
+        result = runner.invoke(args=["asset-report"])
+        assert result.exit_code == 0
+        assert "HTML source" in result.output and "inline CSS" in result.output
+        module1 = next(
+            line for line in result.output.splitlines() if line.startswith("module1_theory")
+        )
+        assert module1.split()[9] != "0"  # inline CSS
+
+
+class TestSectionFragments:
+    """Test the heading-section index and fragment endpoints."""
+
+    def test_index_sections_nests_by_heading(self):
+        content = (
+            '<body><section id="top" class="level1"><h1>Top &amp; more</h1>'
+            '<section id="a" class="level2"><h2 class="anchored">A <code>x</code></h2>'
+            "<p>a</p></section>"
+            '<section id="b" class="level2"><h2>B</h2></section></section></body>'
+        )
+        sections = rendered_html.index_sections(content)
+        assert [(s.id, s.level, s.title, s.parent) for s in sections] == [
+            ("top", 1, "Top & more", None),
+            ("a", 2, "A x", "top"),
+            ("b", 2, "B", "top"),
+        ]
+        a = sections[1]
+        assert content[a.start : a.end].endswith("<p>a</p></section>")
+
+    def test_table_of_contents(self, client):
+        data = client.get("/view_sections/module7_solution.qmd").get_json()
+        ids = [section["id"] for section in data["sections"]]
+        assert ids[:3] == [
+            "final-project-from-sdtm-to-tlfs-solution",
+            "step-1-load-raw-data",
+            "step-2-sdtm-domains",
+        ]
+        dm = next(s for s in data["sections"] if s["id"] == "dm")
+        assert dm["parent"] == "step-2-sdtm-domains"
+        assert dm["url"] == "/view_section/dm/module7_solution.qmd"
+        assert any("bootstrap" in url for url in data["stylesheets"])
+
+    def test_section_fragment_is_cacheable(self, client):
+        response = client.get("/view_section/ae-severity-bar-plot/module7_solution.qmd")
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert html.startswith('<section id="ae-severity-bar-plot"')
+        assert 'src="/static_files/training_material/module 7 - qc_reporting/' in html
+
+        cached = client.get(
+            "/view_section/ae-severity-bar-plot/module7_solution.qmd",
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        assert cached.status_code == 304
+
+    def test_shallow_fragment_leaves_out_subsections(self, client):
+        html = client.get(
+            "/view_section/step-2-sdtm-domains/module7_solution.qmd?children=0"
+        ).get_data(as_text=True)
+        assert "SDTM Domains" in html
+        assert 'id="dm"' not in html
+
+    def test_unknown_section_or_document(self, client):
+        assert client.get("/view_section/nope/module7_solution.qmd").status_code == 404
+        assert client.get("/view_sections/missing.qmd").status_code == 404
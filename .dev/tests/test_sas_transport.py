@@ -0,0 +1,166 @@
+"""
+Test cases for the SAS transport (.xpt) conversion.
+"""
+
+import csv
+import io
+import math
+import struct
+
+import pytest
+
+import sas_transport
+
+ADVS = "training_material/module 2 - data_manipulation/output/advs_demo.xpt"
+
+
+def ibm(value, length=8):
+    """IBM float bytes for ``value`` (test helper, the inverse of ibm_to_float)."""
+    if value is None:
+        return b"." + b"\0" * (length - 1)
+    if value == 0:
+        return b"\0" * length
+    exponent = math.floor(math.log(abs(value), 16)) + 1
+    mantissa = round(abs(value) / 16**exponent * 2**56)
+    if mantissa >= 2**56:
+        exponent, mantissa = exponent + 1, mantissa >> 4
+    first = (0x80 if value < 0 else 0) | (exponent + 64)
+    return (bytes([first]) + mantissa.to_bytes(7, "big"))[:length]
+
+
+def card(text):
+    return text.encode().ljust(80)
+
+
+def header(name, digits="0" * 30):
+    return card(f"HEADER RECORD*******{name:<8}HEADER RECORD!!!!!!!{digits}")
+
+
+def v5_member(name, variables, rows):
+    """A version 5 member; ``variables`` are ``(name, numeric, length)``."""
+    out = [
+        header("MEMBER", "000000000000000001600000000140"),
+        header("DSCRPTR"),
+        card(f"SAS     {name:<8}SASDATA 9.4     X64_10PR" + " " * 24),
+        card(" " * 32 + f"{name} label"),
+        header("NAMESTR", f"000000{len(variables):04d}" + "0" * 20),
+    ]
+    namestrs = b""
+    position = 0
+    for number, (var_name, numeric, length) in enumerate(variables, 1):
+        ntype = 1 if numeric else 2
+        namestrs += struct.pack(">hhhh8s", ntype, 0, length, number, var_name.encode())
+        namestrs += b" " * 48 + b"\0" * 8 + b" " * 8 + b"\0" * 4
+        namestrs += struct.pack(">l52s", position, b"")
+        position += length
+    out.append(namestrs + b" " * (-len(namestrs) % 80))
+    out.append(header("OBS"))
+    data = b"".join(rows)
+    out.append(data + b" " * (-len(data) % 80))
+    return b"".join(out)
+
+
+def v5_library(*members):
+    return b"".join(
+        [header("LIBRARY"), card("SAS     SAS     SASLIB  9.4"), card("")]
+        + list(members)
+    )
+
+
+class TestDecoding:
+    """Test IBM float conversion and the transport file layout."""
+
+    @pytest.mark.parametrize(
+        "value", [1.0, -118.625, 0.1, 1e-5, 123456789.0, -2.5e10, 64.0]
+    )
+    def test_ibm_to_float(self, value):
+        assert sas_transport.ibm_to_float(ibm(value)) == value
+
+    def test_missing_and_truncated(self):
+        assert sas_transport.ibm_to_float(b".\0\0\0\0\0\0\0") is None
+        assert sas_transport.ibm_to_float(b"A\0\0\0\0\0\0\0") is None  # .A
+        assert sas_transport.ibm_to_float(b"\0" * 8) == 0.0
+        assert sas_transport.ibm_to_float(ibm(12.5, 3)) == 12.5
+
+    def test_version5_members_chunks_and_padding(self, tmp_path, monkeypatch):
+        variables = [("ID", False, 3), ("VALUE", True, 8)]
+        rows = [f"{i:<3}".encode() + ibm(i / 4 if i % 5 else None) for i in range(50)]
+        path = tmp_path / "lib.xpt"
+        path.write_bytes(
+            v5_library(
+                v5_member("VITALS", variables, rows),
+                # 3-byte rows: the blank padding of the last card is not data
+                v5_member("CODES", [("CODE", False, 3)], [b"A  ", b"B  "]),
+            )
+        )
+        monkeypatch.setattr(sas_transport, "CHUNK_BYTES", 11 * 8)
+
+        vitals, codes = sas_transport.members(str(path))
+        assert (vitals.name, vitals.label, vitals.rows) == (
+            "VITALS",
+            "VITALS label",
+            50,
+        )
+        assert (codes.name, codes.rows) == ("CODES", 2)
+
+        chunks = list(sas_transport.iter_chunks(str(path), vitals))
+        assert len(chunks) == 7 and sum(map(len, chunks)) == 50
+        text = b"".join(sas_transport.csv_chunks(str(path), vitals)).decode()
+        table = list(csv.reader(io.StringIO(text)))
+        assert table[:3] == [["ID", "VALUE"], ["0", ""], ["1", "0.25"]]
+        assert table[5] == ["4", "1"]
+
+    def test_not_a_transport_file(self, tmp_path):
+        path = tmp_path / "notes.xpt"
+        path.write_bytes(b"not sas" * 40)
+        with pytest.raises(sas_transport.TransportError):
+            sas_transport.members(str(path))
+
+    def test_course_dataset_version8(self):
+        (member,) = sas_transport.members(ADVS)
+        assert (member.name, member.label, member.rows) == (
+            "advs_demo",
+            "Vital Signs",
+            8207,
+        )
+        kinds = {v.name: sas_transport.kind(v) for v in member.variables}
+        assert kinds["ADT"] == "date" and kinds["AVAL"] == "number"
+        first = next(sas_transport.iter_chunks(ADVS, member))[0]
+        row = dict(zip(kinds, first))
+        assert row["USUBJID"] == "01-701-1015"
+        assert str(row["ADT"]) == row["VSDTC"] == "2013-12-26"
+
+
+class TestConversionRoutes:
+    """Test the dataset listing and the cached CSV conversion."""
+
+    def test_listing(self, client):
+        data = client.get("/module/2/datasets").get_json()
+        names = [dataset["name"] for dataset in data["datasets"]]
+        assert names == ["adsl_demo", "advs_demo", "ae_demo", "ex_demo"]
+        assert data["datasets"][1]["downloads"]["csv"] == "/convert/2/advs_demo.csv"
+        assert client.get("/module/99/datasets").status_code == 404
+
+    def test_csv_streamed_then_cached(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(sas_transport, "XPT_CACHE_DIR", str(tmp_path))
+        url = "/convert/2/advs_demo.csv"
+
+        first = client.get(url)
+        assert first.status_code == 200 and first.is_streamed
+        assert first.headers["Content-Disposition"].endswith("advs_demo.csv")
+        assert first.data.count(b"\n") == 8207 + 1
+        cached = list(tmp_path.iterdir())
+        assert len(cached) == 1 and cached[0].read_bytes() == first.data
+
+        second = client.get(url)
+        assert second.data == first.data
+        assert second.headers["ETag"] == first.headers["ETag"]
+        etag = first.headers["ETag"]
+        not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+
+    def test_unknown_dataset_and_parquet_unavailable(self, client, monkeypatch):
+        assert client.get("/convert/2/adae.csv").status_code == 404
+        assert client.get("/convert/2/ae_demo.csv?member=nope").status_code == 404
+        monkeypatch.setattr(sas_transport, "parquet_available", lambda: False)
+        assert client.get("/convert/2/ae_demo.parquet").status_code == 404
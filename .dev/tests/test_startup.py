@@ -0,0 +1,83 @@
+"""
+Test cases for application start-up cost.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+import cache_dirs
+from app import JINJA_CACHE_DIR
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class TestColdStart:
+    """Heavy subsystems must stay out of the import path."""
+
+    def test_import_does_not_load_heavy_modules(self):
+        lazy = (
+            "reportlab",
+            "render_build",
+            "static_export",
+            "PIL",
+            "critical_css",
+            "precache",
+            "progress_store",
+            "rating_events",
+            "tangle",
+        )
+        probe = (
+            "import json, sys, threading, app; "
+            f"loaded = [m for m in {lazy!r} if m in sys.modules]; "
+            "threads = [t.name for t in threading.enumerate() if t.daemon]; "
+            "print(json.dumps(loaded + threads))"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Neither modules for rare routes nor the script prebuild thread pool
+        assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
+
+    def test_certificate_still_generated_with_lazy_reportlab(
+        self, client, tmp_path, monkeypatch
+    ):
+        monkeypatch.chdir(tmp_path)
+        os.makedirs("data")
+        response = client.post(
+            "/download_certificate", data={"name": "Ada", "surname": "Lovelace"}
+        )
+        assert response.status_code == 200
+        assert response.data.startswith(b"%PDF")
+        assert "Ada Lovelace" in (tmp_path / "data" / "course_completers.txt").read_text(
+            encoding="utf-8"
+        )
+
+    def test_templates_use_bytecode_cache(self, client):
+        client.get("/")
+        assert any(name.startswith("__jinja2_") for name in os.listdir(JINJA_CACHE_DIR))
+
+
+class TestCacheDirectories:
+    """Caches must live in directories only the app can write to."""
+
+    def test_default_is_private_app_directory(self):
+        assert not JINJA_CACHE_DIR.startswith(tempfile.gettempdir())
+        assert os.stat(JINJA_CACHE_DIR).st_mode & 0o777 == 0o700
+
+    def test_directory_writable_by_others_is_refused(self, tmp_path):
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        with pytest.raises(cache_dirs.CacheDirError):
+            cache_dirs.ensure_private(str(shared))
+        created = cache_dirs.ensure_private(str(tmp_path / "new" / "cache"))
+        assert os.stat(created).st_mode & 0o777 == 0o700
@@ -0,0 +1,83 @@
+"""
+Test cases for the static-site export.
+"""
+
+import json
+import os
+import re
+from urllib.parse import unquote
+
+import app as app_module
+import static_export
+from app import BONUS_RESOURCES, MODULES, app
+
+
+class TestStaticExport:
+    """Test route discovery and the exported directory tree."""
+
+    def test_collect_routes_covers_catalog(self):
+        routes = static_export.collect_routes(MODULES, BONUS_RESOURCES)
+        assert "/" in routes
+        assert "/module/7" in routes
+        assert "/view/module4_theory.qmd" in routes
+        assert "/download/copilot_prompt_library.pdf" in routes
+        # Dynamic routes stay with Flask
+        assert "/contact" not in routes
+        assert len(routes) == len(set(routes))
+
+    def test_export_writes_pages_assets_and_nginx_snippet(self, tmp_path):
+        modules = {1: MODULES[1]}
+        summary = static_export.export_site(app, modules, {}, str(tmp_path), jobs=4)
+
+        assert summary["skipped"] == []
+        assert (tmp_path / "index.html").exists()
+        assert (tmp_path / "module" / "1" / "index.html").exists()
+
+        view = (tmp_path / "view" / "module1_theory.html").read_text(encoding="utf-8")
+        assert "/static_files/training_material/module 1 - intro/" in view
+
+        asset = tmp_path.joinpath(
+            "static_files",
+            "training_material",
+            "module 1 - intro",
+            "module1_theory_files",
+            "libs",
+            "quarto-html",
+            "quarto.js",
+        )
+        assert asset.exists()
+        assert (tmp_path / "static" / "js" / "main.js").exists()
+
+        routes = json.loads((tmp_path / "routes.json").read_text(encoding="utf-8"))
+        assert any(route["url"] == "/download_module/1" for route in routes)
+        nginx = (tmp_path / "nginx.conf").read_text(encoding="utf-8")
+        assert 'location = "/view/module1_theory.qmd"' in nginx
+
+    def test_identical_assets_are_hard_linked(self, tmp_path):
+        """The per-document copies of the same Quarto library are stored once."""
+        summary = static_export.export_site(app, {1: MODULES[1]}, {}, str(tmp_path))
+        assert summary["saved_bytes"] > 0
+
+        libs = tmp_path.joinpath("static_files", "training_material", "module 1 - intro")
+        theory = libs / "module1_theory_files" / "libs" / "quarto-html" / "quarto.js"
+        solution = libs / "module1_solution_files" / "libs" / "quarto-html" / "quarto.js"
+        if theory.read_bytes() == solution.read_bytes():
+            assert os.path.samefile(theory, solution)
+
+    def test_figure_variants_exported_as_files(self, tmp_path):
+        summary = static_export.export_site(
+            app_module.app,
+            {6: MODULES[6]},
+            {},
+            str(tmp_path),
+            wsgi_app=app_module.admission_control.wsgi_app,
+        )
+        assert summary["skipped"] == []
+        view = (tmp_path / "view" / "module6_theory.html").read_text(encoding="utf-8")
+        srcsets = re.findall(r'srcset="([^"]+)"', view)
+        assert srcsets and not any("?w=" in srcset for srcset in srcsets)
+
+        variant = unquote(srcsets[0].split(",")[0].split()[0])
+        assert re.search(r"\.w\d+\.png$", variant)
+        exported = tmp_path.joinpath(*variant.lstrip("/").split("/"))
+        assert exported.read_bytes().startswith(b"\x89PNG")
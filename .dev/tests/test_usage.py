@@ -0,0 +1,71 @@
+"""
+Test cases for the download and view counters.
+"""
+
+import pytest
+
+import app as app_module
+import precache
+import static_export
+import usage_stats
+
+
+@pytest.fixture
+def counters(tmp_path, monkeypatch):
+    counters = usage_stats.UsageCounters(str(tmp_path / "usage.sqlite3"))
+    monkeypatch.setattr(app_module, "usage_counters", counters)
+    return counters
+
+
+class TestUsageCounters:
+    """Test in-memory counting, batched flushes and the admin view."""
+
+    def test_module_attribution(self):
+        assert usage_stats.module_for("module3_exercise.R") == "3"
+        assert usage_stats.module_for("module 6 - sdtm/module6_files/libs/a.js") == "6"
+        assert usage_stats.module_for("01_R_vs_SAS_CheatSheet.html") is None
+
+    def test_workers_merge_into_one_store(self, tmp_path):
+        path = str(tmp_path / "usage.sqlite3")
+        workers = [usage_stats.UsageCounters(path) for _ in range(2)]
+        for worker in workers:
+            worker.hit("download", "module2_demo.R")
+            worker.hit("download", "module2_demo.R")
+        workers[0].hit("download", "cheatsheet.pdf")
+        assert workers[0].top("download") == []  # Nothing flushed yet
+
+        assert [worker.flush() for worker in workers] == [3, 2]
+        top = workers[1].top("download")
+        assert top == [("module2_demo.R", 4), ("cheatsheet.pdf", 1)]
+        assert workers[1].top("module") == [("2", 4)]
+        (bucket,) = workers[1].buckets("download", key="module2_demo.R")
+        assert bucket[0] % usage_stats.BUCKET_SECONDS == 0 and bucket[1] == 4
+
+    def test_routes_counted(self, client, counters):
+        assert client.get("/download/module1_exercise.R").status_code == 200
+        assert client.get("/download_module/1").status_code == 200
+        client.get("/download/does_not_exist.R")
+
+        usage = client.get("/admin/usage?kind=download").get_json()
+        assert usage["top"] == [{"key": "module1_exercise.R", "count": 1}]
+        assert sum(bucket["count"] for bucket in usage["buckets"]) == 1
+
+        modules = client.get("/admin/usage?bucket=day").get_json()
+        assert modules["top"] == [{"key": "1", "count": 2}]
+
+    def test_only_pages_and_documents_count_toward_modules(self, tmp_path):
+        counters = usage_stats.UsageCounters(str(tmp_path / "usage.sqlite3"))
+        counters.hit("static", "module 6 - sdtm/module6_files/libs/a.js")
+        counters.hit("page", "module6", module="6")
+        counters.hit("view", "module6_theory.html")
+        counters.flush()
+        assert counters.top("module") == [("6", 2)]
+
+    def test_internal_crawls_not_counted(self, tmp_path, counters):
+        modules = {1: app_module.MODULES[1]}
+        precache.build_manifest(app_module.app, modules, {})
+        static_export.export_site(app_module.app, modules, {}, str(tmp_path / "out"))
+        assert counters.flush() == 0
+
+    def test_invalid_bucket(self, client, counters):
+        assert client.get("/admin/usage?bucket=week").status_code == 400
@@ -0,0 +1,229 @@
+"""
+Admission control for the WSGI app, per class of route.
+
+Every request is classified as a cheap ``page``, a static ``asset``, a
+``heavy`` compute request (module zips, certificate PDFs, dataset
+conversions, admin reports) or a ``write``. Each class gets its own
+bounded concurrency and bounded wait queue, so a storm of downloads can
+only fill the heavy/asset slots while pages stay responsive. When a class
+is saturated the request is refused immediately with ``503`` and
+``Retry-After`` instead of tying up a worker.
+
+Limits apply per worker process, so they only take effect with threaded
+workers, where one process serves many requests at once. A sync worker
+handles one request at a time and never reaches any limit. The defaults
+are sized for the Procfile deployment, ``gunicorn --worker-class gthread
+--threads 32``: the slots and queues of all classes add up to the 32
+threads of a worker, so a saturated class sheds its excess instead of
+taking threads from the others. Raise them together with ``--threads``.
+"""
+
+import json
+import threading
+
+# Threads per worker the default limits are sized for (see the Procfile)
+WORKER_THREADS = 32
+# class name: (max concurrent requests, max queued requests)
+DEFAULT_LIMITS = {
+    "page": (8, 8),
+    "asset": (4, 4),
+    "heavy": (2, 2),
+    "write": (2, 2),
+}
+
+# Path prefixes per class; anything not listed is a page (or a write, for
+# non-GET requests). Heavy prefixes are checked first so POST
+# /download_certificate counts as heavy rather than as a write.
+HEAVY_PREFIXES = (
+    "/download_module/",
+    "/download_certificate",
+    "/convert/",
+    "/admin/",
+)
+ASSET_PREFIXES = ("/static/", "/static_files/", "/view_files/", "/download/")
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Never shed these: load balancers and operators must always get an answer
+EXEMPT_PATHS = ("/health", "/admin/admission")
+
+
+def parse_limits(spec):
+    """
+    Parse ``"heavy=4:8,asset=16"`` into a limits dict over the defaults.
+
+    Each entry is ``class=concurrency[:queue]``; unknown classes and
+    malformed entries raise ``ValueError``.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, values = entry.partition("=")
+        name = name.strip()
+        if name not in limits:
+            raise ValueError(f"Unknown route class: {name}")
+        concurrency, _, queue = values.partition(":")
+        limits[name] = (int(concurrency), int(queue) if queue else limits[name][1])
+    return limits
+
+
+def classify(environ):
+    """Return the route class for a request, or None if it is exempt."""
+    path = environ.get("PATH_INFO", "")
+    if path in EXEMPT_PATHS:
+        return None
+    if path.startswith(HEAVY_PREFIXES):
+        return "heavy"
+    if environ.get("REQUEST_METHOD", "GET") not in READ_METHODS:
+        return "write"
+    if path.startswith(ASSET_PREFIXES):
+        return "asset"
+    return "page"
+
+
+class RouteClass:
+    """A bounded pool of request slots with a bounded wait queue."""
+
+    def __init__(self, name, concurrency, queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Take a slot, waiting up to ``timeout`` seconds in the queue."""
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self.active < self.concurrency, timeout
+                )
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "concurrency": self.concurrency,
+                "queue": self.queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+            }
+
+
+def _once(release):
+    lock = threading.Lock()
+    released = []
+
+    def release_once():
+        with lock:
+            if released:
+                return
+            released.append(True)
+        release()
+
+    return release_once
+
+
+def _close_and_release(close, release):
+    try:
+        close()
+    finally:
+        release()
+
+
+class _AdmittedResponse:
+    """Response iterable that frees its slot once exhausted or closed."""
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __iter__(self):
+        yield from self._response
+        self._release()
+
+    def close(self):
+        close = getattr(self._response, "close", lambda: None)
+        _close_and_release(close, self._release)
+
+    def __del__(self):
+        # Safety net for callers that drop the response without closing it
+        self._release()
+
+
+class AdmissionMiddleware:
+    """WSGI middleware applying per-class limits around ``wsgi_app``."""
+
+    def __init__(self, wsgi_app, limits=None, queue_timeout=2.0, retry_after=5):
+        self.wsgi_app = wsgi_app
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.classes = {
+            name: RouteClass(name, concurrency, queue)
+            for name, (concurrency, queue) in (limits or DEFAULT_LIMITS).items()
+        }
+
+    def __call__(self, environ, start_response):
+        route_class = self.classes.get(classify(environ))
+        if route_class is None:
+            return self.wsgi_app(environ, start_response)
+
+        if not route_class.acquire(self.queue_timeout):
+            return self._reject(route_class, start_response)
+
+        try:
+            response = self.wsgi_app(environ, start_response)
+        except BaseException:
+            route_class.release()
+            raise
+        # Hold the slot until the body has been sent (file downloads stream)
+        release = _once(route_class.release)
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if isinstance(file_wrapper, type) and isinstance(response, file_wrapper):
+            # Keep the server's sendfile() path; it closes the wrapper when done
+            inner_close = response.close
+            response.close = lambda: _close_and_release(inner_close, release)
+            return response
+        return _AdmittedResponse(response, release)
+
+    def _reject(self, route_class, start_response):
+        body = json.dumps(
+            {
+                "success": False,
+                "message": "The server is busy, please try again shortly.",
+                "route_class": route_class.name,
+            }
+        ).encode()
+        start_response(
+            "503 Service Unavailable",
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(body))),
+                ("Retry-After", str(self.retry_after)),
+            ],
+        )
+        return [body]
+
+    def stats(self):
+        """Current slot usage, queue depth and rejections per route class."""
+        return {name: cls.stats() for name, cls in self.classes.items()}
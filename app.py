@@ -1,23 +1,36 @@
+import functools
 import io
 import os
+import re
 import sys
+import time
 import zipfile
 from datetime import datetime
 
+import click
 from dotenv import load_dotenv
 from flask import (
     Flask,
+    Response,
     flash,
     jsonify,
+    make_response,
     redirect,
     render_template,
     request,
     send_file,
+    stream_with_context,
     url_for,
 )
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
+from jinja2 import FileSystemBytecodeCache
+
+import admission
+import cache_dirs
+import catalog
+import image_variants
+import profiler
+import rendered_html
+import usage_stats
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,223 +38,177 @@ load_dotenv()
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "clinical-r-transition-2024")
 
-# Module data structure
-MODULES = {
-    1: {
-        "title": "RStudio & Environment Setup",
-        "description": "Learn to install R/RStudio, set up envconfig for environment management, navigate RStudio interface, and get started with GitHub Copilot.",
-        "objectives": [
-            "Install R and RStudio with proper configuration",
-            "Set up envconfig for environment and working directory management",
-            "Navigate RStudio panes and understand R file types",
-            "Load essential packages (dplyr, haven, tibble) for clinical programming",
-            "Understand how to use GitHub Copilot to assist you while coding",
-        ],
-        "files": {
-            "theory": "training_material/module 1 - intro/module1_theory.qmd",
-            "theory_html": "training_material/module 1 - intro/module1_theory.html",
-            "demo": "training_material/module 1 - intro/module1_demo.R",
-            "exercise": "training_material/module 1 - intro/module1_exercise.R",
-            "solution": "training_material/module 1 - intro/module1_solution.qmd",
-            "solution_html": "training_material/module 1 - intro/module1_solution.html",
-        },
-    },
-    2: {
-        "title": "Data Manipulation Basics",
-        "description": "Master fundamental data manipulation using dplyr functions, understand tibbles and data types, and learn how R operations compare to SAS DATA step logic.",
-        "objectives": [
-            "Understand tibbles and R data types (character, numeric, logical, date)",
-            "Use dplyr functions: filter, select, mutate, arrange for data manipulation",
-            "Compare R data wrangling operations with SAS DATA step logic",
-            "Practice deriving clinical variables like elderly flag (age >= 65)",
-            "Apply best practices for readable and efficient data transformations",
-        ],
-        "files": {
-            "theory": "training_material/module 2 - data_manipulation/module2_theory.qmd",
-            "theory_html": "training_material/module 2 - data_manipulation/module2_theory.html",
-            "demo": "training_material/module 2 - data_manipulation/module2_demo.R",
-            "exercise": "training_material/module 2 - data_manipulation/module2_exercise.R",
-            "solution": "training_material/module 2 - data_manipulation/module2_solution.qmd",
-            "solution_html": "training_material/module 2 - data_manipulation/module2_solution.html",
-        },
-    },
-    3: {
-        "title": "Joins and Summaries",
-        "description": "Learn to combine datasets using join operations, create grouped summaries, and generate frequency tables for clinical data analysis.",
-        "objectives": [
-            "Perform join operations using left_join, inner_join, and other dplyr join functions",
-            "Use group_by and summarise to create summary statistics by treatment groups",
-            "Generate frequency tables using count and n functions",
-            "Practice with clinical scenarios: summarizing adverse events by elderly vs non-elderly patients",
-            "Handle missing data and edge cases in join operations",
-        ],
-        "files": {
-            "theory": "training_material/module 3 - joins_summaries/module3_theory.qmd",
-            "theory_html": "training_material/module 3 - joins_summaries/module3_theory.html",
-            "demo": "training_material/module 3 - joins_summaries/module3_demo.R",
-            "exercise": "training_material/module 3 - joins_summaries/module3_exercise.R",
-            "solution": "training_material/module 3 - joins_summaries/module3_solution.qmd",
-            "solution_html": "training_material/module 3 - joins_summaries/module3_solution.html",
-        },
-    },
-    4: {
-        "title": "Date & Text Handling",
-        "description": "Master date conversions, study day calculations, and string manipulation essential for clinical programming and CDISC standards.",
-        "objectives": [
-            "Convert dates using lubridate functions (ymd, dmy, mdy) for clinical data",
-            "Calculate study days (e.g., AESTDY = AESTDTC - RFSTDTC + 1)",
-            "Use stringr functions for text manipulation (str_detect, str_replace, str_trim)",
-            "Practice deriving AESTDY and cleaning adverse event terms",
-            "Handle date/time formats and missing date scenarios in clinical contexts",
-        ],
-        "files": {
-            "theory": "training_material/module 4 - dates_text/module4_theory.qmd",
-            "theory_html": "training_material/module 4 - dates_text/module4_theory.html",
-            "demo": "training_material/module 4 - dates_text/module4_demo.R",
-            "exercise": "training_material/module 4 - dates_text/module4_exercise.R",
-            "solution": "training_material/module 4 - dates_text/module4_solution.qmd",
-            "solution_html": "training_material/module 4 - dates_text/module4_solution.html",
-        },
-    },
-    5: {
-        "title": "Functions & Macro Translation",
-        "description": "Learn to write reusable R functions for clinical programming tasks and translate SAS macros into efficient R code.",
-        "objectives": [
-            "Write custom R functions with proper arguments and return values",
-            "Understand scope, debugging, and documentation for R functions",
-            "Translate simple SAS macros into equivalent R functions",
-            "Use purrr package for functional programming and iteration",
-            "Create reusable functions for common clinical programming tasks",
-        ],
-        "files": {
-            "theory": "training_material/module 5 - functions_macros/module5_theory.qmd",
-            "theory_html": "training_material/module 5 - functions_macros/module5_theory.html",
-            "demo": "training_material/module 5 - functions_macros/module5_demo.R",
-            "exercise": "training_material/module 5 - functions_macros/module5_exercise.R",
-            "solution": "training_material/module 5 - functions_macros/module5_solution.qmd",
-            "solution_html": "training_material/module 5 - functions_macros/module5_solution.html",
-        },
-    },
-    6: {
-        "title": "SDTM Programming with sdtm.oak",
-        "description": "Build CDISC-compliant SDTM domains using the sdtm.oak package, from metadata reading to XPT file export.",
-        "objectives": [
-            "Read study metadata and specifications using readxl",
-            "Load raw clinical datasets using haven and other R packages",
-            "Create SDTM domains using sdtm.oak::create_domain functions",
-            "Apply data transformations, derivations, and post-processing steps",
-            "Export SDTM datasets to XPT format using haven::write_xpt",
-        ],
-        "files": {
-            "theory": "training_material/module 6 - sdtm_programming/module6_theory.qmd",
-            "theory_html": "training_material/module 6 - sdtm_programming/module6_theory.html",
-            "demo": "training_material/module 6 - sdtm_programming/module6_demo.R",
-            "exercise": "training_material/module 6 - sdtm_programming/module6_exercise.R",
-            "solution": "training_material/module 6 - sdtm_programming/module6_solution.qmd",
-            "solution_html": "training_material/module 6 - sdtm_programming/module6_solution.html",
-        },
-    },
-    7: {
-        "title": "Post-Processing, QC & Reporting",
-        "description": "Quality control procedures, report generation, and GitHub Copilot best practices for clinical programming. Future: SAS validation integration.",
-        "objectives": [
-            "Format date/time variables to ISO8601 standards and reorder columns per specifications",
-            "Implement double-programming QC by comparing R outputs against SAS results",
-            "Generate professional tables and reports using gt (future: SAS validation procedures)",
-            "Apply GitHub Copilot best practices for clinical programming workflows",
-            "Understand learning outcomes and plan next steps in R clinical programming journey",
-        ],
-        "files": {
-            "theory": "training_material/module 7 - qc_reporting/module7_theory.qmd",
-            "theory_html": "training_material/module 7 - qc_reporting/module7_theory.html",
-            "demo": "training_material/module 7 - qc_reporting/module7_demo.R",
-            "exercise": "training_material/module 7 - qc_reporting/module7_exercise.R",
-            "solution": "training_material/module 7 - qc_reporting/module7_solution.qmd",
-            "solution_html": "training_material/module 7 - qc_reporting/module7_solution.html",
-        },
-    },
-}
+# Compiled templates are cached on disk so every worker (and every restart)
+# skips recompiling them; the directory is shared by all gunicorn workers.
+# Cached bytecode is executed, so the directory must be private to the app.
+JINJA_CACHE_DIR = cache_dirs.resolve("JINJA_CACHE_DIR", "jinja")
+try:
+    app.jinja_options = {
+        **app.jinja_options,
+        "bytecode_cache": FileSystemBytecodeCache(
+            cache_dirs.ensure_private(JINJA_CACHE_DIR)
+        ),
+    }
+except OSError as e:
+    print(f"Warning: template bytecode cache disabled: {e}")
+
+# Per-route-class concurrency limits, e.g. "heavy=4:8,asset=16:32"
+# (concurrent:queued); saturated classes get a fast 503 with Retry-After
+admission_control = admission.AdmissionMiddleware(
+    app.wsgi_app,
+    admission.parse_limits(os.getenv("ADMISSION_LIMITS", "")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")),
+)
+app.wsgi_app = admission_control
+
+# Stack samples of slow (PROFILE_THRESHOLD_MS) or randomly chosen
+# (PROFILE_SAMPLE_RATE) requests, served by /admin/profiles
+request_profiler = profiler.from_env()
+request_profiler.install(app)
+
+
+@functools.lru_cache(maxsize=None)
+def _rating_log():
+    """Ratings log of this process; records each bulk event revision once"""
+    import rating_events
 
-BONUS_RESOURCES = {
-    "sas_cheatsheet": {
-        "title": "R vs SAS Cheatsheet",
-        "description": "Quick reference comparing SAS and R syntax for data programming",
-        "file": "bonus_resources/rendered/01_R_vs_SAS_CheatSheet.html",
-        "icon": "�",
-    },
-    "sdtm_programming": {
-        "title": "SDTM Programming Guide",
-        "description": "Complete examples for SDTM domain creation with sdtm.oak",
-        "file": "bonus_resources/rendered/02_sdtm_programming_guide.html",
-        "icon": "📊",
-    },
-    "qc_validation": {
-        "title": "QC Validation Toolkit",
-        "description": "Quality control procedures and data validation scripts",
-        "file": "bonus_resources/rendered/03_qc_validation_toolkit.html",
-        "icon": "✓",
-    },
-    "data_manipulation": {
-        "title": "Data Manipulation Examples",
-        "description": "dplyr operations and data manipulation techniques",
-        "file": "bonus_resources/rendered/04_data_manipulation_examples.html",
-        "icon": "📊",
-    },
-    "custom_functions": {
-        "title": "Custom Functions Library",
-        "description": "Reusable R functions and SAS macro translations",
-        "file": "bonus_resources/rendered/05_custom_functions_library.html",
-        "icon": "🔧",
-    },
-    "date_text_functions": {
-        "title": "Date & Text Functions",
-        "description": "lubridate and stringr practical examples",
-        "file": "bonus_resources/rendered/06_date_text_functions.html",
-        "icon": "📅",
-    },
-    "copilot_prompts": {
-        "title": "GitHub Copilot Best Practices",
-        "description": "Effective prompting strategies for R programming with AI",
-        "file": "bonus_resources/copilot_prompt_library.pdf",
-        "icon": "🤖",
-    },
-    "report_template": {
-        "title": "Report Template",
-        "description": "R Markdown template for data analysis reports",
-        "file": "bonus_resources/rendered/report_template.Rmd",
-        "icon": "📄",
-    },
-    "sas_to_r_cheatsheet": {
-        "title": "SAS to R Migration Guide",
-        "description": "Comprehensive guide for transitioning from SAS to R",
-        "file": "bonus_resources/sas_to_r_cheatsheet.pdf",
-        "icon": "🔄",
-    },
+    return rating_events.RatingLog("data/course_ratings.txt")
+
+
+# Download/view counters, flushed in batches to a SQLite file shared by
+# all workers
+usage_counters = usage_stats.UsageCounters(
+    os.getenv("USAGE_DB", "data/usage.sqlite3"),
+    flush_interval=float(os.getenv("USAGE_FLUSH_SECONDS", "10")),
+)
+# Counted endpoints and the kind of use they record
+USAGE_KINDS = {
+    "module_detail": "page",
+    "download_file": "download",
+    "download_module_zip": "module_zip",
+    "view_file": "view",
+    "serve_static_files": "static",
 }
 
+# Server-side learner progress (packed bitsets in SQLite)
+PROGRESS_DB = os.getenv("PROGRESS_DB", "data/progress.sqlite3")
+
+# Numbered bonus resources (e.g. 01_R_vs_SAS_CheatSheet.html)
+NUMBER_PREFIX = re.compile(r"^\d+_")
+
+# Course catalog (modules and bonus resources); edits to the file are
+# picked up without a restart. MODULES/BONUS_RESOURCES are read-only views
+# of the current snapshot.
+CATALOG_PATH = os.getenv("CATALOG_PATH", "catalog.json")
+catalog_store = catalog.CatalogStore(CATALOG_PATH)
+MODULES = catalog.LiveMapping(catalog_store, "modules")
+BONUS_RESOURCES = catalog.LiveMapping(catalog_store, "bonus_resources")
+
+
+@functools.lru_cache(maxsize=None)
+def _precache_store():
+    """Service worker manifest store; rebuilt in the background on changes"""
+    import precache
+
+    return precache.ManifestStore(
+        os.getenv("PRECACHE_MANIFEST", "data/precache-manifest.json"),
+        lambda: precache.build_manifest(
+            app, MODULES, BONUS_RESOURCES, wsgi_app=admission_control.wsgi_app
+        ),
+    )
+
+
+def start_background_builds():
+    """Tangle every module's R script off the request path (PREBUILD_SCRIPTS)"""
+    # Called by the server entry points (gunicorn.conf.py, asgi.py, __main__),
+    # never on import, so CLI commands and tests do not start a thread pool
+    if os.getenv("PREBUILD_SCRIPTS", "true").lower() == "true":
+        import tangle
+
+        tangle.build_in_background(catalog_store.snapshot().modules)
+
+
+@app.context_processor
+def inject_course_modules():
+    """Objective count per catalog module, read by main.js for progress totals"""
+    modules = catalog_store.snapshot().modules
+    return {
+        "course_modules": {
+            str(module_id): len(module["objectives"])
+            for module_id, module in modules.items()
+        }
+    }
+
+
+@app.after_request
+def count_usage(response):
+    kind = USAGE_KINDS.get(request.endpoint)
+    if request.environ.get(usage_stats.INTERNAL_REQUEST):
+        return response
+    if kind and response.status_code < 400:
+        if "module_id" in request.view_args:
+            module_id = str(request.view_args["module_id"])
+            usage_counters.hit(kind, f"module{module_id}", module=module_id)
+        else:
+            usage_counters.hit(kind, request.view_args["filename"])
+    return response
+
 
 @app.route("/")
 def index():
-    return render_template("index.html", modules=MODULES)
+    return render_template("index.html", modules=catalog_store.snapshot().modules)
 
 
 @app.route("/modules")
 def modules():
-    return render_template("modules.html", modules=MODULES)
+    return render_template("modules.html", modules=catalog_store.snapshot().modules)
 
 
 @app.route("/module/<int:module_id>")
 def module_detail(module_id):
-    if module_id not in MODULES:
+    module = catalog_store.snapshot().modules.get(module_id)
+    if module is None:
         return "Module not found", 404
+    # Modules added to the catalog without a page of their own use the
+    # generic template
     return render_template(
-        f"module{module_id}.html", module=MODULES[module_id], module_id=module_id
+        [f"module{module_id}.html", "module_template.html"],
+        module=module,
+        module_id=module_id,
+    )
+
+
+@app.route("/module/<int:module_id>/diff")
+def module_diff(module_id):
+    """Side-by-side diff of the exercise script and the solution's R chunks"""
+    import code_diff
+
+    module = catalog_store.snapshot().modules.get(module_id)
+    if module is None or not all(
+        module["files_exist"].get(kind) for kind in ("exercise", "solution")
+    ):
+        return "Module not found", 404
+
+    exercise, solution = module["files"]["exercise"], module["files"]["solution"]
+    diff = code_diff.module_diff(exercise, solution)
+    response = make_response(
+        render_template(
+            "code_diff.html",
+            module=module,
+            module_id=module_id,
+            diff=diff,
+            exercise=os.path.basename(exercise),
+            solution=os.path.basename(solution),
+        )
     )
+    response.set_etag(diff.key)
+    return response.make_conditional(request)
 
 
 @app.route("/bonus")
 def bonus():
-    return render_template("bonus.html", resources=BONUS_RESOURCES)
+    resources = catalog_store.snapshot().bonus_resources
+    return render_template("bonus.html", resources=resources)
 
 
 @app.route("/contact")
@@ -260,8 +227,6 @@ def _search_training_material(filename):
 
 def _find_pdf_alternative(base_name):
     """Try to find PDF version of the file."""
-    import re
-
     # Try to find PDF version first
     pdf_name = f"{base_name}.pdf"
     pdf_path = os.path.join("bonus_resources", pdf_name)
@@ -269,8 +234,8 @@ def _find_pdf_alternative(base_name):
         return send_file(pdf_path, as_attachment=True)
 
     # Try numbered PDF version (remove number prefix)
-    if re.match(r"^\d+_", base_name):
-        base_without_number = re.sub(r"^\d+_", "", base_name)
+    if NUMBER_PREFIX.match(base_name):
+        base_without_number = NUMBER_PREFIX.sub("", base_name)
         pdf_name_no_number = f"{base_without_number}.pdf"
         pdf_path_no_number = os.path.join("bonus_resources", pdf_name_no_number)
         if os.path.exists(pdf_path_no_number):
@@ -280,11 +245,9 @@ def _find_pdf_alternative(base_name):
 
 def _find_source_files(base_name):
     """Try to find QMD or RMD source files."""
-    import re
-
     # Try numbered source files first (remove number prefix)
-    if re.match(r"^\d+_", base_name):
-        base_without_number = re.sub(r"^\d+_", "", base_name)
+    if NUMBER_PREFIX.match(base_name):
+        base_without_number = NUMBER_PREFIX.sub("", base_name)
 
         # Try QMD source file
         qmd_name = f"{base_without_number}.qmd"
@@ -362,25 +325,129 @@ def download_file(filename):
         return "File not found", 404
 
 
+@app.route("/download_script/<int:module_id>")
+def download_module_script(module_id):
+    """All R code of a module's theory and solution documents as one .R file"""
+    module = catalog_store.snapshot().modules.get(module_id)
+    import tangle
+
+    if module is None or not tangle.module_sources(module):
+        return "Module not found", 404
+
+    digest, script = tangle.script_for(module_id, module)
+    response = send_file(
+        io.BytesIO(script),
+        mimetype="text/x-r-source",
+        as_attachment=True,
+        download_name=f"module{module_id}_code.R",
+    )
+    response.set_etag(digest)
+    return response.make_conditional(request)
+
+
+def _dataset_paths(module):
+    import sas_transport
+
+    directory = os.path.dirname(next(iter(module["files"].values())))
+    return sas_transport.find_datasets(directory)
+
+
+@app.route("/module/<int:module_id>/datasets")
+def module_datasets(module_id):
+    """The module's .xpt outputs with their variables and conversion links"""
+    import sas_transport
+
+    module = catalog_store.snapshot().modules.get(module_id)
+    if module is None:
+        return jsonify({"success": False, "message": "Module not found."}), 404
+
+    formats = ["csv"] + (["parquet"] if sas_transport.parquet_available() else [])
+    datasets = []
+    for name, path in _dataset_paths(module).items():
+        try:
+            members = sas_transport.members(path)
+        except sas_transport.TransportError as e:
+            datasets.append({"name": name, "error": str(e)})
+            continue
+        links = {
+            fmt: url_for("convert_dataset", module_id=module_id, name=name, fmt=fmt)
+            for fmt in formats
+        }
+        datasets.append(
+            {
+                "name": name,
+                "members": [sas_transport.describe(member) for member in members],
+                "downloads": links,
+            }
+        )
+    return jsonify({"success": True, "datasets": datasets})
+
+
+@app.route("/convert/<int:module_id>/<name>.<any(csv, parquet):fmt>")
+def convert_dataset(module_id, name, fmt):
+    """A module's .xpt dataset as CSV (streamed) or Parquet (?member=)"""
+    import sas_transport
+
+    module = catalog_store.snapshot().modules.get(module_id)
+    path = _dataset_paths(module).get(name) if module else None
+    if path is None:
+        return "Dataset not found", 404
+    if fmt == "parquet" and not sas_transport.parquet_available():
+        return "Parquet output is not available on this server", 404
+    try:
+        members = sas_transport.members(path)
+    except sas_transport.TransportError as e:
+        return str(e), 422
+    member_name = request.args.get("member")
+    member = next(
+        (m for m in members if member_name is None or m.name == member_name), None
+    )
+    if member is None:
+        return "Dataset not found", 404
+
+    download_name = f"{name}.{fmt}" if len(members) == 1 else f"{member.name}.{fmt}"
+    target = sas_transport.cache_path(path, member, fmt)
+    # Keyed by content hash, so a re-exported dataset gets a new ETag
+    etag = os.path.basename(target)
+    if fmt == "parquet":
+        sas_transport.build_parquet(path, member, target)
+    if os.path.exists(target):
+        return send_file(
+            target,
+            mimetype=sas_transport.FORMATS[fmt],
+            as_attachment=True,
+            download_name=download_name,
+            etag=etag,
+        )
+
+    # First request: stream the CSV while the cache file is written
+    response = Response(
+        stream_with_context(sas_transport.stream_csv(path, member, target)),
+        mimetype=sas_transport.FORMATS[fmt],
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    response.set_etag(etag)
+    return response
+
+
 @app.route("/download_module/<int:module_id>")
 def download_module_zip(module_id):
-    if module_id not in MODULES:
+    module = catalog_store.snapshot().modules.get(module_id)
+    if module is None:
         return "Module not found", 404
 
     # Create a ZIP file in memory
     memory_file = io.BytesIO()
     with zipfile.ZipFile(memory_file, "w") as zf:
-        module = MODULES[module_id]
-        for file_type, filename in module["files"].items():
-            if os.path.exists(filename):
-                zf.write(filename, f"module{module_id}_{filename}")
+        for filename, arcname in module["zip_entries"]:
+            zf.write(filename, arcname)
 
     memory_file.seek(0)
     return send_file(
         memory_file,
         mimetype="application/zip",
         as_attachment=True,
-        download_name=f"module{module_id}_{module['title'].replace(' ', '_').lower()}.zip",
+        download_name=module["download_name"],
     )
 
 
@@ -388,9 +455,15 @@ def download_module_zip(module_id):
 def serve_static_files(filename):
     """Serve supporting files for rendered HTML documents"""
     try:
+        # Source maps and server-side bundles are never needed by browsers
+        if rendered_html.is_excluded_asset(filename):
+            return "File not found", 404
+
         # Clean up path separators for Windows
         clean_filename = filename.replace("/", os.sep)
         if os.path.exists(clean_filename):
+            if image_variants.is_figure(clean_filename):
+                return _serve_figure(clean_filename)
             # Determine the correct MIME type based on file extension
             if filename.endswith(".css"):
                 return send_file(clean_filename, mimetype="text/css")
@@ -405,6 +478,18 @@ def serve_static_files(filename):
         return f"Error: {str(e)}", 404
 
 
+def _serve_figure(path):
+    """Serve the best figure variant for the client's Accept header and ?w="""
+    variant_path, mimetype = image_variants.variant(
+        path,
+        request.args.get("w", type=int),
+        image_variants.best_format(request.accept_mimetypes),
+    )
+    response = send_file(variant_path, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
+
+
 @app.route("/toggle_theme", methods=["POST"])
 def toggle_theme():
     data = request.get_json()
@@ -414,15 +499,13 @@ def toggle_theme():
 
 def fix_html_static_paths(content, html_filename, html_path):
     """Fix relative paths for supporting files in HTML content"""
-    import re
-
     file_base = os.path.splitext(os.path.basename(html_filename))[0]
 
     # Handle numbered bonus resource files (e.g., 01_R_vs_SAS_CheatSheet.html)
     # Check if the filename starts with digits followed by underscore
-    if re.match(r"^\d+_", file_base):
+    if NUMBER_PREFIX.match(file_base):
         # Remove the number prefix to find the actual files directory
-        base_without_number = re.sub(r"^\d+_", "", file_base)
+        base_without_number = NUMBER_PREFIX.sub("", file_base)
         files_dir_candidates = [f"{file_base}_files", f"{base_without_number}_files"]
     else:
         files_dir_candidates = [f"{file_base}_files"]
@@ -449,6 +532,9 @@ def fix_html_static_paths(content, html_filename, html_path):
     # Fix PDF links - convert relative PDF paths to view routes
     content = re.sub(r'href="([^"]+\.pdf)"', r'href="/view/\1"', content)
 
+    # Lazy-load images and offer downsized WebP/AVIF figures via srcset
+    content = image_variants.responsive_images(content)
+
     return content
 
 
@@ -509,15 +595,54 @@ def _find_html_for_qmd(html_filename, base_dir):
     return None
 
 
-def _serve_html_content(html_path, html_filename):
-    """Read and serve HTML content with fixed paths"""
+@functools.lru_cache(maxsize=128)
+def _load_rendered_document(html_path, html_filename, mtime):
+    """Read a rendered document once per file version and derive its headers"""
     with open(html_path, "r", encoding="utf-8") as f:
         content = f.read()
+    source_bytes = len(content.encode())
 
     # Fix relative paths for supporting files
     content = fix_html_static_paths(content, html_filename, html_path)
 
-    return content, 200, {"Content-Type": "text/html"}
+    # Widget bundles (reactable etc.) load only when a widget scrolls into view
+    content, deferred = rendered_html.defer_widget_scripts(content)
+
+    preload = rendered_html.preload_header(rendered_html.asset_references(content))
+
+    # First paint uses inlined above-the-fold CSS; full stylesheets load async
+    import critical_css
+
+    content, critical_css_bytes = critical_css.inline_critical_css(content)
+
+    return rendered_html.RenderedDocument(
+        content, preload, tuple(deferred), source_bytes, critical_css_bytes
+    )
+
+
+def _send_early_hints(link_header):
+    """Send a 103 Early Hints response if the WSGI server supports it"""
+    early_hints = request.environ.get("wsgi.early_hints")
+    if link_header and callable(early_hints):
+        try:
+            early_hints([("Link", link_header)])
+        except Exception:
+            pass  # Hints are only an optimisation; never fail the request
+
+
+def _serve_html_content(html_path, html_filename):
+    """Read and serve HTML content with fixed paths"""
+    document = _load_rendered_document(
+        html_path, html_filename, os.path.getmtime(html_path)
+    )
+
+    headers = {"Content-Type": "text/html"}
+    if document.preload:
+        # Let the browser fetch the Quarto assets while the HTML downloads
+        _send_early_hints(document.preload)
+        headers["Link"] = document.preload
+
+    return document.content, 200, headers
 
 
 def _serve_source_content(file_path, filename, file_type, message):
@@ -607,6 +732,111 @@ def view_qmd_content(filename):
         return f"Error reading file: {str(e)}", 500
 
 
+def _rendered_html_for(filename):
+    """Resolve a /view filename to its rendered HTML (path, filename), or None"""
+    file_path, base_dir = _find_file_location(filename)
+    if not file_path:
+        return None
+
+    if filename.endswith(".qmd"):
+        html_filename = filename.replace(".qmd", ".html")
+        html_path = _find_html_for_qmd(html_filename, base_dir)
+    elif filename.endswith(".Rmd"):
+        html_filename = filename.replace(".Rmd", ".html")
+        html_path = os.path.join(base_dir, html_filename)
+    elif filename.endswith((".html", ".htm")):
+        html_filename, html_path = filename, file_path
+    else:
+        return None
+
+    if html_path and os.path.exists(html_path):
+        return html_path, html_filename
+    return None
+
+
+@functools.lru_cache(maxsize=128)
+def _document_sections(html_path, html_filename, mtime):
+    """Heading sections of a rendered document, indexed once per file version"""
+    document = _load_rendered_document(html_path, html_filename, mtime)
+    sections = rendered_html.index_sections(document.content)
+    return document, {section.id: section for section in sections}
+
+
+def _load_document_sections(filename):
+    rendered = _rendered_html_for(filename)
+    if rendered is None:
+        return None, None, None
+    html_path, html_filename = rendered
+    mtime = os.path.getmtime(html_path)
+    document, sections = _document_sections(html_path, html_filename, mtime)
+    return document, sections, mtime
+
+
+@app.route("/view_sections/<path:filename>")
+def view_sections(filename):
+    """Table of contents of a rendered document for on-demand section loading"""
+    document, sections, _mtime = _load_document_sections(filename)
+    if document is None:
+        return jsonify({"success": False, "message": "Document not found"}), 404
+
+    stylesheets = [
+        url
+        for url, kind in rendered_html.asset_references(document.content)
+        if kind == "style"
+    ]
+    return jsonify(
+        {
+            "success": True,
+            "document": filename,
+            "stylesheets": stylesheets,
+            "sections": [
+                {
+                    "id": section.id,
+                    "title": section.title,
+                    "level": section.level,
+                    "parent": section.parent,
+                    "bytes": section.end - section.start,
+                    "url": url_for(
+                        "view_section", section_id=section.id, filename=filename
+                    ),
+                }
+                for section in sections.values()
+            ],
+        }
+    )
+
+
+@app.route("/view_section/<section_id>/<path:filename>")
+def view_section(section_id, filename):
+    """
+    One section of a rendered document as an HTML fragment.
+
+    Asset paths are already rewritten to /static_files. With ?children=0 the
+    nested subsections are left out so they can be fetched separately.
+    """
+    document, sections, mtime = _load_document_sections(filename)
+    if document is None or section_id not in sections:
+        return "Section not found", 404
+
+    section = sections[section_id]
+    shallow = request.args.get("children") == "0"
+    fragment = document.content[section.start : section.end]
+    if shallow:
+        position = section.start
+        pieces = []
+        for child in sections.values():
+            if child.parent == section.id:
+                pieces.append(document.content[position : child.start])
+                position = child.end
+        pieces.append(document.content[position : section.end])
+        fragment = "".join(pieces)
+
+    response = make_response(fragment)
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.set_etag(f"{mtime}-{section_id}-{int(shallow)}")
+    return response.make_conditional(request)
+
+
 def _get_mime_type(filepath):
     """Get MIME type based on file extension"""
     mime_type_map = {
@@ -630,6 +860,9 @@ def _get_mime_type(filepath):
 def serve_view_files(filepath):
     """Serve supporting files for HTML views (CSS, JS, etc.)"""
     try:
+        if rendered_html.is_excluded_asset(filepath):
+            return "File not found", 404
+
         full_path = os.path.join("training_material", filepath)
         mime_type = _get_mime_type(filepath)
         return send_file(full_path, mimetype=mime_type)
@@ -641,6 +874,11 @@ def serve_view_files(filepath):
 
 # --- Certificate PDF Generation Helper ---
 def generate_certificate_pdf(name, surname, date_str, modules):
+    # reportlab is only needed here; importing it lazily keeps worker start-up fast
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+
     buffer = io.BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -685,7 +923,7 @@ def download_certificate():
         return redirect(url_for("modules"))
 
     date_str = datetime.now().strftime("%B %d, %Y")
-    module_titles = [MODULES[m]["title"] for m in sorted(MODULES.keys())]
+    module_titles = list(catalog_store.snapshot().module_titles)
     pdf_buffer = generate_certificate_pdf(name, surname, date_str, module_titles)
 
     # Save completer information to file (automatic logging)
@@ -756,6 +994,43 @@ def send_contact_message():
     return redirect(url_for("contact"))
 
 
+def _drop_replaced_rating(f, rating):
+    """Rewrite the locked ratings log without the star rating a feedback update replaces"""
+    # This is a text feedback update - remove duplicate rating and keep only the feedback version
+    try:
+        # Read existing content
+        f.seek(0)
+        content = f.read().decode("utf-8")
+
+        # Split content into entries
+        entries = content.split("=== RATING")
+
+        # Find and remove the most recent rating entry with the same rating value
+        updated_content = entries[0]  # Keep header
+
+        for i in range(1, len(entries)):
+            entry = "=== RATING" + entries[i]
+            # Check if this entry matches our rating and is recent (no feedback)
+            if (
+                f"Rating: {rating}/5 stars\n" in entry
+                and "Feedback:" not in entry
+                and "Event:" not in entry  # Bulk events are kept
+                and len(entries) - i <= 2
+            ):  # Only check last 2 entries
+                # Skip this entry (don't add it back)
+                continue
+            else:
+                updated_content += entry
+
+        # Write back the cleaned content
+        f.seek(0)
+        f.truncate()
+        f.write(updated_content.encode("utf-8"))
+
+    except Exception:
+        pass  # If any error, just continue with append
+
+
 # --- Simple Rating Route ---
 @app.route("/submit_simple_rating", methods=["POST"])
 def submit_simple_rating():
@@ -771,61 +1046,28 @@ def submit_simple_rating():
         if not rating:
             return jsonify({"success": False, "message": "Rating is required."})
 
-        # Create data directory if it doesn't exist
-        os.makedirs("data", exist_ok=True)
-
         # Store rating in file
         formatted_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         if is_update and feedback:
-            # This is a text feedback update - remove duplicate rating and keep only the feedback version
-            try:
-                # Read existing content
-                with open("data/course_ratings.txt", "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                # Split content into entries
-                entries = content.split("=== RATING")
-
-                # Find and remove the most recent rating entry with the same rating value
-                updated_content = entries[0]  # Keep header
-
-                for i in range(1, len(entries)):
-                    entry = "=== RATING" + entries[i]
-                    # Check if this entry matches our rating and is recent (no feedback)
-                    if (
-                        f"Rating: {rating}/5 stars\n" in entry
-                        and "Feedback:" not in entry
-                        and len(entries) - i <= 2
-                    ):  # Only check last 2 entries
-                        # Skip this entry (don't add it back)
-                        continue
-                    else:
-                        updated_content += entry
-
-                # Write back the cleaned content
-                with open("data/course_ratings.txt", "w", encoding="utf-8") as f:
-                    f.write(updated_content)
-
-            except (FileNotFoundError, Exception):
-                pass  # If any error, just continue with append
-
-            # Append the feedback update
-            with open("data/course_ratings.txt", "a", encoding="utf-8") as f:
-                f.write(f"=== FEEDBACK UPDATE {formatted_time} ===\n")
-                f.write(f"Rating: {rating}/5 stars (with additional feedback)\n")
-                f.write(f"Feedback: {feedback}\n")
-                f.write(f"Timestamp: {timestamp}\n")
-                f.write(f"{'=' * 30}\n\n")
+            lines = [
+                f"=== FEEDBACK UPDATE {formatted_time} ===",
+                f"Rating: {rating}/5 stars (with additional feedback)",
+                f"Feedback: {feedback}",
+            ]
         else:
-            # Regular rating submission
-            with open("data/course_ratings.txt", "a", encoding="utf-8") as f:
-                f.write(f"=== RATING {formatted_time} ===\n")
-                f.write(f"Rating: {rating}/5 stars\n")
-                if feedback:
-                    f.write(f"Feedback: {feedback}\n")
-                f.write(f"Timestamp: {timestamp}\n")
-                f.write(f"{'=' * 30}\n\n")
+            lines = [f"=== RATING {formatted_time} ===", f"Rating: {rating}/5 stars"]
+            if feedback:
+                lines.append(f"Feedback: {feedback}")
+        lines += [f"Timestamp: {timestamp}", "=" * 30, "", ""]
+
+        # The exclusive lock of the bulk endpoint: no write lands mid-rewrite
+        with _rating_log().locked() as f:
+            if is_update and feedback:
+                _drop_replaced_rating(f, rating)
+
+            # Append the rating or feedback update
+            f.write("\n".join(lines).encode("utf-8"))
 
         return jsonify({"success": True, "message": "Thank you for your rating!"})
 
@@ -835,6 +1077,79 @@ def submit_simple_rating():
         )
 
 
+@app.route("/api/ratings/bulk", methods=["POST"])
+def submit_ratings_bulk():
+    """Record a batch of coalesced rating events; resent events are ignored"""
+    import rating_events
+
+    # sendBeacon bodies may arrive as text/plain, so parse regardless of type
+    data = request.get_json(force=True, silent=True)
+    events = data.get("events") if isinstance(data, dict) else data
+    try:
+        accepted, duplicates = _rating_log().ingest(events)
+    except rating_events.RatingError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, "accepted": accepted, "duplicates": duplicates})
+
+
+# --- Learner Progress Sync Routes ---
+def _progress_store():
+    import progress_store
+
+    return progress_store.ProgressStore(PROGRESS_DB, MODULES)
+
+
+def _progress_json(progress):
+    return {str(module_id): items for module_id, items in progress.items()}
+
+
+@app.route("/api/progress/sync", methods=["POST"])
+def sync_progress():
+    """Apply a batch of objective toggles and return the learner's merged progress"""
+    import progress_store
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    try:
+        progress, rejected = _progress_store().sync(
+            data.get("learner_id"), data.get("toggles", [])
+        )
+    except progress_store.ProgressError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify(
+        {
+            "success": True,
+            "progress": _progress_json(progress),
+            # Toggles that were skipped; resending them would fail again
+            "rejected": [
+                {"index": index, "message": message} for index, message in rejected
+            ],
+        }
+    )
+
+
+@app.route("/api/progress/<learner_id>")
+def get_progress(learner_id):
+    """Return a learner's stored progress"""
+    import progress_store
+
+    try:
+        progress = _progress_store().load(learner_id)
+    except progress_store.ProgressError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    return jsonify({"success": True, "progress": _progress_json(progress)})
+
+
+@app.route("/admin/progress")
+def view_progress_summary():
+    """Admin route with cohort-level completion aggregates"""
+    return jsonify(_progress_store().cohort_summary())
+
+
 # --- Admin Route to View Data ---
 @app.route("/admin/data")
 def view_admin_data():
@@ -876,13 +1191,113 @@ def view_completers():
         return f"Error reading completers data: {str(e)}", 500
 
 
+# --- Admin Data Export ---
+@app.route("/admin/export/<dataset>.<any(csv, ndjson):fmt>")
+def export_data(dataset, fmt):
+    """Stream messages, ratings or completers as CSV/NDJSON (?since=&until=)"""
+    import data_export
+
+    if dataset not in data_export.DATASETS:
+        return jsonify({"success": False, "message": "Unknown dataset."}), 404
+    try:
+        since = data_export.parse_bound(request.args.get("since"))
+        until = data_export.parse_bound(request.args.get("until"), end_of_day=True)
+    except data_export.ExportError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    gzip = "gzip" in request.accept_encodings
+    chunks = data_export.export(dataset, fmt, since, until, gzip=gzip)
+    response = Response(stream_with_context(chunks), mimetype=data_export.FORMATS[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename={dataset}.{fmt}"
+    response.vary.add("Accept-Encoding")
+    if gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# --- Offline Support ---
+
+
+@app.route("/sw.js")
+def service_worker():
+    """Serve static/sw.js from the site root so it can control every page"""
+    response = send_file(
+        os.path.join(app.static_folder, "sw.js"), mimetype="application/javascript"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/precache-manifest.json")
+def precache_manifest():
+    """Content-hashed list of the shell, module and bonus URLs to cache offline"""
+    manifest = _precache_store().get()
+    if manifest is None:
+        response = jsonify(
+            {"success": False, "message": "The offline manifest is being built."}
+        )
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+    response = jsonify(manifest)
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(manifest["version"])
+    return response.make_conditional(request)
+
+
+@app.route("/admin/admission")
+def view_admission_stats():
+    """Concurrency, queue depth and shed requests per route class"""
+    return jsonify(admission_control.stats())
+
+
+@app.route("/admin/usage")
+def view_usage():
+    """Top files and modules and hit counts per time bucket (?kind=&hours=&bucket=)"""
+    kind = request.args.get("kind", "module")
+    limit = request.args.get("limit", 10, type=int)
+    hours = request.args.get("hours", 24 * 7, type=int)
+    size = usage_stats.BUCKET_SIZES.get(request.args.get("bucket", "hour"))
+    if size is None:
+        return jsonify({"success": False, "message": "bucket must be hour or day"}), 400
+
+    usage_counters.flush()
+    since = int(time.time()) - hours * 3600
+    return jsonify(
+        {
+            "success": True,
+            "kind": kind,
+            "top": [
+                {"key": key, "count": count}
+                for key, count in usage_counters.top(kind, limit, since)
+            ],
+            "buckets": [
+                {"start": datetime.fromtimestamp(start).isoformat(), "count": count}
+                for start, count in usage_counters.buckets(
+                    kind, request.args.get("key"), since, size
+                )
+            ],
+        }
+    )
+
+
+@app.route("/admin/profiles")
+def view_profiles():
+    """Admin route listing the buffered slow-request profiles per route"""
+    return jsonify(request_profiler.summary())
+
+
+@app.route("/admin/profiles/flamegraph")
+def view_flamegraph():
+    """Collapsed stacks (flamegraph.pl/speedscope input), optionally ?route=<rule>"""
+    stacks = request_profiler.collapsed(request.args.get("route"))
+    return stacks, 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+
 @app.route("/health")
 def health_check():
     """Health check route for deployment debugging"""
     try:
-        import sys
-        import os
-        
         info = {
             "status": "healthy",
             "python_version": sys.version,
@@ -905,6 +1320,210 @@ def health_check():
         return jsonify({"status": "error", "error": str(e)}), 500
 
 
+# --- Maintenance CLI Commands ---
+@app.cli.command("build-renders")
+@click.option("--force", is_flag=True, help="Re-render every document, stale or not.")
+@click.option("--dry-run", is_flag=True, help="List stale documents without rendering.")
+@click.option("--jobs", type=int, default=None, help="Number of parallel renders.")
+@click.option(
+    "--command",
+    "render_command",
+    default=None,
+    help="Render command template (default: $RENDER_COMMAND or quarto render).",
+)
+def build_renders(force, dry_run, jobs, render_command):
+    """Re-render Quarto documents whose sources are newer than their HTML."""
+    import render_build
+
+    targets = render_build.collect_targets(MODULES, BONUS_RESOURCES)
+    stale = render_build.stale_targets(targets, force=force)
+    click.echo(f"{len(stale)} of {len(targets)} rendered documents are stale")
+    if dry_run or not stale:
+        for target in stale:
+            click.echo(f"  {target.source} -> {target.output}")
+        return
+
+    results = render_build.render_all(
+        stale,
+        render_command=render_command
+        or os.getenv("RENDER_COMMAND", render_build.DEFAULT_RENDER_COMMAND),
+        jobs=jobs,
+    )
+    failed = [result for result in results if not result.ok]
+    for result in results:
+        status = "✅" if result.ok else "❌"
+        click.echo(f"{status} {result.target.output} ({result.seconds:.1f}s)")
+        if not result.ok:
+            click.echo(result.log.strip())
+    if len(failed) < len(results):
+        _store_precache_manifest()
+    if failed:
+        raise SystemExit(1)
+
+
+def _rendered_documents():
+    """Yield (view filename, html path) for every rendered document in the catalog"""
+    paths = [
+        module["files"][kind]
+        for module in MODULES.values()
+        for kind in ("theory_html", "solution_html")
+    ]
+    paths += [r["file"] for r in BONUS_RESOURCES.values() if r["file"].endswith(".html")]
+    for html_path in paths:
+        if os.path.exists(html_path):
+            yield os.path.basename(html_path), html_path
+
+
+@app.cli.command("asset-report")
+def asset_report():
+    """Report the bytes asset slimming saves per rendered document, and what it adds."""
+    columns = [
+        ("deferred_bytes", "deferred JS"),
+        ("excluded_bytes", "not served"),
+        ("source_bytes", "HTML source"),
+        ("served_bytes", "HTML served"),
+        ("critical_css_bytes", "inline CSS"),
+        ("async_css_bytes", "async CSS"),
+    ]
+    totals = {key: 0 for key, _label in columns}
+    click.echo(f"{'document':<40}" + "".join(f" {label:>12}" for _key, label in columns))
+    for html_filename, html_path in _rendered_documents():
+        document = _load_rendered_document(
+            html_path, html_filename, os.path.getmtime(html_path)
+        )
+        report = rendered_html.slimming_report(document)
+        for key in totals:
+            totals[key] += report[key]
+        click.echo(
+            f"{html_filename:<40}"
+            + "".join(f" {report[key] / 1024:>9.0f} KB" for key, _label in columns)
+        )
+    click.echo(
+        f"{'total':<40}"
+        + "".join(f" {totals[key] / 1024:>9.0f} KB" for key, _label in columns)
+    )
+
+
+@app.cli.command("validate-catalog")
+@click.argument("path", default=None, required=False)
+def validate_catalog(path):
+    """Validate the course catalog file and report missing material."""
+    path = path or CATALOG_PATH
+    try:
+        checked = catalog.load_catalog(path)
+    except catalog.CatalogError as e:
+        click.echo(f"❌ {e}")
+        raise SystemExit(1)
+    for owner, missing in checked.missing_files():
+        click.echo(f"⚠️  {owner}: {missing} not found")
+    click.echo(
+        f"✅ {path}: {len(checked.modules)} modules, "
+        f"{len(checked.bonus_resources)} bonus resources"
+    )
+
+
+@app.cli.command("check-links")
+@click.option("--jobs", type=int, default=16, help="Number of parallel requests.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+def check_links(jobs, as_json):
+    """Check every link and asset referenced by the served content."""
+    import json
+
+    import link_check
+
+    # Checked behind admission control: a crawl is not load to be shed
+    report = link_check.check_site(
+        admission_control.wsgi_app, catalog_store.snapshot(), jobs=jobs
+    )
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        for entry in report["broken"]:
+            pages = sorted({ref["page"] for ref in entry["referrers"]})
+            source = ", ".join(pages) or "catalog"
+            click.echo(f"❌ {entry['url']} (HTTP {entry['status']}) <- {source}")
+        for entry in report["missing_files"]:
+            click.echo(f"⚠️  {entry['owner']}: {entry['path']} not found")
+        click.echo(
+            f"{'✅' if report['ok'] else '❌'} {report['routes']} routes, "
+            f"{report['documents']} documents, {report['references']} references "
+            f"to {report['checked']} URLs checked in {report['seconds']}s"
+        )
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+@app.cli.command("optimize-images")
+@click.option("--jobs", type=int, default=None, help="Number of parallel workers.")
+def optimize_images(jobs):
+    """Pre-generate responsive WebP/AVIF/PNG variants of every figure."""
+    if not image_variants.supported_formats():
+        click.echo("Pillow is not installed; figures are served unchanged.")
+        return
+    results = image_variants.build_all(
+        ["training_material", "bonus_resources"], jobs=jobs
+    )
+    for path, (source_bytes, variants) in results.items():
+        smallest = min((os.path.getsize(v) for v in variants), default=source_bytes)
+        click.echo(
+            f"{os.path.basename(path):<28} {source_bytes / 1024:>7.0f} KB -> "
+            f"{smallest / 1024:>5.0f} KB smallest of {len(variants)} variants"
+        )
+    click.echo(
+        f"{len(results)} figures, formats: "
+        f"{', '.join(image_variants.supported_formats())}, "
+        f"cache: {image_variants.IMAGE_CACHE_DIR}"
+    )
+
+
+@app.cli.command("export-static")
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--jobs", type=int, default=None, help="Number of parallel workers.")
+def export_static(output_dir, jobs):
+    """Freeze every read-only route into OUTPUT_DIR for nginx/CDN serving."""
+    import static_export
+
+    summary = static_export.export_site(
+        app,
+        MODULES,
+        BONUS_RESOURCES,
+        output_dir,
+        jobs=jobs,
+        # The export is not subject to the live site's load shedding
+        wsgi_app=admission_control.wsgi_app,
+    )
+    total_bytes = sum(route.size for route in summary["routes"])
+    click.echo(
+        f"Exported {len(summary['routes'])} routes ({total_bytes / 1e6:.1f} MB, "
+        f"{summary['saved_bytes'] / 1e6:.1f} MB deduplicated) to {output_dir}"
+    )
+    for url, status in summary["skipped"]:
+        click.echo(f"⚠️  Skipped {url} (HTTP {status})")
+    _store_precache_manifest()
+
+
+def _store_precache_manifest():
+    import precache
+
+    try:
+        manifest = _precache_store().refresh(force=True)
+    except precache.PrecacheError as e:
+        click.echo(f"⚠️  Precache manifest not updated: {e}")
+        return False
+    entries = len(manifest["shell"]) + len(manifest["bonus"])
+    entries += sum(map(len, manifest["modules"].values()))
+    version = manifest["version"][:12]
+    click.echo(f"Precache manifest: {entries} entries, version {version}")
+    return True
+
+
+@app.cli.command("build-precache")
+def build_precache():
+    """Build the service worker's precache manifest and store it for serving."""
+    if not _store_precache_manifest():
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     # Add some startup logging
     print("🚀 Starting TransitionR Flask Application...")
@@ -924,6 +1543,7 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     
     print(f"🌐 Starting server on {host}:{port} (debug={debug_mode})")
+    start_background_builds()
     
     try:
         app.run(debug=debug_mode, host=host, port=port)
@@ -0,0 +1,233 @@
+"""
+ASGI entry point: ``uvicorn asgi:app`` or
+``gunicorn -k uvicorn.workers.UvicornWorker asgi:app``.
+
+Every request still runs through the Flask app (``app.app``): routing,
+admission control, conditional responses, usage counters and profiling
+behave exactly as under WSGI. Handlers run on a bounded thread pool.
+Bodies are sent by the event loop. File responses (``send_file``, used
+by ``download_file``, ``view_file``, ``serve_static_files``,
+``serve_view_files`` and ``download_module_zip``) are detected through
+``wsgi.file_wrapper`` and streamed chunk by chunk. The handler thread is
+freed as soon as the headers are ready, so a slow client holds a socket
+and a small buffer instead of a worker.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+from app import start_background_builds
+
+# Bytes read from a file per send; a slow client holds at most this much
+CHUNK_BYTES = 64 * 1024
+HANDLER_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+
+_handlers = ThreadPoolExecutor(
+    max_workers=HANDLER_THREADS, thread_name_prefix="asgi-handler"
+)
+
+
+class FileWrapper:
+    """``wsgi.file_wrapper`` marking a response body as a file to stream."""
+
+    def __init__(self, file, block_size=CHUNK_BYTES):
+        self.file = file
+        self.block_size = block_size
+
+    def __iter__(self):
+        # Only used when middleware iterates the body itself
+        while True:
+            block = self.file.read(self.block_size)
+            if not block:
+                return
+            yield block
+
+    def close(self):
+        close = getattr(self.file, "close", None)
+        if close:
+            close()
+
+
+def build_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope and its request body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "wsgi.file_wrapper": FileWrapper,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+
+    body = flask_app.wsgi_app(environ, start_response)
+    if "status" in started:
+        return started["status"], started["headers"], body
+
+    # start_response may be deferred until the first non-empty chunk, or
+    # until the iterator is exhausted; pull chunks until it has been called
+    iterator = iter(body)
+    pulled = []
+    for chunk in iterator:
+        pulled.append(chunk)
+        if "status" in started:
+            break
+    if "status" not in started:
+        close = getattr(body, "close", None)
+        if close:
+            close()
+        return 500, [(b"content-type", b"text/plain")], [b"Internal Server Error"]
+    return started["status"], started["headers"], _Prepended(pulled, iterator, body)
+
+
+class _Prepended:
+    def __init__(self, pulled, iterator, original):
+        self.pulled = pulled
+        self.iterator = iterator
+        self.original = original
+
+    def __iter__(self):
+        yield from self.pulled
+        yield from self.iterator
+
+    def close(self):
+        close = getattr(self.original, "close", None)
+        if close:
+            close()
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _watch_disconnect(receive, disconnected):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+async def _stream_file(wrapper, send, loop, disconnected):
+    read = wrapper.file.read
+    while not disconnected.is_set():
+        block = await loop.run_in_executor(None, read, CHUNK_BYTES)
+        if not block:
+            return
+        await send({"type": "http.response.body", "body": block, "more_body": True})
+
+
+async def _stream_iterable(body, send, loop, disconnected):
+    if isinstance(body, (list, tuple)):
+        for chunk in body:
+            if disconnected.is_set():
+                return
+            if chunk:
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        return
+
+    iterator = iter(body)
+    done = object()
+    while not disconnected.is_set():
+        # Generators may do blocking work (streamed exports); run them off-loop
+        chunk = await loop.run_in_executor(_handlers, next, iterator, done)
+        if chunk is done:
+            return
+        if chunk:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            start_background_builds()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _handlers.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    try:
+        request_body = await _read_body(receive)
+    except ConnectionError:
+        return
+    loop = asyncio.get_running_loop()
+    environ = build_environ(scope, request_body)
+    status, headers, body = await loop.run_in_executor(_handlers, _call_wsgi, environ)
+
+    # After the request body, the only message left is http.disconnect; stop
+    # reading the file or iterator as soon as it arrives
+    disconnected = asyncio.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+    try:
+        start = {"type": "http.response.start", "status": status, "headers": headers}
+        await send(start)
+        if isinstance(body, FileWrapper) and scope["method"] != "HEAD":
+            await _stream_file(body, send, loop, disconnected)
+        elif scope["method"] != "HEAD":
+            await _stream_iterable(body, send, loop, disconnected)
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+    except OSError:
+        # The server failed to send: the client is gone
+        pass
+    finally:
+        watcher.cancel()
+        close = getattr(body, "close", None)
+        if close:
+            # Releases admission slots and request resources
+            await loop.run_in_executor(None, close)
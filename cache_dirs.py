@@ -0,0 +1,101 @@
+"""
+Private directories for the on-disk caches, and the helpers shared by
+caches keyed on content.
+
+The Jinja bytecode cache is loaded with ``marshal``, and the figure and
+dataset caches hold files that are served to learners as they are, so a
+cache directory another local user can write to lets them run code inside
+the app or replace downloads. Caches therefore default to directories
+under ``data/cache`` rather than the shared temporary directory. They are
+created with mode 0700 and refused when they belong to another user or are
+writable by group or others.
+
+Cached files are named after the SHA-256 of their source, so a changed
+source gets a fresh entry. ``content_hash`` remembers each file's hash
+until its modification time or size changes. ``ContentCache`` keeps
+values derived from content in memory under such a hash, evicting the
+least recently used once it holds ``maxsize`` of them.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_ROOT = os.path.join("data", "cache")
+
+
+class CacheDirError(OSError):
+    """Raised for a cache directory other users could write to."""
+
+
+def resolve(setting, name):
+    """
+    Absolute directory of the ``name`` cache: the ``setting`` environment
+    variable, else ``data/cache/<name>`` under the working directory.
+    """
+    return os.path.abspath(os.getenv(setting) or os.path.join(CACHE_ROOT, name))
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_private(path):
+    """
+    Create ``path`` (mode 0700) if needed and return it.
+
+    Raises ``CacheDirError`` if an existing directory is owned by another
+    user or writable by group or others. Checked once per path: a
+    directory only its owner can write to cannot be changed by anyone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name == "posix":
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise CacheDirError(
+                f"Cache directory {path} is writable by other users; "
+                "restrict it to the app's user (chmod 700) or choose another"
+            )
+    return path
+
+
+@functools.lru_cache(maxsize=1024)
+def _content_hash(path, mtime, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(path):
+    """SHA-256 hex digest of the file at ``path``."""
+    stat = os.stat(path)
+    return _content_hash(path, stat.st_mtime, stat.st_size)
+
+
+class ContentCache:
+    """Thread-safe LRU of values computed from content, keyed by its hash."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """The value cached for ``key``, or ``compute()`` stored under it."""
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+        # Computed outside the lock; a concurrent miss computes it twice
+        value = compute()
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def keys(self):
+        """Cached keys, least recently used first."""
+        with self._lock:
+            return list(self._values)
@@ -0,0 +1,204 @@
+"""
+Course catalog (modules and bonus resources) loaded from ``catalog.json``.
+
+The manifest is validated as a whole and turned into an immutable
+``Catalog`` snapshot with every derived value precomputed: module zip
+names and entries, the certificate's module titles, and which referenced
+files exist on disk. Request handlers only read the current snapshot.
+
+``CatalogStore`` reloads the file when its modification time changes. A
+new snapshot is built completely before it replaces the old one, so
+requests never see a half-loaded catalog; an invalid edit is reported and
+the previous snapshot stays in service.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+
+MODULE_FIELDS = {"title": str, "description": str, "objectives": list, "files": dict}
+BONUS_FIELDS = {"title": str, "description": str, "file": str, "icon": str}
+# Learner progress packs a module's objectives into one byte (progress_store)
+MAX_OBJECTIVES = 8
+
+# Seconds between modification-time checks of the catalog file
+CHECK_INTERVAL = 1.0
+
+
+class CatalogError(ValueError):
+    """Raised when the catalog file is missing or malformed."""
+
+
+def _check_fields(where, entry, fields):
+    if not isinstance(entry, dict):
+        raise CatalogError(f"{where}: expected an object")
+    for field, expected in fields.items():
+        if not isinstance(entry.get(field), expected):
+            raise CatalogError(f"{where}: '{field}' must be a {expected.__name__}")
+
+
+def _freeze_module(module_id, module):
+    _check_fields(f"module {module_id}", module, MODULE_FIELDS)
+    if not module["objectives"] or not all(
+        isinstance(objective, str) for objective in module["objectives"]
+    ):
+        raise CatalogError(f"module {module_id}: objectives must be non-empty strings")
+    if len(module["objectives"]) > MAX_OBJECTIVES:
+        raise CatalogError(
+            f"module {module_id}: at most {MAX_OBJECTIVES} objectives can be tracked"
+        )
+    if not all(isinstance(path, str) for path in module["files"].values()):
+        raise CatalogError(f"module {module_id}: file paths must be strings")
+
+    files = dict(module["files"])
+    existing = {file_type: os.path.exists(path) for file_type, path in files.items()}
+    return MappingProxyType(
+        {
+            **module,
+            "objectives": tuple(module["objectives"]),
+            "files": MappingProxyType(files),
+            # Derived once here instead of on every request
+            "files_exist": MappingProxyType(existing),
+            "zip_entries": tuple(
+                (path, f"module{module_id}_{path}")
+                for file_type, path in files.items()
+                if existing[file_type]
+            ),
+            "download_name": (
+                f"module{module_id}_{module['title'].replace(' ', '_').lower()}.zip"
+            ),
+        }
+    )
+
+
+def _freeze_resource(key, resource):
+    _check_fields(f"bonus resource '{key}'", resource, BONUS_FIELDS)
+    return MappingProxyType(
+        {
+            **resource,
+            "download_name": os.path.basename(resource["file"]),
+            "file_exists": os.path.exists(resource["file"]),
+        }
+    )
+
+
+class Catalog:
+    """Immutable, validated snapshot of the catalog file."""
+
+    def __init__(self, data, source=None, mtime=None):
+        if not isinstance(data, dict):
+            raise CatalogError("catalog must be a JSON object")
+        raw_modules = data.get("modules")
+        raw_bonus = data.get("bonus_resources", {})
+        if not isinstance(raw_modules, dict) or not raw_modules:
+            raise CatalogError("'modules' must be a non-empty object")
+        if not isinstance(raw_bonus, dict):
+            raise CatalogError("'bonus_resources' must be an object")
+
+        modules = {}
+        for key, module in raw_modules.items():
+            if not str(key).isdigit() or int(key) < 1:
+                raise CatalogError(f"module id '{key}' must be a positive integer")
+            modules[int(key)] = _freeze_module(int(key), module)
+
+        self.modules = MappingProxyType(dict(sorted(modules.items())))
+        bonus = {key: _freeze_resource(key, value) for key, value in raw_bonus.items()}
+        self.bonus_resources = MappingProxyType(bonus)
+        self.module_titles = tuple(module["title"] for module in self.modules.values())
+        self.source = source
+        self.mtime = mtime
+
+    def missing_files(self):
+        """Referenced files that do not exist, as ``(owner, path)`` pairs."""
+        missing = [
+            (f"module {module_id}", module["files"][file_type])
+            for module_id, module in self.modules.items()
+            for file_type, exists in module["files_exist"].items()
+            if not exists
+        ]
+        missing += [
+            (f"bonus {key}", resource["file"])
+            for key, resource in self.bonus_resources.items()
+            if not resource["file_exists"]
+        ]
+        return missing
+
+
+def load_catalog(path):
+    """Read and validate ``path`` into a ``Catalog``."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise CatalogError(f"cannot read {path}: {e}")
+    except ValueError as e:  # JSONDecodeError or UnicodeDecodeError
+        raise CatalogError(f"{path}: invalid JSON: {e}")
+    return Catalog(data, source=path, mtime=mtime)
+
+
+class CatalogStore:
+    """Serves the current ``Catalog`` and swaps in a new one on file change."""
+
+    def __init__(self, path):
+        self.path = path
+        self._catalog = load_catalog(path)
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """The current catalog, reloading first if the file has changed."""
+        now = time.monotonic()
+        if now - self._checked_at >= CHECK_INTERVAL:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self._catalog
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return  # Mid-replace or deleted: keep serving the current snapshot
+        if mtime == self._catalog.mtime:
+            return
+        with self._lock:
+            if mtime != self._catalog.mtime:
+                self.reload()
+
+    def reload(self):
+        """Load the file now; on any error keep the previous snapshot."""
+        try:
+            catalog = load_catalog(self.path)
+        except Exception as e:
+            # Reloads run inside requests: a bad edit must not break them
+            print(f"Warning: catalog not reloaded: {e}", file=sys.stderr)
+            return False
+        self._catalog = catalog  # A single reference swap is atomic
+        return True
+
+
+class LiveMapping(Mapping):
+    """Read-only view that always reflects the store's current snapshot."""
+
+    def __init__(self, store, attribute):
+        self._store = store
+        self._attribute = attribute
+
+    def _current(self):
+        return getattr(self._store.snapshot(), self._attribute)
+
+    def __getitem__(self, key):
+        return self._current()[key]
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def __len__(self):
+        return len(self._current())
+
+    def __repr__(self):
+        return repr(dict(self._current()))
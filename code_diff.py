@@ -0,0 +1,96 @@
+"""
+Side-by-side diff of a module's exercise script against its solution.
+
+The solution's R chunks (see ``qmd_chunks``) are laid end to end and
+aligned line by line with the exercise ``.R`` script. Rows keep the
+source line numbers of both sides (solution numbers point into the
+``.qmd``) and mark where each chunk starts. Diffs are computed once per
+pair of file contents: an mtime change only costs re-hashing the files
+unless their content actually changed.
+"""
+
+import difflib
+import hashlib
+from collections import namedtuple
+
+import cache_dirs
+import qmd_chunks
+
+# tag is "equal", "replace", "delete" (exercise only), "insert" (solution
+# only) or "chunk" (a solution chunk boundary; ``right`` holds its label)
+DiffRow = namedtuple("DiffRow", ["tag", "left_line", "left", "right_line", "right"])
+CodeDiff = namedtuple("CodeDiff", ["key", "rows", "changed", "chunks"])
+
+# Computed diffs by content hash of both files
+_diffs = cache_dirs.ContentCache(maxsize=64)
+
+
+def _solution_lines(chunks):
+    lines = []
+    starts = {}
+    for number, chunk in enumerate(chunks, 1):
+        starts[len(lines)] = chunk.label or f"chunk {number}"
+        lines.extend(
+            (chunk.line + offset, code)
+            for offset, code in enumerate(chunk.code)
+            if code.strip()
+        )
+    return lines, starts
+
+
+def diff_rows(exercise_text, solution_text):
+    """Aligned ``DiffRow`` list for an exercise script and solution QMD."""
+    # Blank lines are layout, not code, and would anchor unrelated lines
+    left = [
+        (number, code)
+        for number, code in enumerate(exercise_text.splitlines(), 1)
+        if code.strip()
+    ]
+    chunks = qmd_chunks.parse_chunks(solution_text)
+    right, chunk_starts = _solution_lines(chunks)
+
+    matcher = difflib.SequenceMatcher(
+        None,
+        [code.rstrip() for _number, code in left],
+        [code.rstrip() for _number, code in right],
+        autojunk=False,
+    )
+    rows = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for offset in range(max(i2 - i1, j2 - j1)):
+            i, j = i1 + offset, j1 + offset
+            if j < j2 and j in chunk_starts:
+                rows.append(DiffRow("chunk", None, None, None, chunk_starts[j]))
+            left_line, left_code = left[i] if i < i2 else (None, None)
+            right_line, right_code = right[j] if j < j2 else (None, None)
+            # Unequal-length replacements leave one side empty at the end
+            if left_code is None:
+                row_tag = "insert"
+            elif right_code is None:
+                row_tag = "delete"
+            else:
+                row_tag = tag
+            rows.append(DiffRow(row_tag, left_line, left_code, right_line, right_code))
+    return rows, len(chunks)
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def module_diff(exercise_path, solution_path):
+    """``CodeDiff`` of a module's exercise script and solution document."""
+    digest = hashlib.sha256()
+    for path in (exercise_path, solution_path):
+        digest.update(cache_dirs.content_hash(path).encode())
+    key = digest.hexdigest()
+
+    def compute():
+        exercise_text = _read(exercise_path)
+        solution_text = _read(solution_path)
+        rows, chunk_count = diff_rows(exercise_text, solution_text)
+        changed = sum(row.tag not in ("equal", "chunk") for row in rows)
+        return CodeDiff(key, tuple(rows), changed, chunk_count)
+
+    return _diffs.get(key, compute)
@@ -0,0 +1,248 @@
+"""
+Critical-CSS extraction for rendered Quarto documents.
+
+Quarto pages block rendering on several stylesheets (bootstrap alone is
+~430 KB). Here we keep only the rules whose selectors can match markup at
+the top of the page, inline them in a <style> block, and switch the full
+stylesheets to asynchronous loading. Matching is deliberately
+conservative: a selector is kept unless it names a tag, class or id that
+does not appear above the fold, so the first paint looks like the final one.
+"""
+
+import functools
+import hashlib
+import os
+import re
+
+import rendered_html
+
+# Markup (from <body>) treated as above the fold
+ABOVE_FOLD_BYTES = 16 * 1024
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_TOKEN = re.compile(r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[{};]""")
+WHITESPACE = re.compile(r"\s+")
+# At-rules whose content never affects the first paint of the page
+SKIPPED_AT_RULES = ("@font-face", "@keyframes", "@-webkit-keyframes", "@page")
+GROUPING_AT_RULES = ("@media", "@supports", "@container")
+
+# State-dependent selectors never apply on first paint
+INTERACTIVE = re.compile(r":(hover|focus|focus-visible|focus-within|active|visited)\b")
+ATTRIBUTE_SELECTOR = re.compile(r"\[\s*([\w-]+)[^\]]*\]")
+SELECTOR_NOISE = re.compile(r"\[[^\]]*\]|::?[\w-]+(?:\([^)]*\))?")
+SELECTOR_TOKEN = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*)")
+
+CUSTOM_PROPERTY = re.compile(r"""(--[\w-]+)\s*:((?:"[^"]*"|'[^']*'|[^;"'])*)(?:;|$)""")
+VAR_REFERENCE = re.compile(r"var\(\s*(--[\w-]+)")
+
+BODY_START = re.compile(r"<body\b", re.IGNORECASE)
+MARKUP_TAG = re.compile(r"<([a-zA-Z][\w-]*)")
+MARKUP_CLASS = re.compile(r'\bclass="([^"]*)"')
+MARKUP_ID = re.compile(r'\bid="([^"]*)"')
+MARKUP_ATTRIBUTE = re.compile(r'\s([\w-]+)(?==)')
+STYLESHEET_LINK = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+STYLESHEET_REL = re.compile(r'\brel="stylesheet"', re.IGNORECASE)
+ASYNC_STYLESHEET = (
+    'rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'"'
+)
+
+
+def parse_rules(css):
+    """
+    Split a stylesheet into ``(prelude, body)`` rules.
+
+    Grouping at-rules (``@media``, ``@supports``) get a list of nested
+    rules as their body; statements such as ``@import`` are dropped.
+    """
+    css = CSS_COMMENT.sub("", css)
+    rules = []
+    depth = 0
+    start = 0
+    prelude = None
+    for match in CSS_TOKEN.finditer(css):
+        token = match.group()
+        if token == "{":
+            if depth == 0:
+                prelude = WHITESPACE.sub(" ", css[start : match.start()]).strip()
+                start = match.end()
+            depth += 1
+        elif token == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                body = css[start : match.start()]
+                if prelude.startswith(GROUPING_AT_RULES):
+                    rules.append((prelude, parse_rules(body)))
+                elif not prelude.startswith(SKIPPED_AT_RULES):
+                    rules.append((prelude, WHITESPACE.sub(" ", body).strip()))
+                start = match.end()
+        elif token == ";" and depth == 0:
+            start = match.end()  # @charset/@import statements
+    return rules
+
+
+# Parsed stylesheets by content hash: every document ships its own copy of
+# bootstrap, but each distinct version only needs parsing once
+_parsed_stylesheets = {}
+
+
+@functools.lru_cache(maxsize=256)
+def _stylesheet_rules(path, mtime):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        css = f.read()
+    digest = hashlib.sha256(css.encode()).hexdigest()
+    if digest not in _parsed_stylesheets:
+        _parsed_stylesheets[digest] = parse_rules(css)
+    return _parsed_stylesheets[digest]
+
+
+def used_tokens(markup):
+    """Tags, ``.classes``, ``#ids`` and ``[attributes]`` present in markup."""
+    tokens = {"html", "body"}
+    tokens.update(tag.lower() for tag in MARKUP_TAG.findall(markup))
+    tokens.update(f"[{name.lower()}]" for name in MARKUP_ATTRIBUTE.findall(markup))
+    for classes in MARKUP_CLASS.findall(markup):
+        tokens.update("." + name for name in classes.split())
+    tokens.update("#" + element_id for element_id in MARKUP_ID.findall(markup))
+    return tokens
+
+
+def selector_matches(selector, tokens):
+    """True unless the selector requires something absent from ``tokens``."""
+    if INTERACTIVE.search(selector):
+        return False
+    for name in ATTRIBUTE_SELECTOR.findall(selector):
+        if f"[{name.lower()}]" not in tokens:
+            return False
+    simplified = SELECTOR_NOISE.sub(" ", selector)
+    for prefix, name in SELECTOR_TOKEN.findall(simplified):
+        token = prefix + (name if prefix else name.lower())
+        if token not in tokens:
+            return False
+    return True
+
+
+def matching_rules(rules, tokens):
+    """The rules (and grouping blocks) that can apply to the given tokens."""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            nested = matching_rules(body, tokens)
+            if nested:
+                kept.append((prelude, nested))
+        elif prelude.startswith("@") or any(
+            selector_matches(selector, tokens) for selector in prelude.split(",")
+        ):
+            kept.append((prelude, body))
+    return kept
+
+
+def _declarations(rules):
+    for prelude, body in rules:
+        if isinstance(body, list):
+            yield from _declarations(body)
+        else:
+            yield body
+
+
+def _prune_custom_properties(rules, used):
+    pruned = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            nested = _prune_custom_properties(body, used)
+            if nested:
+                pruned.append((prelude, nested))
+            continue
+        body = CUSTOM_PROPERTY.sub(
+            lambda m: m.group() if m.group(1) in used else "", body
+        ).strip()
+        if body:
+            pruned.append((prelude, body))
+    return pruned
+
+
+def serialize(rules):
+    return "".join(
+        f"{prelude}{{{serialize(body) if isinstance(body, list) else body}}}"
+        for prelude, body in rules
+    )
+
+
+def critical_rules(rules, tokens):
+    """
+    Serialize the rules that can apply to the given tokens.
+
+    Bootstrap declares hundreds of ``--bs-*`` custom properties on
+    ``:root`` (including large SVG data URIs); only those reachable through
+    ``var()`` from the kept rules are inlined.
+    """
+    kept = matching_rules(rules, tokens)
+    declarations = list(_declarations(kept))
+    definitions = {}
+    for body in declarations:
+        for name, value in CUSTOM_PROPERTY.findall(body):
+            definitions.setdefault(name, []).append(value)
+
+    used = set()
+    pending = {
+        name
+        for body in declarations
+        for name in VAR_REFERENCE.findall(CUSTOM_PROPERTY.sub("", body))
+    }
+    while pending:
+        name = pending.pop()
+        used.add(name)
+        for value in definitions.get(name, ()):
+            pending.update(set(VAR_REFERENCE.findall(value)) - used)
+    return serialize(_prune_custom_properties(kept, used))
+
+
+def _link_attributes(tag):
+    return dict(
+        (name.lower(), value) for name, value in rendered_html.ATTRIBUTE.findall(tag)
+    )
+
+
+def inline_critical_css(content):
+    """
+    Inline above-the-fold CSS and load same-origin stylesheets asynchronously.
+
+    Returns ``(content, critical_bytes)``; documents without local
+    stylesheets are returned unchanged with ``critical_bytes == 0``.
+    """
+    head_end = rendered_html.HEAD_END.search(content)
+    body_start = BODY_START.search(content)
+    if not head_end or not body_start:
+        return content, 0
+
+    links = []
+    for match in STYLESHEET_LINK.finditer(content, 0, head_end.start()):
+        attributes = _link_attributes(match.group())
+        path = rendered_html.static_file_path(attributes.get("href", ""))
+        if attributes.get("rel", "").lower() == "stylesheet" and path:
+            if os.path.exists(path):
+                links.append((match, path))
+    if not links:
+        return content, 0
+
+    above_fold = content[body_start.start() : body_start.start() + ABOVE_FOLD_BYTES]
+    tokens = used_tokens(above_fold)
+    # One pass over all stylesheets: variables defined in one are used in others
+    rules = []
+    for _match, path in links:
+        rules.extend(_stylesheet_rules(path, os.path.getmtime(path)))
+    critical = critical_rules(rules, tokens)
+
+    # The link elements stay where they are, so cascade order is unchanged
+    # however the stylesheets finish loading
+    pieces = []
+    position = 0
+    for index, (match, _path) in enumerate(links):
+        pieces.append(content[position : match.start()])
+        if index == 0:
+            pieces.append(f'<style id="critical-css">{critical}</style>\n')
+        tag = match.group()
+        asynchronous = STYLESHEET_REL.sub(ASYNC_STYLESHEET, tag, count=1)
+        pieces.append(f"{asynchronous}<noscript>{tag}</noscript>")
+        position = match.end()
+    pieces.append(content[position:])
+    return "".join(pieces), len(critical.encode())
@@ -0,0 +1,301 @@
+"""
+Streaming export of the append-only logs in ``data/``.
+
+Contact messages, ratings and certificate completions are stored as text
+blocks opened by a ``=== KIND YYYY-MM-DD HH:MM:SS ===`` header. Records
+are parsed one at a time from the file, so an export holds a single record
+in memory however large the log grows.
+
+Records are appended roughly, not strictly, in time order: header times
+are taken before the file is locked, and the legacy rating update rewrites
+the log. A date-range export still starts near its first match: a sparse
+index, one entry every ``INDEX_STRIDE`` records, pairs each block's byte
+offset with the latest header time up to the end of that block. Those
+times never decrease, so the index can be bisected for the first block
+that may hold a match, and every record from there is checked against
+both bounds. The index is extended incrementally as the file grows and
+rebuilt only when earlier content has been rewritten.
+
+Rating events (see ``rating_events``) are appended once per revision: a
+star rating followed by feedback is two records with the same event id.
+The ratings export keeps only each event's highest revision, found by a
+first pass over the ``Event:`` lines.
+"""
+
+import bisect
+import csv
+import io
+import json
+import os
+import re
+import threading
+import zlib
+from collections import namedtuple
+from datetime import datetime, time
+
+import rating_events
+
+HEADER = re.compile(
+    rb"^=== (MESSAGE|RATING|FEEDBACK UPDATE|CERTIFICATE) "
+    rb"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) ===\s*$"
+)
+SEPARATOR = re.compile(rb"^={10,}\s*$")
+FIELD = re.compile(r"^([A-Z][\w ]*): ?(.*)$")
+RATING_VALUE = re.compile(r"^(\d+)/5")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Records between index entries
+INDEX_STRIDE = 64
+# Target size of the chunks handed to the server
+CHUNK_BYTES = 64 * 1024
+
+Dataset = namedtuple("Dataset", ["path", "columns"])
+Record = namedtuple("Record", ["offset", "kind", "time", "fields"])
+
+DATASETS = {
+    "messages": Dataset(
+        "data/contact_messages.txt",
+        ("time", "name", "email", "subject", "message"),
+    ),
+    "ratings": Dataset(
+        "data/course_ratings.txt",
+        ("time", "kind", "rating", "feedback", "timestamp", "event"),
+    ),
+    "completers": Dataset(
+        "data/course_completers.txt",
+        ("time", "completer", "method", "timestamp"),
+    ),
+}
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class ExportError(ValueError):
+    """Raised for an invalid export request (e.g. a malformed date)."""
+
+
+def _record(offset, header, lines):
+    fields = {}
+    key = None
+    for line in lines:
+        match = FIELD.match(line)
+        # The message body is last and may contain "Key: value" lines itself
+        if match and key != "message":
+            key = match.group(1).lower()
+            fields[key] = match.group(2)
+        elif key:
+            # Continuation of a multi-line value (contact message bodies)
+            fields[key] = f"{fields[key]}\n{line}" if fields[key] else line
+    kind = header.group(1).decode().lower()
+    if "rating" in fields:
+        rating = RATING_VALUE.match(fields["rating"])
+        fields["rating"] = int(rating.group(1)) if rating else None
+    return Record(offset, kind, header.group(2).decode(), fields)
+
+
+def iter_records(path, offset=0):
+    """Yield each ``Record`` in ``path`` starting at byte ``offset``."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        header = None
+        start = 0
+        lines = []
+        for raw in f:
+            line_start = position
+            position += len(raw)
+            match = HEADER.match(raw)
+            if match:
+                if header:
+                    yield _record(start, header, lines)
+                header, start, lines = match, line_start, []
+            elif header and SEPARATOR.match(raw):
+                yield _record(start, header, lines)
+                header = None
+            elif header:
+                lines.append(raw.decode("utf-8", "replace").rstrip("\r\n"))
+        if header:
+            yield _record(start, header, lines)
+
+
+def _scan_headers(path, offset, count, entries):
+    """
+    Extend ``entries`` with the headers from ``offset``: a ``(latest time so
+    far, offset)`` entry per ``INDEX_STRIDE`` records.
+    """
+    latest = entries[-1][0] if entries else ""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # A record still being written; indexed on the next refresh
+            match = HEADER.match(raw)
+            if match:
+                latest = max(latest, match.group(2).decode())
+                if count % INDEX_STRIDE == 0:
+                    entries.append((latest, position))
+                else:
+                    entries[-1] = (latest, entries[-1][1])
+                count += 1
+            position += len(raw)
+    return count, position
+
+
+class OffsetIndex:
+    """Sparse, incrementally extended ``(time, offset)`` index of one log."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self.records = 0
+        self.size = 0
+        self.mtime = None
+        self._tail = b""  # Bytes just before ``size``, to detect rewrites
+        self._lock = threading.Lock()
+
+    def _unchanged_prefix(self, f):
+        if not self._tail:
+            return self.size == 0
+        f.seek(self.size - len(self._tail))
+        return f.read(len(self._tail)) == self._tail
+
+    def refresh(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self.entries, self.records, self.size, self._tail = [], 0, 0, b""
+                return
+            if (stat.st_size, stat.st_mtime_ns) == (self.size, self.mtime):
+                return
+            self.mtime = stat.st_mtime_ns
+            with open(self.path, "rb") as f:
+                appended = stat.st_size >= self.size and self._unchanged_prefix(f)
+            if not appended:
+                self.entries, self.records, self.size = [], 0, 0
+            self.records, self.size = _scan_headers(
+                self.path, self.size, self.records, self.entries
+            )
+            with open(self.path, "rb") as f:
+                f.seek(max(0, self.size - 64))
+                self._tail = f.read(64)
+
+    def start_offset(self, since):
+        """Byte offset before which every record is stamped before ``since``."""
+        self.refresh()
+        if since is None:
+            return 0
+        position = bisect.bisect_left(self.entries, (since,))
+        return self.entries[position][1] if position < len(self.entries) else self.size
+
+
+_indexes = {}
+
+
+def offset_index(path):
+    if path not in _indexes:
+        _indexes[path] = OffsetIndex(path)
+    return _indexes[path]
+
+
+def parse_bound(value, end_of_day=False):
+    """Normalize a ``YYYY-MM-DD[ HH:MM:SS]`` query value to header format."""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Invalid date: {value!r} (expected YYYY-MM-DD)")
+    if end_of_day and len(value) == 10:
+        moment = datetime.combine(moment.date(), time.max)
+    return moment.strftime(TIME_FORMAT)
+
+
+def latest_revisions(path):
+    """``{event id: highest revision}`` of the rating events logged in ``path``."""
+    latest = {}
+    with open(path, "rb") as f:
+        for raw in f:
+            match = rating_events.EVENT_LINE.match(raw)
+            if match:
+                event_id, revision = match.group(1).decode(), int(match.group(2))
+                latest[event_id] = max(revision, latest.get(event_id, 0))
+    return latest
+
+
+def _superseded(record, latest):
+    event_id, _, revision = record.fields.get("event", "").partition("/")
+    return revision.isdigit() and int(revision) < latest.get(event_id, 0)
+
+
+def records(dataset, since=None, until=None):
+    """
+    Yield the dataset's records with ``since <= time <= until``, leaving out
+    rating event revisions superseded by a later one.
+    """
+    path = DATASETS[dataset].path
+    if not os.path.exists(path):
+        return
+    latest = latest_revisions(path) if "event" in DATASETS[dataset].columns else {}
+    for record in iter_records(path, offset_index(path).start_offset(since)):
+        if since and record.time < since:
+            continue
+        if until and record.time > until:
+            # Not ``break``: a later record may still be stamped earlier
+            continue
+        if latest and _superseded(record, latest):
+            continue
+        yield record
+
+
+def _row(dataset, record):
+    values = {**record.fields, "time": record.time, "kind": record.kind}
+    return [values.get(column) for column in DATASETS[dataset].columns]
+
+
+def _csv_lines(dataset, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DATASETS[dataset].columns)
+    for record in rows:
+        writer.writerow(_row(dataset, record))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # Header only, when nothing matched
+
+
+def _ndjson_lines(dataset, rows):
+    columns = DATASETS[dataset].columns
+    for record in rows:
+        yield json.dumps(dict(zip(columns, _row(dataset, record))), ensure_ascii=False)
+        yield "\n"
+
+
+def _chunked(pieces):
+    chunk = []
+    size = 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(dataset, fmt, since=None, until=None, gzip=False):
+    """Generator of encoded ``fmt`` chunks for the dataset's records."""
+    lines = _csv_lines if fmt == "csv" else _ndjson_lines
+    chunks = _chunked(lines(dataset, records(dataset, since, until)))
+    return _gzipped(chunks) if gzip else chunks
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings, read from the working directory by default (``Procfile``).
+
+Importing ``app`` has no side effects beyond building the Flask app, so
+background work that should only run in a serving process is started here,
+once each worker has loaded the app.
+"""
+
+
+def post_worker_init(worker):
+    from app import start_background_builds
+
+    start_background_builds()
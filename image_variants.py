@@ -0,0 +1,217 @@
+"""
+Responsive variants of the figure PNGs in rendered Quarto documents.
+
+Quarto writes figures at twice their display width (1344px for a 672px
+figure). Each figure is re-encoded as AVIF/WebP (and downsized PNG for
+browsers that accept neither) at the widths in ``VARIANT_WIDTHS`` plus its
+own width. Variants are cached on disk under the SHA-256 of the source
+bytes, so re-rendered figures get fresh variants and unchanged ones are
+never encoded twice.
+
+Pillow is imported lazily; without it figures are served unchanged and no
+``srcset`` is emitted.
+"""
+
+import functools
+import os
+import re
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import cache_dirs
+import rendered_html
+
+IMAGE_CACHE_DIR = cache_dirs.resolve("IMAGE_CACHE_DIR", "images")
+
+# CSS pixel widths offered in srcset, in addition to the figure's own width
+VARIANT_WIDTHS = (480, 672)
+
+# Pillow format name, MIME type and encoder options; listed by preference
+FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 60}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 6}),
+    "png": ("PNG", "image/png", {"optimize": True}),
+}
+
+FIGURE = re.compile(r"_files[\\/]figure-html[\\/][^\\/]+\.png$")
+IMG_TAG = re.compile(r"<img\b([^>]*)>", re.IGNORECASE)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def is_figure(path):
+    """True for figure PNGs written by Quarto/knitr."""
+    return bool(FIGURE.search(path))
+
+
+def png_size(path):
+    """Read ``(width, height)`` from a PNG's IHDR chunk, or None."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(24)
+    except OSError:
+        return None
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE):
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+@functools.lru_cache(maxsize=None)
+def supported_formats():
+    """Formats the installed Pillow can encode, in order of preference."""
+    try:
+        from PIL import features
+    except ImportError:
+        return ()
+    available = [name for name in ("avif", "webp") if features.check(name)]
+    return tuple(available + ["png"])
+
+
+def best_format(accept_mimetypes):
+    """
+    Pick the preferred format the client explicitly accepts.
+
+    Browsers list ``image/avif``/``image/webp`` by name when they support
+    them; a bare ``*/*`` (curl, old browsers) gets PNG.
+    """
+    accepted = {value for value, quality in accept_mimetypes if quality > 0}
+    for name in supported_formats():
+        if FORMATS[name][1] in accepted:
+            return name
+    return "png"
+
+
+def variant_widths(width):
+    """Widths to offer for a figure ``width`` pixels wide."""
+    return [w for w in VARIANT_WIDTHS if w < width] + [width]
+
+
+def variant(path, width=None, fmt="png"):
+    """
+    Return ``(file path, mimetype)`` of the requested figure variant.
+
+    ``width`` is rounded up to the nearest offered width so clients cannot
+    request arbitrary resizes. The original file is returned when no
+    re-encoding is needed or Pillow is unavailable.
+    """
+    size = png_size(path)
+    if size is None or fmt not in supported_formats():
+        return path, "image/png"
+
+    widths = variant_widths(size[0])
+    width = next((w for w in widths if w >= (width or size[0])), size[0])
+    if fmt == "png" and width == size[0]:
+        return path, "image/png"
+
+    pillow_format, mimetype, options = FORMATS[fmt]
+    cache_dir = cache_dirs.ensure_private(IMAGE_CACHE_DIR)
+    digest = cache_dirs.content_hash(path)
+    target = os.path.join(cache_dir, f"{digest}-{width}.{fmt}")
+    if not os.path.exists(target):
+        _encode(path, target, width, pillow_format, options)
+    return target, mimetype
+
+
+def _encode(path, target, width, pillow_format, options):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if width < image.width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+        # Write to a temporary name first so concurrent workers never serve
+        # a half-written file
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, pillow_format, **options)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+def _srcset(url, path):
+    size = png_size(path)
+    if size is None:
+        return None
+    # srcset is whitespace/comma separated, so the URL must be encoded
+    encoded = quote(url, safe="/%:@&=+$;~-_.!*()")
+    candidates = [
+        f"{encoded}?w={w} {w}w" if w < size[0] else f"{encoded} {w}w"
+        for w in variant_widths(size[0])
+    ]
+    return ", ".join(candidates)
+
+
+def responsive_images(content):
+    """
+    Add ``srcset``/``sizes`` to figure <img> tags and lazy-load every image.
+
+    Expects ``src`` attributes already rewritten to ``/static_files/`` URLs.
+    """
+    with_srcset = bool(supported_formats())
+
+    def rewrite(match):
+        attributes = match.group(1)
+        extra = []
+        if "loading=" not in attributes:
+            extra.append('loading="lazy"')
+        if "decoding=" not in attributes:
+            extra.append('decoding="async"')
+
+        src = re.search(r'\bsrc="([^"]*)"', attributes)
+        path = src and rendered_html.static_file_path(src.group(1))
+        if with_srcset and path and is_figure(path) and "srcset=" not in attributes:
+            srcset = _srcset(src.group(1), path)
+            if srcset:
+                extra.append(f'srcset="{srcset}"')
+                width = re.search(r'\bwidth="(\d+)"', attributes)
+                if width:
+                    extra.append(
+                        f'sizes="(max-width: {width.group(1)}px) 100vw, '
+                        f'{width.group(1)}px"'
+                    )
+
+        if not extra:
+            return match.group(0)
+        closing = "/" if attributes.rstrip().endswith("/") else ""
+        attributes = attributes.rstrip().rstrip("/")
+        return f"<img{attributes} {' '.join(extra)}{closing}>"
+
+    return IMG_TAG.sub(rewrite, content)
+
+
+def find_figures(roots):
+    """All figure PNGs under the given directories."""
+    figures = []
+    for root_dir in roots:
+        for root, dirs, files in os.walk(root_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if is_figure(path):
+                    figures.append(path)
+    return sorted(figures)
+
+
+def _build_variants(path):
+    size = png_size(path)
+    outputs = set()
+    for fmt in supported_formats():
+        for width in variant_widths(size[0]):
+            outputs.add(variant(path, width, fmt)[0])
+    outputs.discard(path)
+    return os.path.getsize(path), sorted(outputs)
+
+
+def build_all(roots, jobs=None):
+    """
+    Pre-generate every variant of every figure under ``roots``.
+
+    Returns ``{path: (source bytes, [variant paths])}``. Pillow releases
+    the GIL while encoding, so a thread pool parallelizes well.
+    """
+    figures = find_figures(roots)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        return dict(zip(figures, executor.map(_build_variants, figures)))
@@ -0,0 +1,173 @@
+"""
+Integrity check of the links and asset references in everything the
+portal serves.
+
+Every read-only route of the catalog (``static_export.collect_routes``:
+pages, ``/view`` documents, downloads and module zips) is requested
+through the app itself, so each reference is resolved by the same lookup
+code a learner hits: the ``/view`` and ``/download`` file searches, the
+``/static_files`` paths written by ``fix_html_static_paths``, figure
+variants and so on. HTML responses are scanned for ``href``, ``src``,
+``poster`` and ``srcset`` references; same-origin ones are resolved
+against the page URL and requested once each with ``HEAD``. Pages and
+references are both checked on a thread pool. Catalog files that no
+longer exist on disk are reported too.
+
+``check`` returns a JSON-ready report whose ``ok`` is false when anything
+is broken, so ``flask check-links --json`` can gate a deploy.
+"""
+
+import html
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from werkzeug.test import Client
+
+import static_export
+import usage_stats
+
+URL_TAG = re.compile(
+    r"<(a|area|audio|embed|iframe|img|link|script|source|track|video)\b([^>]*)>",
+    re.IGNORECASE,
+)
+ATTRIBUTE = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+# Inline script bodies and comments hold markup-like strings, not links
+INERT = re.compile(
+    r"(<script\b[^>]*>).*?</script\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL
+)
+URL_ATTRIBUTES = ("href", "src", "poster")
+SKIPPED_SCHEMES = ("data:", "javascript:", "mailto:", "tel:")
+
+Reference = namedtuple("Reference", ["page", "tag", "attribute", "url"])
+
+
+def _srcset_urls(value):
+    return [candidate.split()[0] for candidate in value.split(",") if candidate.split()]
+
+
+def resolve(page_url, value):
+    """
+    Local URL a reference on ``page_url`` points to, without its fragment.
+
+    Returns ``None`` for same-page anchors and non-HTTP schemes, and
+    ``False`` for links to other sites.
+    """
+    value = html.unescape(value).strip()
+    if not value or value.startswith("#") or value.lower().startswith(SKIPPED_SCHEMES):
+        return None
+    parts = urlsplit(urljoin(page_url, value))
+    if parts.scheme or parts.netloc:
+        return False
+    return urlunsplit(("", "", parts.path, parts.query, ""))
+
+
+def references(page_url, content):
+    """``(local references, external link count)`` of an HTML document."""
+    content = INERT.sub(lambda match: match.group(1) or "", content)
+    found = []
+    external = 0
+    for tag, body in URL_TAG.findall(content):
+        for name, value in ATTRIBUTE.findall(body):
+            name = name.lower()
+            if name in URL_ATTRIBUTES:
+                values = [value]
+            elif name == "srcset":
+                values = _srcset_urls(html.unescape(value))
+            else:
+                continue
+            for candidate in values:
+                url = resolve(page_url, candidate)
+                if url is False:
+                    external += 1
+                elif url:
+                    found.append(Reference(page_url, tag.lower(), name, url))
+    return found, external
+
+
+class LinkChecker:
+    """Crawls routes through a WSGI app and checks what they reference."""
+
+    def __init__(self, wsgi_app, jobs=16):
+        self.wsgi_app = wsgi_app
+        self.jobs = jobs
+        self._local = threading.local()
+
+    def _open(self, url, method):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(self.wsgi_app)
+        # Checker traffic is not learner usage
+        environ = {usage_stats.INTERNAL_REQUEST: True}
+        return client.open(url, method=method, environ_overrides=environ)
+
+    def _crawl(self, url):
+        response = self._open(url, "GET")
+        try:
+            if response.status_code >= 400 or response.mimetype != "text/html":
+                return url, response.status_code, None, 0
+            content = response.get_data(as_text=True)
+        finally:
+            response.close()
+        found, external = references(url, content)
+        return url, response.status_code, found, external
+
+    def _status(self, url):
+        response = self._open(url, "HEAD")
+        response.close()
+        return response.status_code
+
+    def check(self, routes, missing_files=()):
+        """Check ``routes`` and everything they reference; return the report."""
+        started = time.perf_counter()
+        statuses = {}
+        referrers = defaultdict(list)
+        documents = external = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for url, status, found, links_out in executor.map(self._crawl, routes):
+                statuses[url] = status
+                if found is None:
+                    continue  # Not an HTML document
+                documents += 1
+                external += links_out
+                for reference in found:
+                    referrers[reference.url].append(reference)
+
+            pending = [url for url in referrers if url not in statuses]
+            statuses.update(zip(pending, executor.map(self._status, pending)))
+
+        catalog_urls = set(routes)
+        broken = [
+            {
+                "url": url,
+                "status": status,
+                "catalog": url in catalog_urls,
+                "referrers": [
+                    {"page": ref.page, "tag": ref.tag, "attribute": ref.attribute}
+                    for ref in referrers.get(url, [])
+                ],
+            }
+            for url, status in sorted(statuses.items())
+            if status >= 400
+        ]
+        missing = [{"owner": owner, "path": path} for owner, path in missing_files]
+        return {
+            "ok": not broken and not missing,
+            "seconds": round(time.perf_counter() - started, 2),
+            "routes": len(routes),
+            "documents": documents,
+            "references": sum(map(len, referrers.values())),
+            "checked": len(statuses),
+            "external": external,
+            "broken": broken,
+            "missing_files": missing,
+        }
+
+
+def check_site(wsgi_app, catalog, jobs=16):
+    """Report for every read-only route of ``catalog`` (a ``Catalog``)."""
+    routes = static_export.collect_routes(catalog.modules, catalog.bonus_resources)
+    return LinkChecker(wsgi_app, jobs).check(routes, catalog.missing_files())
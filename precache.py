@@ -0,0 +1,215 @@
+"""
+Precache manifest for the offline service worker (``static/sw.js``).
+
+Entries are grouped so the worker can cache the site shell when it
+installs, and a module's material (its page, rendered documents,
+downloads and the Quarto supporting files those documents reference) once
+the learner opens that module. Each entry's revision is the SHA-256 of the
+bytes the app serves for it, so a re-rendered document or a changed asset
+invalidates exactly that entry and nothing else.
+
+Building the manifest crawls every route, so it is never done in a
+request. ``flask build-precache`` (also run by ``build-renders`` and
+``export-static``) writes it to a file and ``ManifestStore`` serves that
+copy. When the material changes without a build, the store notices within
+``CHECK_INTERVAL`` seconds and rebuilds the file on a background thread.
+
+The worker loads pages from the network first and falls back to these
+copies offline; only subresources (styles, scripts, figures) are served
+from the cache first. Pages that only make sense online, such as the
+contact form and its flash messages, are left out of the shell.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from werkzeug.test import Client
+
+import usage_stats
+
+SHELL_ROUTES = (
+    "/",
+    "/modules",
+    "/bonus",
+    "/static/css/styles.css",
+    "/static/js/main.js",
+)
+
+# Directories whose contents feed the manifest; any change rebuilds it
+SOURCE_ROOTS = ("training_material", "bonus_resources", "templates", "static")
+
+STATIC_FILE_URL = re.compile(r'(?:src|href|data-src)="(/static_files/[^"?#]+)"')
+
+# Seconds between checks of SOURCE_ROOTS for changes made without a build
+CHECK_INTERVAL = 60
+
+
+class PrecacheError(RuntimeError):
+    """Raised when a listed route or asset cannot be fetched for the manifest."""
+
+
+def _basename(path):
+    return path.split("/")[-1]
+
+
+def fingerprint(roots=SOURCE_ROOTS):
+    """Cheap change detector: newest mtime and file count under ``roots``."""
+    newest = 0.0
+    count = 0
+    for source_root in roots:
+        for root, dirs, files in os.walk(source_root):
+            for filename in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, filename)))
+                count += 1
+    return newest, count
+
+
+def _module_routes(module_id, module):
+    routes = [f"/module/{module_id}"]
+    for filename in module["files"].values():
+        routes.append(f"/view/{_basename(filename)}")
+        if not filename.endswith(".html"):
+            routes.append(f"/download/{_basename(filename)}")
+    return list(dict.fromkeys(routes))
+
+
+def _bonus_routes(bonus_resources):
+    routes = []
+    for resource in bonus_resources.values():
+        routes.append(f"/view/{_basename(resource['file'])}")
+        routes.append(f"/download/{_basename(resource['file'])}")
+    return list(dict.fromkeys(routes))
+
+
+def _get(client, url):
+    # The crawl is not learner usage
+    response = client.get(url, environ_overrides={usage_stats.INTERNAL_REQUEST: True})
+    if response.status_code != 200:
+        # An incomplete manifest would be stored as if it were current
+        raise PrecacheError(f"{url} answered HTTP {response.status_code}")
+    return response
+
+
+def _entries(client, routes):
+    """Fetch each route once; add the /static_files assets documents use."""
+    entries = {}
+    for url in routes:
+        response = _get(client, url)
+        body = response.get_data()
+        entries[url] = hashlib.sha256(body).hexdigest()
+        if response.mimetype != "text/html" or not url.startswith("/view/"):
+            continue
+
+        for asset_url in STATIC_FILE_URL.findall(body.decode("utf-8", "replace")):
+            if asset_url not in entries:
+                asset = _get(client, asset_url).get_data()
+                entries[asset_url] = hashlib.sha256(asset).hexdigest()
+    return [{"url": url, "revision": revision} for url, revision in entries.items()]
+
+
+def build_manifest(app, modules, bonus_resources, wsgi_app=None):
+    """
+    Return ``{"version", "sources", "shell", "modules": {id: [...]}, "bonus"}``.
+
+    Every entry is ``{"url", "revision"}``; ``sources`` is the
+    ``fingerprint`` of the files the manifest was built from. Routes are
+    requested through ``wsgi_app`` (default: the app's own WSGI callable);
+    pass the app below admission control so a crawl under load is not
+    turned away. Raises ``PrecacheError`` if any listed URL fails.
+    """
+    sources = list(fingerprint())
+    client = Client(wsgi_app or app.wsgi_app)
+    manifest = {
+        "shell": _entries(client, SHELL_ROUTES),
+        "modules": {
+            str(module_id): _entries(client, _module_routes(module_id, module))
+            for module_id, module in sorted(modules.items())
+        },
+        "bonus": _entries(client, _bonus_routes(bonus_resources)),
+    }
+
+    digest = hashlib.sha256()
+    groups = [manifest["shell"], manifest["bonus"], *manifest["modules"].values()]
+    for group in groups:
+        for entry in group:
+            digest.update(f"{entry['url']}={entry['revision']}\n".encode())
+    manifest["version"] = digest.hexdigest()
+    manifest["sources"] = sources
+    return manifest
+
+
+def write_manifest(manifest, path):
+    """Atomically replace the stored manifest at ``path``."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class ManifestStore:
+    """Serves the stored manifest; rebuilds it off the request path if stale."""
+
+    def __init__(self, path, build, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.build = build
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = (None, None)  # (mtime, manifest)
+        self._checked = None
+        self._building = False
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if self._loaded[0] != mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    self._loaded = (mtime, json.load(f))
+        except (OSError, ValueError):
+            return None
+        return self._loaded[1]
+
+    def get(self):
+        """The stored manifest, or ``None`` until the first build finishes."""
+        manifest = self._load()
+        now = time.monotonic()
+        with self._lock:
+            due = self._checked is None or now - self._checked >= self.check_interval
+            if (due or manifest is None) and not self._building:
+                self._checked = now
+                self._building = True
+                threading.Thread(
+                    target=self._refresh, name="precache-build", daemon=True
+                ).start()
+        return manifest
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Warning: could not build the precache manifest: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def refresh(self, force=False):
+        """
+        Rebuild and store the manifest if the sources changed; return it.
+
+        A failed build raises and leaves the stored manifest in place.
+        """
+        manifest = self._load()
+        if force or manifest is None or manifest.get("sources") != list(fingerprint()):
+            manifest = self.build()
+            write_manifest(manifest, self.path)
+        return self._load()
@@ -0,0 +1,193 @@
+"""
+Sampling profiler for slow requests.
+
+Requests only register their thread and start time. A single sampler
+thread wakes every ``interval`` while requests are in flight and records
+the stack of each request that has been running longer than
+``threshold`` seconds, or that was picked for random sampling
+(``sample_rate``). Stacks are stored collapsed (``outer;inner;leaf``) with
+a sample count, the input format of flamegraph.pl, speedscope and
+inferno. Finished profiles go into a bounded ring buffer per route.
+
+Fast requests pay for a dict insert and removal; the sampler sleeps while
+nothing is in flight and never walks stacks unless a request is due.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+from flask import request
+
+Profile = namedtuple(
+    "Profile", ["route", "path", "started", "duration", "reason", "samples"]
+)
+
+
+class _ActiveRequest:
+    __slots__ = ("route", "path", "started", "wall_started", "reason", "samples")
+
+    def __init__(self, route, path, reason):
+        self.route = route
+        self.path = path
+        self.started = time.monotonic()
+        self.wall_started = time.time()
+        self.reason = reason
+        self.samples = Counter()
+
+
+def collapse(frame):
+    """``outer;...;leaf`` for a frame, one ``function (file)`` per level."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        name = f"{code.co_name} ({os.path.basename(code.co_filename)})"
+        names.append(name.replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """Collects stacks of slow (or randomly chosen) requests per route."""
+
+    def __init__(self, threshold=1.0, sample_rate=0.0, interval=0.01, buffer_size=20):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._active = {}
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+
+    @property
+    def enabled(self):
+        return self.threshold is not None or self.sample_rate > 0
+
+    def start_request(self, route, path):
+        reason = "random" if random.random() < self.sample_rate else "threshold"
+        if reason == "threshold" and self.threshold is None:
+            return
+        self._active[threading.get_ident()] = _ActiveRequest(route, path, reason)
+        if self._sampler is None:
+            self._start_sampler()
+        self._wake.set()
+
+    def finish_request(self):
+        state = self._active.pop(threading.get_ident(), None)
+        if state is None or not state.samples:
+            return
+        profile = Profile(
+            state.route,
+            state.path,
+            state.wall_started,
+            time.monotonic() - state.started,
+            state.reason,
+            state.samples,
+        )
+        with self._lock:
+            buffer = self._profiles.setdefault(
+                state.route, deque(maxlen=self.buffer_size)
+            )
+            buffer.append(profile)
+
+    def _start_sampler(self):
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._sampler.start()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        """Record one stack for every in-flight request that is due."""
+        now = time.monotonic()
+        due = [
+            (ident, state)
+            for ident, state in list(self._active.items())
+            if state.reason == "random" or now - state.started >= self.threshold
+        ]
+        if not due:
+            return
+        frames = sys._current_frames()
+        for ident, state in due:
+            frame = frames.get(ident)
+            if frame is not None:
+                state.samples[collapse(frame)] += 1
+
+    def profiles(self, route=None):
+        """Buffered profiles, newest last, for one route or all of them."""
+        with self._lock:
+            if route is not None:
+                return list(self._profiles.get(route, ()))
+            return [profile for buffer in self._profiles.values() for profile in buffer]
+
+    def summary(self):
+        with self._lock:
+            routes = {route: list(buffer) for route, buffer in self._profiles.items()}
+        return {
+            "threshold_ms": None if self.threshold is None else self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "in_flight": len(self._active),
+            "routes": {
+                route: [
+                    {
+                        "path": profile.path,
+                        "started": time.strftime(
+                            "%Y-%m-%dT%H:%M:%S", time.localtime(profile.started)
+                        ),
+                        "duration_ms": round(profile.duration * 1000, 1),
+                        "reason": profile.reason,
+                        "samples": sum(profile.samples.values()),
+                    }
+                    for profile in profiles
+                ]
+                for route, profiles in routes.items()
+            },
+        }
+
+    def collapsed(self, route=None):
+        """Merged collapsed stacks (``stack count`` lines) for flame graphs."""
+        merged = Counter()
+        for profile in self.profiles(route):
+            merged.update(profile.samples)
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def install(self, app):
+        """Hook the profiler into a Flask app's request cycle."""
+        if not self.enabled:
+            return
+
+        @app.before_request
+        def start_profiling():
+            rule = request.url_rule
+            self.start_request(rule.rule if rule else "<unmatched>", request.path)
+
+        @app.teardown_request
+        def finish_profiling(exc=None):
+            self.finish_request()
+
+
+def from_env():
+    """Profiler configured by ``PROFILE_*`` environment variables."""
+    threshold = os.getenv("PROFILE_THRESHOLD_MS", "1000")
+    return Profiler(
+        threshold=float(threshold) / 1000 if threshold else None,
+        sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+        buffer_size=int(os.getenv("PROFILE_BUFFER", "20")),
+    )
@@ -0,0 +1,251 @@
+"""
+Server-side store for learner progress on the module learning objectives.
+
+Each learner's objective states for the whole course are kept as one packed
+bitset: module ``m`` owns byte ``m - 1`` and objective ``i`` of that module
+is bit ``i - 1`` of the byte. Adding modules or objectives therefore never
+moves existing bits. Conflicts between devices are resolved per objective,
+last writer wins, using the client timestamp of each toggle.
+
+Rows live in SQLite (standard library, safe across gunicorn workers), and
+cohort aggregates are computed column-wise over the concatenated bitsets
+with ``bytes.translate`` popcount tables instead of per-learner loops.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from array import array
+
+import catalog
+
+# One byte per module; the catalog refuses modules with more objectives
+OBJECTIVES_PER_MODULE = catalog.MAX_OBJECTIVES
+LEARNER_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Toggle timestamps (milliseconds) are stored in an unsigned 64-bit array
+MAX_TIMESTAMP = 2**64 - 1
+
+# POPCOUNT[b] is the number of set bits in byte b; BIT_TABLES[k][b] is bit k of b
+POPCOUNT = bytes(bin(value).count("1") for value in range(256))
+BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS learner_progress (
+    learner_id TEXT PRIMARY KEY,
+    bits BLOB NOT NULL,
+    stamps BLOB NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class ProgressError(ValueError):
+    """Raised for malformed sync requests."""
+
+
+def _is_int(value):
+    # JSON true/false are bools, which Python also counts as ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _width(modules):
+    return max(modules) if modules else 0
+
+
+def _full_mask(objective_count):
+    return (1 << min(objective_count, OBJECTIVES_PER_MODULE)) - 1
+
+
+def _unpack(row, width):
+    """Return (bits bytearray, stamps array) padded to the catalog width."""
+    bits = bytearray(width)
+    stamps = array("Q", bytes(8 * width * OBJECTIVES_PER_MODULE))
+    if row:
+        stored_bits, stored_stamps = row
+        bits[: len(stored_bits)] = stored_bits[:width]
+        saved = array("Q")
+        saved.frombytes(stored_stamps)
+        stamps[: len(saved)] = saved[: len(stamps)]
+    return bits, stamps
+
+
+def _apply(bits, stamps, toggles):
+    """Apply validated toggles in order; older ones than stored are ignored."""
+    for module_id, item_id, checked, timestamp in toggles:
+        slot = (module_id - 1) * OBJECTIVES_PER_MODULE + item_id - 1
+        if timestamp < stamps[slot]:
+            continue
+        stamps[slot] = timestamp
+        mask = 1 << (item_id - 1)
+        if checked:
+            bits[module_id - 1] |= mask
+        else:
+            bits[module_id - 1] &= ~mask & 0xFF
+
+
+def decode(bits, modules):
+    """Expand a bitset into {module_id: [completed item ids]}."""
+    progress = {}
+    for module_id, module in sorted(modules.items()):
+        byte = bits[module_id - 1] if module_id - 1 < len(bits) else 0
+        count = min(len(module["objectives"]), OBJECTIVES_PER_MODULE)
+        progress[module_id] = [item for item in range(1, count + 1) if byte >> (item - 1) & 1]
+    return progress
+
+
+class ProgressStore:
+    """Packed-bitset progress storage backed by a SQLite file."""
+
+    def __init__(self, path, modules):
+        self.path = path
+        self.modules = modules
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        connection.execute(SCHEMA)
+        return connection
+
+    def _validate_toggle(self, toggle):
+        if not isinstance(toggle, dict):
+            raise ProgressError(f"Malformed toggle: {toggle!r}")
+        module_id = toggle.get("module_id")
+        item_id = toggle.get("item_id")
+        checked = toggle.get("checked")
+        timestamp = toggle.get("timestamp")
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        if not (_is_int(module_id) and _is_int(item_id)):
+            raise ProgressError(f"Malformed toggle: {toggle!r}")
+        if not isinstance(checked, bool):
+            raise ProgressError(f"checked must be true or false: {toggle!r}")
+        if not _is_int(timestamp) or not 0 <= timestamp <= MAX_TIMESTAMP:
+            raise ProgressError(f"Invalid timestamp: {toggle!r}")
+
+        module = self.modules.get(module_id)
+        if module is None:
+            raise ProgressError(f"Unknown module: {module_id}")
+        count = min(len(module["objectives"]), OBJECTIVES_PER_MODULE)
+        if not 1 <= item_id <= count:
+            raise ProgressError(f"Unknown objective {item_id} for module {module_id}")
+        return module_id, item_id, checked, timestamp
+
+    def _validate_batch(self, toggles):
+        """``(valid toggles in timestamp order, [(index, message)])``."""
+        validated = []
+        rejected = []
+        for index, toggle in enumerate(toggles):
+            try:
+                validated.append(self._validate_toggle(toggle))
+            except ProgressError as e:
+                rejected.append((index, str(e)))
+        validated.sort(key=lambda t: t[3])
+        return validated, rejected
+
+    def load(self, learner_id):
+        """Return {module_id: [completed item ids]} for one learner."""
+        if not isinstance(learner_id, str) or not LEARNER_ID.match(learner_id):
+            raise ProgressError("Invalid learner id")
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT bits, stamps FROM learner_progress WHERE learner_id = ?",
+                (learner_id,),
+            ).fetchone()
+        finally:
+            connection.close()
+        bits, _stamps = _unpack(row, _width(self.modules))
+        return decode(bits, self.modules)
+
+    def sync(self, learner_id, toggles):
+        """
+        Apply a batch of toggles; return ``(merged progress, rejected)``.
+
+        A toggle only wins if its timestamp is not older than the last one
+        applied to the same objective, so replaying an offline device's
+        queue never overwrites newer changes made elsewhere. Malformed
+        toggles are skipped and reported in ``rejected`` as
+        ``(index, message)`` pairs; the rest of the batch is still applied.
+        """
+        if not isinstance(learner_id, str) or not LEARNER_ID.match(learner_id):
+            raise ProgressError("Invalid learner id")
+        if not isinstance(toggles, list):
+            raise ProgressError("toggles must be a list")
+        validated, rejected = self._validate_batch(toggles)
+
+        width = _width(self.modules)
+        connection = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so concurrent workers
+            # cannot interleave the read-modify-write below
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT bits, stamps FROM learner_progress WHERE learner_id = ?",
+                (learner_id,),
+            ).fetchone()
+            bits, stamps = _unpack(row, width)
+
+            _apply(bits, stamps, validated)
+            if validated:
+                connection.execute(
+                    "INSERT OR REPLACE INTO learner_progress VALUES (?, ?, ?, ?)",
+                    (learner_id, bytes(bits), stamps.tobytes(), time.time()),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        return decode(bits, self.modules), rejected
+
+    def cohort_summary(self):
+        """
+        Aggregate completion across all learners.
+
+        All bitsets are concatenated into one buffer with a fixed row width,
+        so each module is a strided column slice; popcounts and per-objective
+        counts are then ``bytes.translate`` + ``sum`` over whole columns.
+        """
+        width = _width(self.modules)
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT bits FROM learner_progress").fetchall()
+        finally:
+            connection.close()
+
+        learners = len(rows)
+        matrix = b"".join(bytes(bits[:width]).ljust(width, b"\0") for (bits,) in rows)
+
+        summary = {"learners": learners, "modules": {}, "course_completed": 0}
+        completed_all = None
+        for module_id, module in sorted(self.modules.items()):
+            column = matrix[module_id - 1 :: width]
+            count = min(len(module["objectives"]), OBJECTIVES_PER_MODULE)
+            full = _full_mask(count)
+            # Ignore bits of objectives that were removed from the catalog
+            column = column.translate(bytes(value & full for value in range(256)))
+            # One 0/1 byte per learner: has every objective of this module
+            is_full = bytes(int(value == full) for value in range(256))
+            module_full = column.translate(is_full)
+            summary["modules"][module_id] = {
+                "title": module["title"],
+                "objectives_completed": sum(column.translate(POPCOUNT)),
+                "learners_completed": sum(module_full),
+                "per_objective": [
+                    sum(column.translate(BIT_TABLES[bit])) for bit in range(count)
+                ],
+            }
+            # Combine the per-module flags across modules with one big-int AND
+            module_full = int.from_bytes(module_full, "big")
+            completed_all = (
+                module_full if completed_all is None else completed_all & module_full
+            )
+
+        summary["course_completed"] = bin(completed_all or 0).count("1")
+        return summary
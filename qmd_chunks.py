@@ -0,0 +1,127 @@
+"""
+R code chunks of Quarto/R Markdown documents.
+
+Chunks are fenced with ``` followed by an engine header, e.g.
+``{r}``, ``{r setup, include=FALSE}`` or ``{r, eval=FALSE}``. Options
+come from the header (knitr style, the first bare value being the label)
+and from ``#|`` comment lines at the top of the chunk (Quarto style),
+which take precedence. Fenced blocks of other engines and plain code
+blocks are skipped without looking inside them.
+"""
+
+import re
+from collections import namedtuple
+
+FENCE_OPEN = re.compile(r"^\s*(`{3,})\s*\{([a-zA-Z]\w*)(.*)\}\s*$")
+FENCE_ANY = re.compile(r"^\s*(`{3,})")
+# Display-only code blocks (```r or ```{.r}) that are not executed
+DISPLAY_FENCE = re.compile(r"^\s*`{3,}\s*(\w+|\{\s*\.(\w+)[^}]*\})\s*$")
+CHUNK_OPTION = re.compile(r"^\s*#\|\s*([\w.-]+)\s*:\s*(.*?)\s*$")
+
+# ``line`` is the 1-based source line of the first code line
+Chunk = namedtuple("Chunk", ["label", "options", "line", "code"])
+
+
+def _split_header(header):
+    """Split ``a, b="x, y", c=list(1, 2)`` on top-level commas."""
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in header:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "\"'":
+            quote = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def header_options(header):
+    """Options of a chunk header such as ``setup, include=FALSE``."""
+    options = {}
+    for index, part in enumerate(_split_header(header)):
+        name, equals, value = part.partition("=")
+        if equals:
+            options[name.strip()] = _unquote(value)
+        elif index == 0:
+            options["label"] = _unquote(part)
+    return options
+
+
+def _closes(line, fence):
+    # A bare run of at least as many backticks ends the block
+    stripped = line.strip()
+    return len(stripped) >= len(fence) and not stripped.strip("`")
+
+
+def _display_engine(line):
+    display = DISPLAY_FENCE.match(line)
+    if not display:
+        return None
+    return (display.group(2) or display.group(1)).lower()
+
+
+def parse_chunks(text, engine="r", display=False):
+    """
+    Return the ``Chunk`` list for one engine, in document order.
+
+    With ``display`` set, plain code blocks of the language (``` r) are
+    included too, as chunks with a ``display`` option of ``"true"``.
+    """
+    chunks = []
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        opening = FENCE_ANY.match(lines[index])
+        if not opening:
+            index += 1
+            continue
+
+        fence = opening.group(1)
+        header = FENCE_OPEN.match(lines[index])
+        body_start = index + 1
+        index = body_start
+        while index < len(lines) and not _closes(lines[index], fence):
+            index += 1
+        body = lines[body_start:index]
+        index += 1
+        if header and header.group(2).lower() == engine:
+            options = header_options(header.group(3).lstrip(" ,"))
+        elif display and _display_engine(lines[body_start - 1]) == engine:
+            options = {"display": "true"}
+        else:
+            continue
+
+        consumed = 0
+        for line in body:
+            option = CHUNK_OPTION.match(line)
+            if not option:
+                break
+            options[option.group(1)] = _unquote(option.group(2))
+            consumed += 1
+        chunks.append(
+            Chunk(
+                options.pop("label", None),
+                options,
+                body_start + consumed + 1,
+                body[consumed:],
+            )
+        )
+    return chunks
@@ -0,0 +1,184 @@
+"""
+Idempotent bulk ingestion of course ratings.
+
+The browser coalesces star clicks and feedback edits into one event per
+rating and may deliver it more than once (debounced ``fetch``, then
+``sendBeacon`` on page hide, then a retry on the next visit). Each event
+carries a client-generated ``id`` and a ``revision`` that grows with
+every change, and is appended to the ratings log with an ``Event:
+<id>/<revision>`` line. A revision that is not newer than the one
+already recorded for its id is dropped as a duplicate.
+
+Bulk events are only ever appended: an update is a new revision, and
+the ratings export (``data_export.records``) keeps only each event's
+highest revision. The recorded revisions are kept in memory and caught
+up from the bytes appended since the last batch, under an exclusive file
+lock so that gunicorn workers never record the same revision twice.
+
+The legacy ``submit_simple_rating`` writes under the same lock
+(``RatingLog.locked``), but its feedback update rewrites the file in
+place, often making it longer. The last ``CHECK_BYTES`` scanned are
+therefore kept too: if the file was replaced, shrank, or no longer holds
+those bytes at the scanned offset, it is scanned again from the start.
+"""
+
+import contextlib
+import os
+import re
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+EVENT_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+EVENT_LINE = re.compile(rb"^Event: ([A-Za-z0-9_-]+)/(\d+)\s*$", re.MULTILINE)
+MAX_EVENTS = 100
+MAX_FEEDBACK = 2000
+# Scanned bytes compared on every batch to detect a rewritten log
+CHECK_BYTES = 1024
+
+
+class RatingError(ValueError):
+    """Raised for a malformed rating batch."""
+
+
+def parse_events(events):
+    """Validated ``{id: event}`` for a batch, keeping each id's last revision."""
+    if not isinstance(events, list):
+        raise RatingError("Expected a list of rating events.")
+    if len(events) > MAX_EVENTS:
+        raise RatingError(f"At most {MAX_EVENTS} events per request.")
+    latest = {}
+    for event in events:
+        if not isinstance(event, dict):
+            raise RatingError("Each rating event must be an object.")
+        event_id = event.get("id")
+        if not isinstance(event_id, str) or not EVENT_ID.match(event_id):
+            raise RatingError("Invalid rating event id.")
+        rating = event.get("rating")
+        if type(rating) is not int or not 1 <= rating <= 5:
+            raise RatingError("Rating must be an integer from 1 to 5.")
+        revision = event.get("revision", 1)
+        if type(revision) is not int or revision < 1:
+            raise RatingError("Revision must be a positive integer.")
+        feedback = event.get("feedback") or ""
+        if not isinstance(feedback, str) or len(feedback) > MAX_FEEDBACK:
+            raise RatingError(f"Feedback must be text of at most {MAX_FEEDBACK} chars.")
+        parsed = {
+            "id": event_id,
+            "revision": revision,
+            "rating": rating,
+            # One line per field keeps the log parseable
+            "feedback": " ".join(feedback.split()),
+            "timestamp": str(event.get("timestamp") or "")[:40],
+        }
+        if event_id not in latest or revision > latest[event_id]["revision"]:
+            latest[event_id] = parsed
+    return latest
+
+
+def format_entry(event, recorded_at):
+    """Log block for an event, in the format of ``submit_simple_rating``."""
+    if event["feedback"]:
+        lines = [
+            f"=== FEEDBACK UPDATE {recorded_at} ===",
+            f"Rating: {event['rating']}/5 stars (with additional feedback)",
+            f"Feedback: {event['feedback']}",
+        ]
+    else:
+        lines = [
+            f"=== RATING {recorded_at} ===",
+            f"Rating: {event['rating']}/5 stars",
+        ]
+    lines += [
+        f"Timestamp: {event['timestamp']}",
+        f"Event: {event['id']}/{event['revision']}",
+        "=" * 30,
+        "",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+class RatingLog:
+    """Append-only ratings log that records each event revision once."""
+
+    def __init__(self, path):
+        self.path = path
+        self._revisions = {}
+        self._scanned = 0
+        self._scanned_tail = b""
+        self._inode = None
+        self._lock = threading.Lock()
+
+    def _tail(self, f, offset):
+        start = max(0, offset - CHECK_BYTES)
+        f.seek(start)
+        return f.read(offset - start)
+
+    def _rewritten(self, f, info):
+        if (info.st_dev, info.st_ino) != self._inode or info.st_size < self._scanned:
+            return True
+        return self._tail(f, self._scanned) != self._scanned_tail
+
+    def _mark_scanned(self, f, offset):
+        self._scanned = offset
+        self._scanned_tail = self._tail(f, offset)
+
+    def _catch_up(self, f):
+        info = os.fstat(f.fileno())
+        if self._rewritten(f, info):
+            # Replaced, truncated or rewritten (legacy update path): scan it again
+            self._revisions.clear()
+            self._scanned = 0
+            self._inode = (info.st_dev, info.st_ino)
+        f.seek(self._scanned)
+        appended = f.read(info.st_size - self._scanned)
+        for match in EVENT_LINE.finditer(appended):
+            event_id, revision = match.group(1).decode(), int(match.group(2))
+            if revision > self._revisions.get(event_id, 0):
+                self._revisions[event_id] = revision
+        self._mark_scanned(f, info.st_size)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        The log opened for appending (``a+b``) under the exclusive lock.
+
+        Every write to the log, including the legacy rewrite in
+        ``submit_simple_rating``, must go through this so none is lost.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, "a+b") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def ingest(self, events):
+        """Append new revisions in one write; returns ``(accepted, duplicates)``."""
+        latest = parse_events(events)
+        recorded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.locked() as f:
+            self._catch_up(f)
+            new = [
+                event
+                for event in latest.values()
+                if event["revision"] > self._revisions.get(event["id"], 0)
+            ]
+            if new:
+                block = "".join(format_entry(event, recorded_at) for event in new)
+                f.write(block.encode("utf-8"))
+                f.flush()
+                for event in new:
+                    self._revisions[event["id"]] = event["revision"]
+                self._mark_scanned(f, f.tell())
+        return len(new), len(events) - len(new)
@@ -0,0 +1,170 @@
+"""
+Incremental Quarto render scheduler for the course material.
+
+Works out which rendered HTML documents belong to which Quarto sources
+(from the MODULES and BONUS_RESOURCES catalogs), finds the ones whose
+sources changed since the last render and re-renders only those, in
+parallel, through a configurable render command.
+"""
+
+import os
+import re
+import shlex
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Placeholders: {source}, {output}, {output_dir}, {output_name}, {source_dir}
+DEFAULT_RENDER_COMMAND = "quarto render {source} --output-dir {output_dir}"
+
+NUMBER_PREFIX = re.compile(r"^\d+_")
+INCLUDE_SHORTCODE = re.compile(r"\{\{<\s*include\s+([^\s>]+)\s*>\}\}")
+
+RenderTarget = namedtuple("RenderTarget", ["source", "output", "dependencies"])
+RenderResult = namedtuple("RenderResult", ["target", "ok", "seconds", "log"])
+
+
+def _included_files(source):
+    """Return files pulled into a QMD document with {{< include >}}."""
+    try:
+        with open(source, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        return []
+
+    source_dir = os.path.dirname(source)
+    return [
+        os.path.normpath(os.path.join(source_dir, include))
+        for include in INCLUDE_SHORTCODE.findall(content)
+    ]
+
+
+def _bonus_source_for(rendered_path):
+    """Map a rendered bonus HTML file to its QMD source, if there is one."""
+    base_name = os.path.splitext(os.path.basename(rendered_path))[0]
+    for candidate in (NUMBER_PREFIX.sub("", base_name), base_name):
+        source = os.path.join("bonus_resources", "source", f"{candidate}.qmd")
+        if os.path.exists(source):
+            return source
+    return None
+
+
+def collect_targets(modules, bonus_resources):
+    """Build the dependency graph: one target per rendered HTML document."""
+    targets = []
+
+    for module_id in sorted(modules):
+        files = modules[module_id]["files"]
+        for kind in ("theory", "solution"):
+            source = files.get(kind)
+            output = files.get(f"{kind}_html")
+            if source and output and source.endswith(".qmd"):
+                dependencies = [source] + _included_files(source)
+                targets.append(RenderTarget(source, output, tuple(dependencies)))
+
+    for resource in bonus_resources.values():
+        output = resource["file"]
+        if not output.endswith(".html"):
+            continue
+        source = _bonus_source_for(output)
+        if source:
+            dependencies = [source] + _included_files(source)
+            targets.append(RenderTarget(source, output, tuple(dependencies)))
+
+    return targets
+
+
+def is_stale(target):
+    """A target is stale when its output is missing or older than any dependency."""
+    if not os.path.exists(target.output):
+        return True
+
+    output_mtime = os.path.getmtime(target.output)
+    for dependency in target.dependencies:
+        if os.path.exists(dependency) and os.path.getmtime(dependency) > output_mtime:
+            return True
+    return False
+
+
+def stale_targets(targets, force=False):
+    """Return the targets that need to be rendered again."""
+    return [target for target in targets if force or is_stale(target)]
+
+
+def build_command(render_command, target):
+    """Expand the render command template for a single target."""
+    output_dir = os.path.abspath(os.path.dirname(target.output))
+    fields = {
+        "source": os.path.abspath(target.source),
+        "source_dir": os.path.abspath(os.path.dirname(target.source)),
+        "output": os.path.abspath(target.output),
+        "output_dir": output_dir,
+        "output_name": os.path.basename(target.output),
+    }
+    return [part.format(**fields) for part in shlex.split(render_command)]
+
+
+def _move_default_output(target):
+    """
+    Quarto names its output after the source; rename it to the catalog name.
+
+    Bonus resources are rendered as e.g. ``qc_validation_toolkit.html`` and
+    published as ``03_qc_validation_toolkit.html`` next to the same
+    ``qc_validation_toolkit_files`` directory.
+    """
+    source_stem = os.path.splitext(os.path.basename(target.source))[0]
+    default_output = os.path.join(os.path.dirname(target.output), f"{source_stem}.html")
+    if os.path.abspath(default_output) != os.path.abspath(target.output):
+        if os.path.exists(default_output):
+            os.replace(default_output, target.output)
+
+
+def render_target(target, render_command=DEFAULT_RENDER_COMMAND):
+    """Render one target; runs inside a worker process."""
+    started = time.perf_counter()
+    try:
+        if callable(render_command):
+            render_command(target.source, target.output)
+            log = ""
+        else:
+            completed = subprocess.run(
+                build_command(render_command, target),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            log = completed.stdout + completed.stderr
+        _move_default_output(target)
+        ok = os.path.exists(target.output)
+        if not ok:
+            log += f"\nRender finished but {target.output} was not produced"
+    except Exception as e:
+        # Any failure (missing binary, non-zero exit, timeout, a renderer
+        # error) fails this target only, never the whole build
+        ok = False
+        log = getattr(e, "stderr", None) or str(e)
+        if isinstance(log, bytes):
+            log = log.decode("utf-8", "replace")
+    return RenderResult(target, ok, time.perf_counter() - started, log)
+
+
+def render_all(targets, render_command=DEFAULT_RENDER_COMMAND, jobs=None):
+    """Render targets in a process pool and return their results in input order."""
+    if not targets:
+        return []
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(render_target, target, render_command): index
+            for index, target in enumerate(targets)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:  # The worker process itself failed
+                results[index] = RenderResult(targets[index], False, 0.0, str(e))
+
+    return [results[index] for index in range(len(targets))]
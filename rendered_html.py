@@ -0,0 +1,244 @@
+"""
+Helpers for the rendered Quarto/R Markdown HTML documents served by /view.
+
+The documents are static between deploys, so everything derived from them
+here is computed once per file version and cached by the caller.
+"""
+
+import html
+import os
+import re
+from collections import namedtuple
+from urllib.parse import quote, unquote
+
+TAG = re.compile(r"<(script|link)\b([^>]*)>", re.IGNORECASE)
+ATTRIBUTE = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+
+# Browsers ignore preloads beyond what they can use soon; keep the header short
+MAX_PRELOADS = 16
+
+# Source maps and server-side-rendering bundles are never used by the browser
+EXCLUDED_ASSET = re.compile(r"(\.map|\.server\.js|\.server\.js\.LICENSE\.txt)$")
+
+# htmlwidgets libraries (reactable tables and friends) and their dependencies
+WIDGET_SCRIPT = re.compile(
+    r'<script src="([^"]*/libs/'
+    r'(?:htmlwidgets|react|reactwidget|reactable|reactable-binding|core-js)-[\d.]+/'
+    r'[^"]*)"></script>'
+)
+WIDGET_ELEMENT = re.compile(r'class="[^"]*\bhtml-widget\b')
+BODY_END = re.compile(r"</body\s*>", re.IGNORECASE)
+
+# Loads the deferred widget scripts in order once a widget nears the viewport,
+# then renders the widgets (htmlwidgets only does this itself on DOMContentLoaded).
+LAZY_WIDGET_LOADER = """<script>
+(function () {
+  var pending = [].slice.call(document.querySelectorAll('script[type="text/lazy-widget"]'));
+  var widgets = document.querySelectorAll('.html-widget');
+  var started = false;
+  function loadNext() {
+    var placeholder = pending.shift();
+    if (!placeholder) {
+      if (window.HTMLWidgets) { window.HTMLWidgets.staticRender(); }
+      return;
+    }
+    var script = document.createElement('script');
+    script.src = placeholder.getAttribute('data-src');
+    script.onload = script.onerror = loadNext;
+    document.head.appendChild(script);
+  }
+  function start() {
+    if (!started) { started = true; loadNext(); }
+  }
+  if (!pending.length) { return; }
+  if (!('IntersectionObserver' in window) || !widgets.length) { start(); return; }
+  var observer = new IntersectionObserver(function (entries) {
+    if (entries.some(function (entry) { return entry.isIntersecting; })) {
+      observer.disconnect();
+      start();
+    }
+  }, { rootMargin: '200px 0px' });
+  [].forEach.call(widgets, function (widget) { observer.observe(widget); });
+})();
+</script>
+"""
+
+# Quarto wraps each heading and its content in <section id=... class="levelN">
+SECTION_TAG = re.compile(r"<(/?)section\b([^>]*)>", re.IGNORECASE)
+SECTION_LEVEL = re.compile(r"\blevel(\d)\b")
+HEADING = re.compile(r"<h([1-6])\b[^>]*>(.*?)</h\1\s*>", re.IGNORECASE | re.DOTALL)
+MARKUP = re.compile(r"<[^>]+>")
+
+Section = namedtuple("Section", ["id", "level", "title", "parent", "start", "end"])
+
+RenderedDocument = namedtuple(
+    "RenderedDocument",
+    ["content", "preload", "deferred", "source_bytes", "critical_css_bytes"],
+)
+
+
+def _attributes(tag_body):
+    return {name.lower(): value for name, value in ATTRIBUTE.findall(tag_body)}
+
+
+def asset_references(content):
+    """
+    Return the render-blocking assets referenced in the document <head>.
+
+    Yields ``(url, kind)`` tuples in document order, where ``kind`` is the
+    preload destination (``"style"`` or ``"script"``). Inline scripts, JSON
+    data blocks and non-stylesheet links are skipped.
+    """
+    head_end = HEAD_END.search(content)
+    head = content[: head_end.start()] if head_end else content
+
+    references = []
+    for tag, body in TAG.findall(head):
+        attributes = _attributes(body)
+        if tag.lower() == "script":
+            script_type = attributes.get("type", "text/javascript")
+            if "src" in attributes and "json" not in script_type:
+                references.append((attributes["src"], "script"))
+        elif attributes.get("rel", "").lower() == "stylesheet" and "href" in attributes:
+            references.append((attributes["href"], "style"))
+
+    # Drop duplicates while keeping the first occurrence
+    return list(dict.fromkeys(references))
+
+
+def preload_header(references, limit=MAX_PRELOADS):
+    """Build a ``Link`` header value preloading same-origin assets."""
+    links = []
+    for url, kind in references:
+        if not url.startswith("/") or url.startswith("//"):
+            continue  # Only preload assets served by this app
+        links.append(f"<{quote(url, safe='/%:@&=+$,;~-_.!*()')}>; rel=preload; as={kind}")
+        if len(links) >= limit:
+            break
+    return ", ".join(links)
+
+
+def is_excluded_asset(path):
+    """True for supporting files that should never be served to browsers."""
+    return bool(EXCLUDED_ASSET.search(path))
+
+
+def static_file_path(url):
+    """Map a /static_files/ URL back to the file it serves, or None."""
+    prefix = "/static_files/"
+    if not url.startswith(prefix):
+        return None
+    return unquote(url[len(prefix) :].split("?")[0].split("#")[0])
+
+
+def defer_widget_scripts(content):
+    """
+    Replace eager htmlwidgets <script> tags with lazy placeholders.
+
+    Returns ``(content, deferred_urls)``. Documents without widgets are
+    returned unchanged.
+    """
+    if not WIDGET_ELEMENT.search(content):
+        return content, []
+
+    deferred = WIDGET_SCRIPT.findall(content)
+    if not deferred:
+        return content, []
+
+    content = WIDGET_SCRIPT.sub(
+        r'<script type="text/lazy-widget" data-src="\1"></script>', content
+    )
+    body_end = BODY_END.search(content)
+    if body_end:
+        content = (
+            content[: body_end.start()] + LAZY_WIDGET_LOADER + content[body_end.start() :]
+        )
+    else:
+        content += LAZY_WIDGET_LOADER
+    return content, deferred
+
+
+def index_sections(content):
+    """
+    Index the heading sections of a rendered Quarto document.
+
+    Returns ``Section`` records in document order. ``start``/``end`` are
+    offsets of the complete ``<section>`` element (nested subsections
+    included), so a fragment is a plain slice of the content.
+    """
+    sections = []
+    stack = []
+    for match in SECTION_TAG.finditer(content):
+        if not match.group(1):
+            attributes = _attributes(match.group(2))
+            stack.append((attributes, match.start(), len(sections)))
+            sections.append(None)  # placeholder keeps document order
+            continue
+        if not stack:
+            continue
+        attributes, start, slot = stack.pop()
+        level = SECTION_LEVEL.search(attributes.get("class", ""))
+        if "id" not in attributes or not level:
+            continue
+        heading = HEADING.search(content, start, match.start())
+        title = ""
+        if heading:
+            title = html.unescape(MARKUP.sub("", heading.group(2))).strip()
+        parent = next(
+            (outer["id"] for outer, _start, _slot in reversed(stack) if "id" in outer),
+            None,
+        )
+        sections[slot] = Section(
+            attributes["id"], int(level.group(1)), title, parent, start, match.end()
+        )
+    return [section for section in sections if section]
+
+
+def _file_size(path):
+    """Size of ``path``, or 0 if there is no such file."""
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+def _excluded_bytes(files_dir):
+    """Bytes of the assets under a ``*_files`` directory that are not served."""
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, dirs, files in os.walk(files_dir)
+        for filename in files
+        if is_excluded_asset(filename)
+    )
+
+
+def slimming_report(document):
+    """
+    Bytes a browser no longer downloads for a processed document.
+
+    ``deferred_bytes`` are widget scripts moved off the critical path;
+    ``excluded_bytes`` are source maps and SSR bundles in the document's
+    supporting-files directories that are no longer served. The HTML itself
+    is reported as read (``source_bytes``) and as served (``served_bytes``),
+    which includes the ``critical_css_bytes`` inlined into it in exchange
+    for ``async_css_bytes`` of stylesheets no longer blocking first paint.
+    """
+    deferred_bytes = sum(_file_size(static_file_path(url)) for url in document.deferred)
+
+    files_dirs = set()
+    async_css_bytes = 0
+    for url, kind in asset_references(document.content):
+        path = static_file_path(url)
+        if path and "_files/" in path:
+            files_dirs.add(path[: path.index("_files/") + len("_files")])
+        if kind == "style" and document.critical_css_bytes:
+            async_css_bytes += _file_size(path)
+
+    excluded_bytes = sum(map(_excluded_bytes, files_dirs))
+
+    return {
+        "deferred_bytes": deferred_bytes,
+        "excluded_bytes": excluded_bytes,
+        "source_bytes": document.source_bytes,
+        "served_bytes": len(document.content.encode()),
+        "critical_css_bytes": document.critical_css_bytes,
+        "async_css_bytes": async_css_bytes,
+    }
@@ -4,7 +4,7 @@ ClinicalRTransition - Flask Application Startup Script
 Chiara Internal Training Portal
 """
 
-from app import app
+from app import app, start_background_builds
 
 if __name__ == "__main__":
     print("🚀 Starting ClinicalRTransition...")
@@ -14,6 +14,7 @@ if __name__ == "__main__":
     print("-" * 50)
 
     try:
+        start_background_builds()
         app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=True)
     except KeyboardInterrupt:
         print("\n👋 ClinicalRTransition stopped. Goodbye!")
@@ -0,0 +1,429 @@
+"""
+SAS transport (``.xpt``) datasets converted to CSV or Parquet.
+
+Both XPORT version 5 and version 8 libraries are read (the course's
+outputs are written by haven as version 8, which adds long variable
+names and labels). A library is a sequence of 80-byte header cards per
+member followed by fixed-length observations. Numbers are stored as IBM
+System/360 hexadecimal floats of 2 to 8 bytes and are converted exactly
+to IEEE doubles; variables with a SAS date or datetime format are
+written as ISO dates and timestamps.
+
+Observations are decoded in chunks of about ``CHUNK_BYTES``, so memory
+stays constant whatever the dataset size. Converted files are cached on
+disk under the SHA-256 of the ``.xpt`` bytes: the first request streams
+its CSV while writing the cache file, later ones are served from it.
+Parquet output needs pyarrow, which is imported lazily; without it only
+CSV is offered.
+"""
+
+import csv
+import functools
+import io
+import math
+import os
+import re
+import struct
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import cache_dirs
+
+XPT_CACHE_DIR = cache_dirs.resolve("XPT_CACHE_DIR", "xpt")
+CARD = 80
+# Observation bytes decoded per chunk
+CHUNK_BYTES = 64 * 1024
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+HEADER = re.compile(rb"^HEADER RECORD\*{7}(\w+) *HEADER RECORD!{7}")
+MEMBER_HEADERS = (b"MEMBER", b"MEMBV8")
+# ntype, nhfun, nlng, nvar0, nname, nlabel, nform, nfl, nfd, nfj, nfill,
+# niform, nifl, nifd, npos, then (version 8) the long name and label length
+NAMESTR = struct.Struct(">hhhh8s40s8shhh2s8shhl32sh18s")
+# First byte of a missing value (".", "._" and ".A" to ".Z"); the rest is zero
+MISSING = frozenset(b"._ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+SAS_EPOCH = datetime(1960, 1, 1)
+DATE_FORMATS = frozenset(
+    ["DATE", "DDMMYY", "E8601DA", "IS8601DA", "MMDDYY", "YYMMDD", "B8601DA"]
+)
+DATETIME_FORMATS = frozenset(["DATETIME", "E8601DT", "IS8601DT", "B8601DT"])
+
+Variable = namedtuple(
+    "Variable", ["name", "label", "numeric", "length", "position", "format"]
+)
+Member = namedtuple(
+    "Member", ["name", "label", "variables", "row_length", "rows", "start"]
+)
+
+
+class TransportError(ValueError):
+    """Raised when a file is not a readable SAS transport library."""
+
+
+def ibm_to_float(raw):
+    """IEEE double for big-endian IBM float bytes; ``None`` if missing."""
+    first = raw[0]
+    # Shorter numbers are truncated: the dropped low-order bytes were zero
+    mantissa = int.from_bytes(raw[1:], "big") << 8 * (8 - len(raw))
+    if not mantissa:
+        return None if first in MISSING else 0.0
+    value = math.ldexp(mantissa, 4 * ((first & 0x7F) - 64) - 56)
+    return -value if first & 0x80 else value
+
+
+def _text(raw):
+    raw = raw.rstrip(b" \0")
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def _to_date(value):
+    try:
+        return (SAS_EPOCH + timedelta(days=math.floor(value))).date()
+    except (OverflowError, ValueError):
+        return None
+
+
+def _to_datetime(value):
+    try:
+        return SAS_EPOCH + timedelta(seconds=value)
+    except (OverflowError, ValueError):
+        return None
+
+
+def kind(variable):
+    """``"text"``, ``"date"``, ``"datetime"`` or ``"number"``."""
+    if not variable.numeric:
+        return "text"
+    if variable.format in DATE_FORMATS:
+        return "date"
+    if variable.format in DATETIME_FORMATS:
+        return "datetime"
+    return "number"
+
+
+def _decoder(variable):
+    column_kind = kind(variable)
+    if column_kind == "text":
+        return _text
+    if column_kind == "number":
+        return ibm_to_float
+    convert = _to_date if column_kind == "date" else _to_datetime
+
+    def decode(raw):
+        value = ibm_to_float(raw)
+        return None if value is None else convert(value)
+
+    return decode
+
+
+def _header(card):
+    match = HEADER.match(card)
+    return match.group(1) if match else None
+
+
+def _read_card(f):
+    card = f.read(CARD)
+    if len(card) != CARD:
+        raise TransportError("Truncated SAS transport file.")
+    return card
+
+
+def _parse_labels(block, name, variables):
+    # LABELV8: number, name and label lengths; LABELV9 adds format lengths
+    fields = 3 if name == b"LABELV8" else 5
+    count = int(re.match(rb"\s*(\d*)", block[:CARD][48:]).group(1) or 0)
+    offset = CARD
+    for _ in range(count):
+        lengths = struct.unpack_from(f">{fields}h", block, offset)
+        offset += 2 * fields
+        number, name_length, label_length = lengths[:3]
+        long_name = block[offset : offset + name_length]
+        label = block[offset + name_length : offset + name_length + label_length]
+        offset += sum(lengths[1:])
+        if 0 <= number - 1 < len(variables):
+            variables[number - 1] = variables[number - 1]._replace(
+                name=_text(long_name), label=_text(label)
+            )
+
+
+def _read_member(f, version8, namestr_length):
+    _read_card(f)  # Descriptor header
+    first, second = _read_card(f), _read_card(f)
+    # Version 8 allows 32-character dataset names
+    name = _text(first[8:40] if version8 else first[8:16])
+    label = _text(second[32:72])
+
+    card = _read_card(f)
+    if _header(card) not in (b"NAMESTR", b"NAMSTV8"):
+        raise TransportError("Missing variable descriptors.")
+    count = int(card[48:58])
+    size = count * namestr_length
+    block = f.read(size + -size % CARD)
+    variables = []
+    for index in range(count):
+        raw = block[index * namestr_length : (index + 1) * namestr_length]
+        raw = raw.ljust(NAMESTR.size, b"\0")
+        fields = NAMESTR.unpack(raw)
+        ntype, length, short_name, var_label, form, position = (
+            fields[0],
+            fields[2],
+            fields[4],
+            fields[5],
+            fields[6],
+            fields[14],
+        )
+        long_name = _text(fields[15]) if version8 else ""
+        variables.append(
+            Variable(
+                long_name or _text(short_name),
+                _text(var_label),
+                ntype == 1,
+                length,
+                position,
+                _text(form).upper(),
+            )
+        )
+
+    card = _read_card(f)
+    while _header(card) in (b"LABELV8", b"LABELV9"):
+        block = [card]
+        while True:
+            card = _read_card(f)
+            if _header(card) in (b"OBS", b"OBSV8"):
+                break
+            block.append(card)
+        _parse_labels(b"".join(block), _header(block[0]), variables)
+    if _header(card) not in (b"OBS", b"OBSV8"):
+        raise TransportError("Missing observation header.")
+    stated_rows = int(card[48:63].strip() or 0)
+    row_length = sum(variable.length for variable in variables)
+    return name, label, variables, row_length, stated_rows
+
+
+def _data_end(f, start):
+    """Offset of the next member header after ``start`` (or end of file)."""
+    f.seek(start)
+    position = start
+    while True:
+        block = f.read(CARD * 1024)
+        if not block:
+            return position
+        for offset in range(0, len(block) - CARD + 1, CARD):
+            if _header(block[offset : offset + CARD]) in MEMBER_HEADERS:
+                return position + offset
+        position += len(block)
+
+
+def _row_count(f, start, end, row_length):
+    if not row_length:
+        return 0
+    rows = (end - start) // row_length
+    # Blank padding of the last card may look like short all-blank rows
+    while rows and (end - start) - (rows - 1) * row_length < CARD:
+        f.seek(start + (rows - 1) * row_length)
+        if f.read(row_length).strip(b" "):
+            break
+        rows -= 1
+    return rows
+
+
+@functools.lru_cache(maxsize=64)
+def _members(path, mtime, size):
+    members = []
+    with open(path, "rb") as f:
+        if _header(f.read(CARD)) not in (b"LIBRARY", b"LIBV8"):
+            name = os.path.basename(path)
+            raise TransportError(f"{name} is not a SAS transport file.")
+        f.seek(3 * CARD)
+        while True:
+            card = f.read(CARD)
+            if len(card) < CARD or _header(card) not in MEMBER_HEADERS:
+                break
+            name, label, variables, row_length, stated_rows = _read_member(
+                f, _header(card) == b"MEMBV8", int(card[74:78])
+            )
+            start = f.tell()
+            end = _data_end(f, start)
+            rows = stated_rows or _row_count(f, start, end, row_length)
+            members.append(
+                Member(name, label, tuple(variables), row_length, rows, start)
+            )
+            f.seek(end)
+    if not members:
+        raise TransportError(f"{os.path.basename(path)} contains no datasets.")
+    return tuple(members)
+
+
+def members(path):
+    """The ``Member`` datasets of a transport file."""
+    stat = os.stat(path)
+    return _members(path, stat.st_mtime, stat.st_size)
+
+
+def iter_chunks(path, member):
+    """Yield lists of decoded rows, about ``CHUNK_BYTES`` of input each."""
+    variables = member.variables
+    if not member.row_length:
+        return
+    # One struct unpacks a whole observation, in storage order
+    layout = sorted(range(len(variables)), key=lambda i: variables[i].position)
+    fmt = ">"
+    offset = 0
+    for index in layout:
+        variable = variables[index]
+        if variable.position > offset:
+            fmt += f"{variable.position - offset}x"
+        fmt += f"{variable.length}s"
+        offset = variable.position + variable.length
+    if member.row_length > offset:
+        fmt += f"{member.row_length - offset}x"
+    row_struct = struct.Struct(fmt)
+    decoders = [_decoder(variables[index]) for index in layout]
+    order = sorted(range(len(layout)), key=layout.__getitem__)
+
+    rows_per_chunk = max(1, CHUNK_BYTES // member.row_length)
+    remaining = member.rows
+    with open(path, "rb") as f:
+        f.seek(member.start)
+        while remaining:
+            count = min(rows_per_chunk, remaining)
+            data = f.read(count * member.row_length)
+            count = len(data) // member.row_length
+            if not count:
+                raise TransportError("Truncated SAS transport file.")
+            remaining -= count
+            chunk = []
+            for values in row_struct.iter_unpack(data[: count * row_struct.size]):
+                decoded = [decode(raw) for decode, raw in zip(decoders, values)]
+                chunk.append([decoded[position] for position in order])
+            yield chunk
+
+
+def _csv_value(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(path, member):
+    """Yield the member as UTF-8 CSV, one encoded chunk per decoded chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([variable.name for variable in member.variables])
+    for rows in iter_chunks(path, member):
+        writer.writerows([[_csv_value(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def parquet_available():
+    """Whether pyarrow is installed, so Parquet can be offered."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_parquet(path, member, target):
+    """Write the member to ``target`` as Parquet, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "text": pa.string(),
+        "number": pa.float64(),
+        "date": pa.date32(),
+        "datetime": pa.timestamp("us"),
+    }
+    schema = pa.schema(
+        [(variable.name, types[kind(variable)]) for variable in member.variables]
+    )
+    with pq.ParquetWriter(target, schema) as writer:
+        for rows in iter_chunks(path, member):
+            columns = [
+                pa.array([row[index] for row in rows], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        if not member.rows:
+            writer.write_table(schema.empty_table())
+
+
+def cache_path(path, member, fmt):
+    """Cache file of a converted member, keyed by the source content hash."""
+    safe_name = re.sub(r"[^\w-]", "_", member.name)
+    cache_dir = cache_dirs.ensure_private(XPT_CACHE_DIR)
+    digest = cache_dirs.content_hash(path)
+    return os.path.join(cache_dir, f"{digest}-{safe_name}.{fmt}")
+
+
+def _temporary():
+    return tempfile.mkstemp(dir=cache_dirs.ensure_private(XPT_CACHE_DIR))
+
+
+def stream_csv(path, member, target):
+    """Yield CSV chunks while saving them to ``target`` for later requests."""
+    fd, temporary = _temporary()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in csv_chunks(path, member):
+                f.write(chunk)
+                yield chunk
+        # Renamed only once complete, so no worker serves a partial file
+        os.replace(temporary, target)
+    except BaseException:
+        # Includes GeneratorExit when the client disconnects mid-download
+        os.unlink(temporary)
+        raise
+
+
+def build_parquet(path, member, target):
+    """Convert to Parquet in the cache unless already there; returns ``target``."""
+    if not os.path.exists(target):
+        fd, temporary = _temporary()
+        os.close(fd)
+        try:
+            write_parquet(path, member, temporary)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    return target
+
+
+def find_datasets(directory):
+    """``{dataset name: path}`` of the ``.xpt`` files under ``directory``."""
+    datasets = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() == ".xpt":
+                datasets.setdefault(stem, os.path.join(root, filename))
+    return datasets
+
+
+def describe(member):
+    """JSON-ready summary of a member."""
+    return {
+        "name": member.name,
+        "label": member.label,
+        "rows": member.rows,
+        "variables": [
+            {"name": variable.name, "label": variable.label, "type": kind(variable)}
+            for variable in member.variables
+        ],
+    }
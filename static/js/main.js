@@ -94,13 +94,15 @@ document.addEventListener('DOMContentLoaded', function() {
         // Load saved progress
         const moduleId = checkbox.dataset.moduleId;
         const itemId = checkbox.dataset.itemId;
-        const savedProgress = localStorage.getItem(`progress_${moduleId}_${itemId}`);
-        if (savedProgress === 'true') {
+        if (getObjectiveProgress(moduleId, itemId)) {
             checkbox.checked = true;
             updateProgressUI(checkbox);
         }
         checkbox.addEventListener('change', function() {
-            localStorage.setItem(`progress_${moduleId}_${itemId}`, this.checked);
+            setObjectiveProgress(moduleId, itemId, this.checked);
+            if (!applyingServerProgress) {
+                queueProgressToggle(moduleId, itemId, this.checked);
+            }
             updateProgressUI(this);
 
             // Update recent activity and overall progress
@@ -137,15 +139,14 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // --- Overall Progress (Modules Page) ---
     function updateOverallProgress() {
-        // Calculate progress from localStorage
         let totalObjectives = 0;
         let completedObjectives = 0;
 
-        // Count total objectives and completed ones from localStorage
-        for (let moduleId = 1; moduleId <= 7; moduleId++) {
-            const moduleKeys = Object.keys(localStorage).filter(key => key.startsWith(`progress_${moduleId}_`));
-            totalObjectives += moduleKeys.length;
-            completedObjectives += moduleKeys.filter(key => localStorage.getItem(key) === 'true').length;
+        // Count tracked objectives and completed ones from the progress model
+        for (const moduleId of courseModuleIds()) {
+            const { total, completed } = getModuleProgress(moduleId);
+            totalObjectives += total;
+            completedObjectives += completed;
         }
 
         const percent = totalObjectives > 0 ? Math.round((completedObjectives / totalObjectives) * 100) : 0;
@@ -155,10 +156,11 @@ document.addEventListener('DOMContentLoaded', function() {
             overallBar.setAttribute('aria-valuenow', percent);
         }
 
-        // Update text (total should be 35 objectives across all modules)
+        // Update text (total is every objective of every catalog module)
         const progressText = document.getElementById('overallProgressText');
         if (progressText) {
-            progressText.textContent = `${completedObjectives} of 35 objectives completed`;
+            const courseObjectives = Object.values(courseModules()).reduce((sum, count) => sum + count, 0);
+            progressText.textContent = `${completedObjectives} of ${courseObjectives} objectives completed`;
         }
     }
 
@@ -172,12 +174,11 @@ document.addEventListener('DOMContentLoaded', function() {
         let nextModuleId = null;
         let nextModuleTitle = null;
 
-        for (let moduleId = 1; moduleId <= 7; moduleId++) {
-            const moduleKeys = Object.keys(localStorage).filter(key => key.startsWith(`progress_${moduleId}_`));
-            const completedObjectives = moduleKeys.filter(key => localStorage.getItem(key) === 'true').length;
+        for (const moduleId of courseModuleIds()) {
+            const { total, completed } = getModuleProgress(moduleId);
 
             // If no progress exists for this module OR not all objectives completed
-            if (moduleKeys.length === 0 || completedObjectives < moduleKeys.length) {
+            if (total === 0 || completed < total) {
                 allModulesCompleted = false;
 
                 // Set this as the next module to work on (if we haven't found one yet)
@@ -255,12 +256,11 @@ document.addEventListener('DOMContentLoaded', function() {
     function checkCertificateEligibility() {
         let allCompleted = true;
 
-        for (let moduleId = 1; moduleId <= 7; moduleId++) {
-            const moduleKeys = Object.keys(localStorage).filter(key => key.startsWith(`progress_${moduleId}_`));
-            const completedObjectives = moduleKeys.filter(key => localStorage.getItem(key) === 'true').length;
+        for (const moduleId of courseModuleIds()) {
+            const { total, completed } = getModuleProgress(moduleId);
 
             // If no progress exists for this module OR not all objectives completed
-            if (moduleKeys.length === 0 || completedObjectives < moduleKeys.length) {
+            if (total === 0 || completed < total) {
                 allCompleted = false;
                 break;
             }
@@ -290,6 +290,16 @@ document.addEventListener('DOMContentLoaded', function() {
     updateOverallProgress();
     checkCertificateEligibility();
 
+    // Pull progress saved from other devices (and push anything queued offline)
+    seedProgressQueue();
+    syncProgress().then(progress => {
+        if (!progress) return;
+        applyServerProgress(progress);
+        updateRecentActivity();
+        updateOverallProgress();
+        checkCertificateEligibility();
+    });
+
     // Smooth scrolling for anchor links
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
         anchor.addEventListener('click', function (e) {
@@ -427,6 +437,20 @@ document.addEventListener('DOMContentLoaded', function() {
     // Global toast function
     window.showToast = showToast;
 
+    // Progress summaries are refreshed by inline page scripts (e.g. reset progress)
+    window.updateOverallProgress = updateOverallProgress;
+    window.updateRecentActivity = updateRecentActivity;
+    window.checkCertificateEligibility = checkCertificateEligibility;
+
+    // Keep summaries current when progress changes in another tab
+    window.addEventListener('storage', function(e) {
+        if (e.key !== PROGRESS_STATE_KEY) return;
+        progressState = null;
+        updateRecentActivity();
+        updateOverallProgress();
+        checkCertificateEligibility();
+    });
+
     // Keyboard shortcuts
     document.addEventListener('keydown', function(e) {
         // Ctrl/Cmd + K for search
@@ -451,6 +475,249 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('ClinicalRTransition app initialized successfully!');
 });
 
+// --- Progress Model ---
+// Objective states are kept in memory and persisted as one structured key,
+// { version, modules: { moduleId: { itemId: checked } } }, so progress summaries
+// never have to scan every localStorage key.
+const PROGRESS_STATE_KEY = 'progressState';
+const LEGACY_PROGRESS_KEY = /^progress_(\d+)_(\d+)$/;
+let progressState = null;
+
+function loadProgressState() {
+    if (progressState) return progressState;
+    try {
+        progressState = JSON.parse(localStorage.getItem(PROGRESS_STATE_KEY));
+    } catch (error) {
+        progressState = null;
+    }
+    if (!progressState || typeof progressState.modules !== 'object') {
+        progressState = { version: 1, modules: {} };
+        migrateLegacyProgress();
+    }
+    return progressState;
+}
+
+function migrateLegacyProgress() {
+    // One-time move of the old per-objective progress_<module>_<item> keys
+    const legacyKeys = Object.keys(localStorage).filter(key => LEGACY_PROGRESS_KEY.test(key));
+    legacyKeys.forEach(key => {
+        const [, moduleId, itemId] = key.match(LEGACY_PROGRESS_KEY);
+        const items = progressState.modules[moduleId] || (progressState.modules[moduleId] = {});
+        items[itemId] = localStorage.getItem(key) === 'true';
+    });
+    saveProgressState();
+    legacyKeys.forEach(key => localStorage.removeItem(key));
+}
+
+function saveProgressState() {
+    localStorage.setItem(PROGRESS_STATE_KEY, JSON.stringify(progressState));
+}
+
+function getObjectiveProgress(moduleId, itemId) {
+    const items = loadProgressState().modules[moduleId];
+    return Boolean(items && items[itemId]);
+}
+
+function setObjectiveProgress(moduleId, itemId, checked) {
+    const modules = loadProgressState().modules;
+    const items = modules[moduleId] || (modules[moduleId] = {});
+    if (items[itemId] === checked) return;
+    items[itemId] = checked;
+    saveProgressState();
+}
+
+// Objective count per module of the course catalog, rendered into <body>
+function courseModules() {
+    try {
+        return JSON.parse(document.body.dataset.courseModules || '{}');
+    } catch (error) {
+        return {};
+    }
+}
+
+function courseModuleIds() {
+    return Object.keys(courseModules()).map(Number).sort((a, b) => a - b);
+}
+
+function getModuleProgress(moduleId) {
+    // total counts objectives the learner has tracked in this module
+    const items = Object.values(loadProgressState().modules[moduleId] || {});
+    return { total: items.length, completed: items.filter(Boolean).length };
+}
+
+function replaceModuleProgress(moduleId, completedItems) {
+    const modules = loadProgressState().modules;
+    const items = modules[moduleId] || {};
+    Object.keys(items).forEach(itemId => { items[itemId] = false; });
+    completedItems.forEach(itemId => { items[itemId] = true; });
+    if (Object.keys(items).length > 0) {
+        modules[moduleId] = items;
+    }
+}
+
+function resetProgressState() {
+    // Clear the server copy too, otherwise the next sync would restore it
+    Object.entries(loadProgressState().modules).forEach(([moduleId, items]) => {
+        Object.keys(items)
+            .filter(itemId => items[itemId])
+            .forEach(itemId => queueProgressToggle(moduleId, itemId, false));
+    });
+    progressState = { version: 1, modules: {} };
+    localStorage.removeItem(PROGRESS_STATE_KEY);
+}
+
+// --- Server-side Progress Sync ---
+// Checkbox toggles are queued in localStorage and sent to the server in batches,
+// so progress follows the learner across devices and survives offline periods.
+const PROGRESS_QUEUE_KEY = 'progressSyncQueue';
+let progressSyncTimer = null;
+let applyingServerProgress = false;
+
+function getLearnerId() {
+    let learnerId = localStorage.getItem('learnerId');
+    if (!learnerId) {
+        learnerId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `learner-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
+        localStorage.setItem('learnerId', learnerId);
+    }
+    return learnerId;
+}
+
+function readProgressQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(PROGRESS_QUEUE_KEY) || '[]');
+    } catch (error) {
+        return [];
+    }
+}
+
+function queueProgressToggle(moduleId, itemId, checked, timestamp = Date.now()) {
+    const queue = readProgressQueue();
+    queue.push({
+        module_id: Number(moduleId),
+        item_id: Number(itemId),
+        checked: checked,
+        timestamp: timestamp
+    });
+    localStorage.setItem(PROGRESS_QUEUE_KEY, JSON.stringify(queue));
+
+    // Debounce: rapid clicks are sent together in one request
+    clearTimeout(progressSyncTimer);
+    progressSyncTimer = setTimeout(syncProgress, 1000);
+}
+
+function seedProgressQueue() {
+    // Upload progress recorded before server sync existed, once per browser.
+    // Timestamp 1 means it never overrides changes made on another device.
+    if (localStorage.getItem('progressSeeded') === 'true') return;
+    Object.entries(loadProgressState().modules).forEach(([moduleId, items]) => {
+        Object.keys(items)
+            .filter(itemId => items[itemId])
+            .forEach(itemId => queueProgressToggle(moduleId, itemId, true, 1));
+    });
+    localStorage.setItem('progressSeeded', 'true');
+}
+
+function syncProgress() {
+    clearTimeout(progressSyncTimer);
+    const queue = readProgressQueue();
+
+    return fetch('/api/progress/sync', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ learner_id: getLearnerId(), toggles: queue })
+    })
+    .then(response => response.json().then(data => ({ status: response.status, data })))
+    .then(({ status, data }) => {
+        // A batch the server refused (400) would be refused again: drop it too.
+        // Server errors keep the queue for the next attempt.
+        if (data.success || status === 400) {
+            // Drop only what was sent; more toggles may have been queued meanwhile
+            const current = readProgressQueue();
+            localStorage.setItem(PROGRESS_QUEUE_KEY, JSON.stringify(current.slice(queue.length)));
+        }
+        if (!data.success) {
+            console.error('Progress sync rejected:', data.message);
+            return null;
+        }
+        (data.rejected || []).forEach(entry => {
+            console.warn('Progress toggle dropped:', entry.message, queue[entry.index]);
+        });
+        return data.progress;
+    })
+    .catch(error => {
+        console.error('Progress sync failed:', error);
+        return null;
+    });
+}
+
+function applyServerProgress(progress) {
+    // Pending local toggles are newer than what the server returned
+    if (readProgressQueue().length > 0) return;
+
+    Object.entries(progress).forEach(([moduleId, completedItems]) => {
+        replaceModuleProgress(moduleId, completedItems);
+    });
+    saveProgressState();
+
+    // Update checkboxes on the current page through their normal change handlers
+    applyingServerProgress = true;
+    try {
+        document.querySelectorAll('.progress-checkbox').forEach(checkbox => {
+            const items = progress[checkbox.dataset.moduleId] || [];
+            const checked = items.includes(Number(checkbox.dataset.itemId));
+            if (checkbox.checked !== checked) {
+                checkbox.checked = checked;
+                checkbox.dispatchEvent(new Event('change'));
+            }
+        });
+    } finally {
+        applyingServerProgress = false;
+    }
+}
+
+// --- Offline Support ---
+// The service worker keeps the site shell and every opened module available
+// offline, and queues rating/progress writes until the connection is back.
+// Cached material is re-checked against the manifest at most once an hour.
+const PRECACHE_REFRESH_MS = 60 * 60 * 1000;
+
+function precacheRefreshDue() {
+    const last = Number(localStorage.getItem('precacheRefreshedAt')) || 0;
+    if (Date.now() - last < PRECACHE_REFRESH_MS) return false;
+    localStorage.setItem('precacheRefreshedAt', String(Date.now()));
+    return true;
+}
+
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator)) return;
+
+    navigator.serviceWorker.register('/sw.js')
+        .then(() => navigator.serviceWorker.ready)
+        .then(registration => {
+            if (precacheRefreshDue()) {
+                registration.active.postMessage({ type: 'refresh' });
+            }
+            const moduleMatch = window.location.pathname.match(/^\/module\/(\d+)/);
+            if (moduleMatch) {
+                registration.active.postMessage({ type: 'cache-module', moduleId: moduleMatch[1] });
+            }
+        })
+        .catch(error => console.error('Service worker registration failed:', error));
+
+    // Browsers without Background Sync replay queued writes when back online
+    window.addEventListener('online', () => {
+        if (navigator.serviceWorker.controller) {
+            navigator.serviceWorker.controller.postMessage({ type: 'replay-writes' });
+        }
+    });
+}
+
+window.addEventListener('load', registerServiceWorker);
+
 // Function to update current date in footer
 function updateCurrentDate() {
     const currentDateElement = document.getElementById('current-date');
@@ -525,8 +792,9 @@ function initializeSimpleStarRating() {
                     }
                 });
 
-                // Automatically save rating when star is clicked
-                submitSimpleRating(selectedRating, '');
+                // Rapid changes are coalesced into one submission
+                queueRatingEvent(selectedRating);
+                scheduleRatingFlush();
 
                 // Show feedback text container for optional comment
                 if (feedbackContainer) {
@@ -563,54 +831,146 @@ function initializeSimpleStarRating() {
                 const feedbackText = document.getElementById('feedbackText').value.trim();
                 if (feedbackText && selectedRating > 0) {
                     // Update the existing rating with feedback text
-                    submitSimpleRating(selectedRating, feedbackText, true);
+                    queueRatingEvent(selectedRating, feedbackText);
+                    flushRatings().then(data => {
+                        if (data && data.success) {
+                            showFeedbackThanks();
+                        }
+                    });
                 }
             });
         }
     }
 }
 
-function submitSimpleRating(rating, feedbackText = '', isTextUpdate = false) {
-    // Store rating data
-    const timestamp = new Date().toISOString();
-    const ratingData = {
+// Ratings are coalesced: star clicks are debounced into one event and
+// whatever is still unconfirmed when the page is hidden goes out with
+// sendBeacon. Each rating has an id and a revision, so the bulk endpoint
+// drops resent events; pending events are kept in localStorage until a
+// response confirms them, and are resent on the next page load.
+const RATING_ENDPOINT = '/api/ratings/bulk';
+const RATING_QUEUE_KEY = 'pendingRatingEvents';
+const RATING_DEBOUNCE_MS = 2000;
+let ratingEvent = null;
+let ratingFlushTimer = null;
+
+function loadRatingQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(RATING_QUEUE_KEY)) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function saveRatingQueue(queue) {
+    try {
+        if (queue.length) {
+            localStorage.setItem(RATING_QUEUE_KEY, JSON.stringify(queue));
+        } else {
+            localStorage.removeItem(RATING_QUEUE_KEY);
+        }
+    } catch (e) {
+        // Storage unavailable: events are only sent from this page
+    }
+}
+
+function newRatingId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+
+function queueRatingEvent(rating, feedbackText = '') {
+    // One rating per page view; every change is a new revision of it
+    ratingEvent = {
+        id: ratingEvent ? ratingEvent.id : newRatingId(),
+        revision: ratingEvent ? ratingEvent.revision + 1 : 1,
         rating: rating,
-        feedback: feedbackText,
-        timestamp: timestamp,
-        isUpdate: isTextUpdate
+        feedback: feedbackText || (ratingEvent ? ratingEvent.feedback : ''),
+        timestamp: new Date().toISOString()
     };
+    const queue = loadRatingQueue().filter(event => event.id !== ratingEvent.id);
+    queue.push(ratingEvent);
+    saveRatingQueue(queue);
+}
+
+function scheduleRatingFlush() {
+    clearTimeout(ratingFlushTimer);
+    ratingFlushTimer = setTimeout(flushRatings, RATING_DEBOUNCE_MS);
+}
 
-    // Submit to server
-    fetch('/submit_simple_rating', {
+function forgetRatingEvents(sent) {
+    // Keep revisions queued after this batch was sent
+    const confirmed = new Set(sent.map(event => `${event.id}/${event.revision}`));
+    saveRatingQueue(loadRatingQueue().filter(
+        event => !confirmed.has(`${event.id}/${event.revision}`)
+    ));
+}
+
+function flushRatings() {
+    clearTimeout(ratingFlushTimer);
+    const events = loadRatingQueue();
+    if (!events.length && !ratingEvent) {
+        return Promise.resolve(null);
+    }
+    const batch = events.length ? events : [ratingEvent];
+
+    return fetch(RATING_ENDPOINT, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify(ratingData)
+        body: JSON.stringify({ events: batch }),
+        keepalive: true
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            console.log('Rating submitted successfully');
-
-            if (isTextUpdate) {
-                // Show success message for text feedback
-                const feedbackContainer = document.querySelector('.feedback-text-container');
-                if (feedbackContainer) {
-                    feedbackContainer.innerHTML = '<small class="text-success"><i class="fas fa-check me-1"></i>Thank you for your feedback!</small>';
-                    setTimeout(() => {
-                        feedbackContainer.style.display = 'none';
-                    }, 3000);
-                }
-            } else if (!feedbackText) {
-                // Just show a brief confirmation for star rating
-                console.log('Star rating saved automatically');
-            }
+            forgetRatingEvents(batch);
         } else {
             console.error('Error submitting rating:', data.message);
         }
+        return data;
     })
     .catch(error => {
         console.error('Error:', error);
+        return null;
     });
 }
+
+function beaconRatings() {
+    const events = loadRatingQueue();
+    if (!events.length) {
+        return;
+    }
+    clearTimeout(ratingFlushTimer);
+    const body = new Blob([JSON.stringify({ events: events })], { type: 'application/json' });
+    if (!(navigator.sendBeacon && navigator.sendBeacon(RATING_ENDPOINT, body))) {
+        fetch(RATING_ENDPOINT, { method: 'POST', body: body, keepalive: true }).catch(() => {});
+    }
+}
+
+function showFeedbackThanks() {
+    const feedbackContainer = document.querySelector('.feedback-text-container');
+    if (feedbackContainer) {
+        feedbackContainer.innerHTML = '<small class="text-success"><i class="fas fa-check me-1"></i>Thank you for your feedback!</small>';
+        setTimeout(() => {
+            feedbackContainer.style.display = 'none';
+        }, 3000);
+    }
+}
+
+// Deliver pending ratings when the page is hidden or closed, and resend
+// any left over from a previous visit
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') {
+        beaconRatings();
+    }
+});
+window.addEventListener('pagehide', beaconRatings);
+window.addEventListener('load', function() {
+    if (loadRatingQueue().length) {
+        flushRatings();
+    }
+});
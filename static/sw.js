@@ -0,0 +1,252 @@
+// TransitionR service worker: offline site shell, per-module offline packs
+// and background sync for rating/progress writes made while offline.
+//
+// The precache manifest (/precache-manifest.json) lists every URL with the
+// hash of its content; a cached copy is only re-downloaded when its hash
+// changes, so updates invalidate exactly what changed. Pages (navigations)
+// are fetched network-first and only fall back to the cache offline.
+
+const PRECACHE = 'transitionr-precache-v1';
+const RUNTIME_CACHE = 'transitionr-runtime-v1';
+const MANIFEST_URL = '/precache-manifest.json';
+const REVISIONS_URL = '/__precache-revisions';
+const SYNC_TAG = 'transitionr-writes';
+const QUEUED_WRITES = ['/submit_simple_rating', '/api/ratings/bulk', '/api/progress/sync'];
+const CDN_HOSTS = ['cdn.jsdelivr.net', 'cdnjs.cloudflare.com'];
+const PARALLEL_FETCHES = 6;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        fetchManifest()
+            .then(manifest => precacheEntries(manifest.shell))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key !== PRECACHE && key !== RUNTIME_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+            .then(() => replayWrites().catch(() => {}))
+    );
+});
+
+self.addEventListener('message', event => {
+    const message = event.data || {};
+    if (message.type === 'refresh') {
+        // Sent by pages at most hourly: pick up re-rendered material
+        event.waitUntil(refreshPrecache());
+    } else if (message.type === 'cache-module') {
+        event.waitUntil(fetchManifest().then(manifest => {
+            return precacheEntries(manifest.modules[message.moduleId] || []);
+        }));
+    } else if (message.type === 'replay-writes') {
+        event.waitUntil(replayWrites().catch(() => {}));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayWrites());
+    }
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (url.origin === self.location.origin && request.method === 'POST'
+            && QUEUED_WRITES.includes(url.pathname)) {
+        event.respondWith(sendOrQueue(request));
+        return;
+    }
+    if (request.method !== 'GET') return;
+
+    if (url.origin !== self.location.origin) {
+        if (CDN_HOSTS.includes(url.hostname)) {
+            event.respondWith(staleWhileRevalidate(request));
+        }
+        return;
+    }
+    // Live data is never served from cache
+    if (url.pathname.startsWith('/api/') || url.pathname.startsWith('/admin/')
+            || url.pathname === MANIFEST_URL) {
+        return;
+    }
+    // Pages may carry flash messages or progress: network first, cache offline
+    if (request.mode === 'navigate') {
+        event.respondWith(networkFirst(request));
+        return;
+    }
+    event.respondWith(fromPrecache(request));
+});
+
+// --- Precache ---
+
+function fetchManifest() {
+    return fetch(MANIFEST_URL, { cache: 'no-cache' }).then(response => {
+        // 503 while the server builds its first manifest; retried later
+        if (!response.ok) throw new Error(`Manifest unavailable (${response.status})`);
+        return response.json();
+    });
+}
+
+function readRevisions(cache) {
+    return cache.match(REVISIONS_URL)
+        .then(response => response ? response.json() : {});
+}
+
+function writeRevisions(cache, revisions) {
+    return cache.put(REVISIONS_URL, new Response(JSON.stringify(revisions), {
+        headers: { 'Content-Type': 'application/json' }
+    }));
+}
+
+function precacheEntries(entries) {
+    return caches.open(PRECACHE).then(cache => readRevisions(cache).then(revisions => {
+        const pending = entries.filter(entry => revisions[entry.url] !== entry.revision);
+
+        function next() {
+            const entry = pending.shift();
+            if (!entry) return Promise.resolve();
+            return fetch(entry.url, { cache: 'no-cache' })
+                .then(response => {
+                    if (!response.ok) return;
+                    revisions[entry.url] = entry.revision;
+                    return cache.put(entry.url, response);
+                })
+                .catch(() => {})  // Keep the old copy; retried on the next refresh
+                .then(next);
+        }
+
+        const workers = [];
+        for (let i = 0; i < PARALLEL_FETCHES; i++) {
+            workers.push(next());
+        }
+        return Promise.all(workers).then(() => writeRevisions(cache, revisions));
+    }));
+}
+
+function refreshPrecache() {
+    return fetchManifest().then(manifest => caches.open(PRECACHE).then(cache => {
+        return readRevisions(cache).then(revisions => {
+            const current = {};
+            [manifest.shell, manifest.bonus, ...Object.values(manifest.modules)]
+                .forEach(group => group.forEach(entry => { current[entry.url] = entry; }));
+
+            // Drop entries that no longer exist; re-fetch cached ones that changed
+            const removed = Object.keys(revisions).filter(url => !current[url]);
+            removed.forEach(url => { delete revisions[url]; });
+            const changed = Object.keys(revisions)
+                .filter(url => revisions[url] !== current[url].revision)
+                .map(url => current[url]);
+
+            return Promise.all(removed.map(url => cache.delete(url)))
+                .then(() => writeRevisions(cache, revisions))
+                .then(() => precacheEntries(manifest.shell.concat(changed)));
+        });
+    })).catch(() => {});  // Offline: keep serving what is cached
+}
+
+function fromPrecache(request) {
+    return caches.open(PRECACHE).then(cache => {
+        return cache.match(request).then(cached => {
+            // Precached assets are kept current by revision, so serve them instantly
+            if (cached) return cached;
+            return fetch(request).catch(() => {
+                // Responsive figure variants (?w=) fall back to the cached original
+                return cache.match(request, { ignoreSearch: true })
+                    .then(fallback => fallback || offlineFallback(request, cache));
+            });
+        });
+    });
+}
+
+function networkFirst(request) {
+    return fetch(request).catch(() => caches.open(PRECACHE).then(cache => {
+        return cache.match(request, { ignoreSearch: true })
+            .then(cached => cached || offlineFallback(request, cache));
+    }));
+}
+
+function offlineFallback(request, cache) {
+    if (request.mode === 'navigate') {
+        return cache.match('/modules').then(page => page || Response.error());
+    }
+    return Response.error();
+}
+
+function staleWhileRevalidate(request) {
+    return caches.open(RUNTIME_CACHE).then(cache => cache.match(request).then(cached => {
+        const network = fetch(request).then(response => {
+            cache.put(request, response.clone());
+            return response;
+        }).catch(error => {
+            if (!cached) throw error;
+        });
+        return cached || network;
+    }));
+}
+
+// --- Background sync for writes ---
+
+function openWriteQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open('transitionr-sync', 1);
+        open.onupgradeneeded = () => {
+            open.result.createObjectStore('writes', { keyPath: 'id', autoIncrement: true });
+        };
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+function withWriteQueue(mode, operation) {
+    return openWriteQueue().then(db => new Promise((resolve, reject) => {
+        const transaction = db.transaction('writes', mode);
+        const request = operation(transaction.objectStore('writes'));
+        transaction.oncomplete = () => resolve(request.result);
+        transaction.onerror = () => reject(transaction.error);
+    }));
+}
+
+function sendOrQueue(request) {
+    const copy = request.clone();
+    return fetch(request)
+        .then(response => {
+            if (response.status >= 500) throw new Error(`HTTP ${response.status}`);
+            return response;
+        })
+        .catch(() => copy.text().then(body => withWriteQueue('readwrite', store => store.add({
+            url: copy.url,
+            body: body,
+            contentType: copy.headers.get('Content-Type') || 'application/json',
+            queuedAt: Date.now()
+        }))).then(() => {
+            if (self.registration.sync) {
+                return self.registration.sync.register(SYNC_TAG).catch(() => {});
+            }
+        }).then(() => new Response(JSON.stringify({
+            success: true,
+            queued: true,
+            message: 'Saved offline; it will be sent when you are back online.'
+        }), { status: 202, headers: { 'Content-Type': 'application/json' } })));
+}
+
+function replayWrites() {
+    return withWriteQueue('readonly', store => store.getAll()).then(writes => {
+        // Replay in order; stop at the first network failure and retry later
+        return writes.reduce((previous, write) => previous.then(() => fetch(write.url, {
+            method: 'POST',
+            headers: { 'Content-Type': write.contentType },
+            body: write.body
+        }).then(response => {
+            if (response.status >= 500) throw new Error(`HTTP ${response.status}`);
+            return withWriteQueue('readwrite', store => store.delete(write.id));
+        })), Promise.resolve());
+    });
+}
@@ -0,0 +1,295 @@
+"""
+Static-site export of the read-only parts of the training portal.
+
+Every page, rendered document, download and supporting asset the app serves
+is fixed at deploy time. This module crawls the MODULES and BONUS_RESOURCES
+catalogs, renders each route once through the Flask app itself (so the
+output is byte-for-byte what Flask would serve), deduplicates identical
+assets with hard links and writes the result to a directory tree together
+with an nginx snippet. Flask then only needs to handle the dynamic routes:
+certificates, the contact form and ratings.
+
+Responsive figure variants (``fig.png?w=480`` in ``srcset``) cannot be
+told apart by a static host, so each one is exported as a PNG file of its
+own (``fig.w480.png``) and the exported pages point at those files.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from werkzeug.test import Client
+
+import rendered_html
+import usage_stats
+
+ExportedRoute = namedtuple(
+    "ExportedRoute", ["url", "path", "content_type", "disposition", "size"]
+)
+
+ASSET_ROOTS = ("training_material", "bonus_resources/rendered")
+PAGE_ROUTES = ("/", "/modules", "/bonus")
+# A width variant of a figure in an srcset candidate
+FIGURE_VARIANT = re.compile(rb'(/static_files/[^"\s?,]+\.png)\?w=(\d+)')
+
+
+def _basename(path):
+    return path.split("/")[-1]
+
+
+def collect_routes(modules, bonus_resources):
+    """List every read-only URL the app serves for the current catalog."""
+    routes = list(PAGE_ROUTES)
+
+    for module_id in sorted(modules):
+        routes.append(f"/module/{module_id}")
+        routes.append(f"/download_module/{module_id}")
+        for filename in modules[module_id]["files"].values():
+            routes.append(f"/view/{_basename(filename)}")
+            if not filename.endswith(".html"):
+                routes.append(f"/download/{_basename(filename)}")
+
+    for resource in bonus_resources.values():
+        routes.append(f"/view/{_basename(resource['file'])}")
+        routes.append(f"/download/{_basename(resource['file'])}")
+
+    # Keep the first occurrence of each URL, in crawl order
+    return list(dict.fromkeys(routes))
+
+
+def collect_assets():
+    """List supporting files (Quarto *_files directories) served via /static_files."""
+    assets = []
+    for asset_root in ASSET_ROOTS:
+        for root, dirs, files in os.walk(asset_root):
+            dirs.sort()
+            if "_files" not in root.replace("\\", "/"):
+                continue
+            for filename in sorted(files):
+                if rendered_html.is_excluded_asset(filename):
+                    continue
+                assets.append(os.path.join(root, filename).replace("\\", "/"))
+    return assets
+
+
+def _route_file(output_dir, url, content_type):
+    """Map a URL onto a file inside the export directory."""
+    relative = url.lstrip("/")
+    is_page = not os.path.splitext(relative)[1] and content_type.startswith(
+        "text/html"
+    )
+    if not relative or is_page:
+        relative = os.path.join(relative, "index.html")
+    return os.path.join(output_dir, *relative.split("/"))
+
+
+class _Deduplicator:
+    """Write file contents once per hash and hard-link identical copies."""
+
+    def __init__(self):
+        self.seen = {}
+        self.saved_bytes = 0
+        self.lock = threading.Lock()
+
+    def write(self, target, data):
+        digest = hashlib.sha256(data).hexdigest()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+
+        with self.lock:
+            original = self.seen.setdefault(digest, target)
+        if original != target:
+            try:
+                os.link(original, target)
+                with self.lock:
+                    self.saved_bytes += len(data)
+                return
+            except OSError:
+                pass  # Not written yet, other filesystem or no hard links: copy
+
+        with open(target, "wb") as f:
+            f.write(data)
+
+
+def _get(wsgi_app, url, headers=None):
+    # Exporting is not learner usage
+    environ = {usage_stats.INTERNAL_REQUEST: True}
+    return Client(wsgi_app).get(url, headers=headers, environ_overrides=environ)
+
+
+def variant_url(url, width):
+    """Exported URL of a figure variant: ``fig.png?w=480`` -> ``fig.w480.png``."""
+    return f"{url[: -len('.png')]}.w{width}.png"
+
+
+def _static_variants(body):
+    """Point srcset variants at exported files; returns (body, variants)."""
+    variants = set()
+
+    def rewrite(match):
+        url, width = match.group(1).decode(), int(match.group(2))
+        variants.add((url, width))
+        return variant_url(url, width).encode()
+
+    return FIGURE_VARIANT.sub(rewrite, body), variants
+
+
+def _export_route(wsgi_app, dedup, output_dir, url):
+    response = _get(wsgi_app, url)
+    if response.status_code != 200:
+        return url, response.status_code, None, set()
+
+    body = response.get_data()
+    variants = set()
+    if response.mimetype == "text/html":
+        body, variants = _static_variants(body)
+    content_type = response.headers.get("Content-Type", "application/octet-stream")
+    target = _route_file(output_dir, url, content_type)
+    dedup.write(target, body)
+    return (
+        url,
+        200,
+        ExportedRoute(
+            url,
+            os.path.relpath(target, output_dir).replace("\\", "/"),
+            content_type,
+            response.headers.get("Content-Disposition"),
+            len(body),
+        ),
+        variants,
+    )
+
+
+def _export_variant(wsgi_app, dedup, output_dir, url, width):
+    # PNG: a static host cannot negotiate AVIF/WebP from the Accept header
+    response = _get(wsgi_app, f"{url}?w={width}", headers={"Accept": "image/png"})
+    exported_url = variant_url(url, width)
+    if response.status_code != 200:
+        return exported_url, response.status_code, None
+    data = response.get_data()
+    target = os.path.join(output_dir, *unquote(exported_url).lstrip("/").split("/"))
+    dedup.write(target, data)
+    relative = os.path.relpath(target, output_dir).replace("\\", "/")
+    route = ExportedRoute(exported_url, relative, None, None, len(data))
+    return exported_url, 200, route
+
+
+def _export_asset(dedup, output_dir, asset):
+    with open(asset, "rb") as f:
+        data = f.read()
+    target = os.path.join(output_dir, "static_files", *asset.split("/"))
+    dedup.write(target, data)
+    return ExportedRoute(
+        f"/static_files/{asset}",
+        os.path.relpath(target, output_dir).replace("\\", "/"),
+        None,
+        None,
+        len(data),
+    )
+
+
+def export_site(
+    app, modules, bonus_resources, output_dir, jobs=None, wsgi_app=None
+):
+    """
+    Export every read-only route into output_dir and return a summary.
+
+    Routes are requested through ``wsgi_app`` (default: the app's own WSGI
+    callable); pass the app below admission control to export at full speed.
+    """
+    output_dir = os.path.abspath(output_dir)
+    wsgi_app = wsgi_app or app.wsgi_app
+    dedup = _Deduplicator()
+    exported = []
+    skipped = []
+    variants = set()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for url, status, route, found in executor.map(
+            lambda url: _export_route(wsgi_app, dedup, output_dir, url),
+            collect_routes(modules, bonus_resources),
+        ):
+            variants.update(found)
+            if route is None:
+                skipped.append((url, status))
+            else:
+                exported.append(route)
+
+        for url, status, route in executor.map(
+            lambda variant: _export_variant(wsgi_app, dedup, output_dir, *variant),
+            sorted(variants),
+        ):
+            if route is None:
+                skipped.append((url, status))
+            else:
+                exported.append(route)
+
+        exported.extend(
+            executor.map(
+                lambda asset: _export_asset(dedup, output_dir, asset),
+                collect_assets(),
+            )
+        )
+
+    static_target = os.path.join(output_dir, "static")
+    if os.path.exists(static_target):
+        shutil.rmtree(static_target)
+    shutil.copytree(app.static_folder, static_target)
+
+    _write_manifest(output_dir, exported)
+    _write_nginx_snippet(output_dir, exported)
+    return {"routes": exported, "skipped": skipped, "saved_bytes": dedup.saved_bytes}
+
+
+def _write_manifest(output_dir, exported):
+    with open(os.path.join(output_dir, "routes.json"), "w", encoding="utf-8") as f:
+        json.dump([route._asdict() for route in exported], f, indent=2)
+
+
+def _write_nginx_snippet(output_dir, exported):
+    """
+    Emit an nginx server-block snippet for the exported tree.
+
+    Routes whose file extension does not tell nginx the right headers (e.g.
+    ``/view/module1_theory.qmd`` is HTML, downloads are attachments) get
+    exact-match locations; everything else is served with ``try_files``.
+    """
+    lines = [
+        "# Generated by 'flask export-static'. Include inside a server { } block",
+        "# that also defines 'location @flask { proxy_pass ...; }' for dynamic routes.",
+        f"root {output_dir};",
+        "",
+    ]
+    for route in exported:
+        if route.content_type is None:
+            continue
+        extension = os.path.splitext(route.path)[1]
+        natural = route.path.endswith("index.html") or (
+            extension == ".html" and route.content_type.startswith("text/html")
+        )
+        if natural and not route.disposition:
+            continue
+        lines.append(f'location = "{route.url}" {{')
+        lines.append(f'    default_type "{route.content_type}";')
+        lines.append("    types { }")
+        if route.disposition:
+            disposition = route.disposition.replace('"', '\\"')
+            lines.append(f'    add_header Content-Disposition "{disposition}";')
+        lines.append(f'    try_files "/{route.path}" =404;')
+        lines.append("}")
+    lines += [
+        "",
+        "location / {",
+        "    try_files $uri $uri/index.html @flask;",
+        "}",
+        "",
+    ]
+    with open(os.path.join(output_dir, "nginx.conf"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
@@ -0,0 +1,111 @@
+"""
+Per-module R scripts tangled from the theory and solution documents.
+
+Like ``knitr::purl``, every R chunk is written out under a
+``## ----label, options----`` header; chunks with ``eval=FALSE`` are
+commented out and chunks with ``purl=FALSE`` are left out. The theory
+documents mostly show code in plain ``r`` blocks, so those are tangled
+as well.
+
+Scripts are cached by the content hash of their sources and are all
+built in parallel when the app starts, so a download only looks up the
+cache.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_dirs
+import qmd_chunks
+
+HEADER_WIDTH = 80
+SOURCES = ("theory", "solution")
+FALSE_VALUES = ("false", "no")
+
+# Tangled scripts by content hash of their sources
+_scripts = cache_dirs.ContentCache(maxsize=64)
+
+
+def _chunk_header(chunk):
+    options = [chunk.label] if chunk.label else []
+    options += [
+        f"{name}={value}" for name, value in chunk.options.items() if name != "display"
+    ]
+    header = f"## ----{', '.join(options)}"
+    return header.ljust(HEADER_WIDTH, "-")
+
+
+def tangle(title, sources):
+    """R script for ``[(filename, qmd text), ...]`` in the given order."""
+    lines = [f"# {title}", "# R code tangled from " + ", ".join(n for n, _t in sources)]
+    for filename, text in sources:
+        lines += ["", "", f"# ==== {filename} ===="]
+        for chunk in qmd_chunks.parse_chunks(text, display=True):
+            if chunk.options.get("purl", "").lower() in FALSE_VALUES:
+                continue
+            lines += ["", _chunk_header(chunk)]
+            if chunk.options.get("eval", "").lower() in FALSE_VALUES:
+                lines += [f"# {code}" if code else "#" for code in chunk.code]
+            else:
+                lines += chunk.code
+    return "\n".join(lines) + "\n"
+
+
+def module_sources(module):
+    """Paths of the module's documents that feed its script."""
+    return tuple(
+        module["files"][kind]
+        for kind in SOURCES
+        if kind in module["files"] and os.path.exists(module["files"][kind])
+    )
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def module_script(title, paths):
+    """``(digest, script bytes)`` of the script tangled from ``paths``."""
+    digest = hashlib.sha256(title.encode())
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        digest.update(cache_dirs.content_hash(path).encode())
+    key = digest.hexdigest()
+
+    def compute():
+        sources = [(os.path.basename(path), _read(path)) for path in paths]
+        return tangle(title, sources).encode()
+
+    return key, _scripts.get(key, compute)
+
+
+def script_for(module_id, module):
+    paths = module_sources(module)
+    return module_script(f"Module {module_id}: {module['title']}", paths)
+
+
+def build_all(modules, jobs=None):
+    """Tangle every module's script in parallel; returns ``{id: digest}``."""
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = {
+            module_id: executor.submit(script_for, module_id, module)
+            for module_id, module in modules.items()
+        }
+    return {module_id: future.result()[0] for module_id, future in futures.items()}
+
+
+def build_in_background(modules):
+    """Start ``build_all`` without delaying start-up; errors surface on download."""
+
+    def run():
+        try:
+            build_all(modules)
+        except Exception as e:
+            print(f"Warning: could not pre-build R scripts: {e}")
+
+    thread = threading.Thread(target=run, name="tangle-build", daemon=True)
+    thread.start()
+    return thread
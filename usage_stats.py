@@ -0,0 +1,157 @@
+"""
+Download and view counters.
+
+Hits are counted in memory per ``(time bucket, kind, key)``; a
+background thread flushes the pending counts every ``flush_interval``
+seconds in one SQLite transaction. Rows are merged with an additive
+upsert, so every gunicorn worker flushes into the same file and the
+totals add up across workers without any coordination between them.
+Counts not yet flushed when a worker is killed are lost, which is an
+acceptable trade for keeping file I/O out of the request path.
+"""
+
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+BUCKET_SECONDS = 3600
+# WSGI environ key marking internal crawls (link checks, precache manifest,
+# static export) that are not usage
+INTERNAL_REQUEST = "usage_stats.internal"
+# Kinds of use that also count toward their module's total; supporting
+# assets (``static``) do not
+MODULE_KINDS = ("page", "view", "download", "module_zip")
+BUCKET_SIZES = {"hour": 3600, "day": 86400}
+MODULE_NUMBER = re.compile(r"\bmodule[ _]?(\d+)", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_counts (
+    bucket INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket, kind, key)
+)
+"""
+UPSERT = """
+INSERT INTO usage_counts (bucket, kind, key, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (bucket, kind, key) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def module_for(path):
+    """Module number a file belongs to (``module3_...`` or ``module 3 - ...``)."""
+    match = MODULE_NUMBER.search(path or "")
+    return match.group(1) if match else None
+
+
+class UsageCounters:
+    """In-memory hit counters with periodic batched flushes to SQLite."""
+
+    def __init__(self, path, flush_interval=10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        atexit.register(self.flush)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        connection.execute(SCHEMA)
+        return connection
+
+    def hit(self, kind, key, module=None):
+        """Count one use of ``key``; also counted for its module if known."""
+        bucket = int(time.time()) // BUCKET_SECONDS * BUCKET_SECONDS
+        if kind not in MODULE_KINDS:
+            module = None
+        elif module is None:
+            module = module_for(key)
+        with self._lock:
+            self._pending[(bucket, kind, key)] += 1
+            if module:
+                self._pending[(bucket, "module", module)] += 1
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # Threads do not survive a fork, so each worker starts its own
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        thread = threading.Thread(target=self._run, name="usage-flush", daemon=True)
+        thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Warning: could not flush usage counters: {e}")
+
+    def flush(self):
+        """Write pending counts in one transaction; returns the rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        rows = [(*slot, count) for slot, count in pending.items()]
+        try:
+            connection = self._connect()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(UPSERT, rows)
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            # Keep the counts for the next attempt
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return len(rows)
+
+    def top(self, kind, limit=10, since=0):
+        """``[(key, count)]`` with the highest totals since ``since``."""
+        connection = self._connect()
+        try:
+            return connection.execute(
+                "SELECT key, SUM(count) AS total FROM usage_counts"
+                " WHERE kind = ? AND bucket >= ?"
+                " GROUP BY key ORDER BY total DESC, key LIMIT ?",
+                (kind, since, limit),
+            ).fetchall()
+        finally:
+            connection.close()
+
+    def buckets(self, kind, key=None, since=0, size=BUCKET_SECONDS):
+        """``[(bucket start, count)]`` for a kind (optionally one key)."""
+        query = (
+            "SELECT bucket - bucket % ? AS start, SUM(count) FROM usage_counts"
+            " WHERE kind = ? AND bucket >= ?"
+        )
+        params = [size, kind, since]
+        if key is not None:
+            query += " AND key = ?"
+            params.append(key)
+        connection = self._connect()
+        try:
+            return connection.execute(
+                query + " GROUP BY start ORDER BY start", params
+            ).fetchall()
+        finally:
+            connection.close()